@@ -0,0 +1,154 @@
+"""
+Building AIGs gate by gate in Python.
+
+Literals follow AIGER: `2*var` is a variable, `2*var+1` is its negation, 0 is FALSE, 1 is TRUE.
+The builder folds constants and trivial ANDs and reuses structurally equal ANDs,
+and the circuit is converted into an `aiger` object (aiger_swig) only at the end,
+so latches may be used before their next-state functions are defined.
+"""
+
+import aiger_swig.aiger_wrap as aiglib
+
+
+FALSE_LIT = 0
+TRUE_LIT = 1
+
+
+def negate(lit: int) -> int:
+    return lit ^ 1
+
+
+class AigBuilder:
+    def __init__(self, first_var: int=1):
+        """ :param first_var: the first variable of the builder (the smaller ones may be used by another circuit) """
+        self._next_var = first_var
+        self.inputs = []       # (lit, name)
+        self.latches = []      # [lit, next, name, reset]
+        self.ands = []         # (lhs, rhs0, rhs1)
+        self.outputs = []      # (lit, name)
+        self.bad = []          # (lit, name)
+        self.constraints = []  # (lit, name)
+        self.justice = []      # (lits, name)
+        self.fairness = []     # (lit, name)
+        self._and_by_rhs = dict()
+        self._latch_by_lit = dict()  # value lit |-> (latch, is_negated)
+
+    def _new_lit(self) -> int:
+        lit = 2 * self._next_var
+        self._next_var += 1
+        return lit
+
+    def add_input(self, name: str) -> int:
+        lit = self._new_lit()
+        self.inputs.append((lit, name))
+        return lit
+
+    def add_latch(self, name: str, init: bool or None=False) -> int:
+        """
+        :param init: initial value, None for uninitialized latches
+        :return: literal of the latch value; set its next-state function with `set_latch_next`.
+                 The latches with `init` TRUE store the negated value (AIGER latches start at 0).
+        """
+        lit = self._new_lit()
+        latch = [lit, FALSE_LIT, name, lit if init is None else FALSE_LIT]
+        self.latches.append(latch)
+        value_lit = negate(lit) if init else lit
+        self._latch_by_lit[value_lit] = (latch, init)
+        return value_lit
+
+    def set_latch_next(self, latch_lit: int, next_lit: int):
+        latch, is_negated = self._latch_by_lit[latch_lit]
+        latch[1] = negate(next_lit) if is_negated else next_lit
+
+    def and_(self, a: int, b: int) -> int:
+        if a == FALSE_LIT or b == FALSE_LIT or a == negate(b):
+            return FALSE_LIT
+        if a == TRUE_LIT or a == b:
+            return b
+        if b == TRUE_LIT:
+            return a
+
+        key = (a, b) if a < b else (b, a)
+        lhs = self._and_by_rhs.get(key)
+        if lhs is None:
+            lhs = self._new_lit()
+            self.ands.append((lhs,) + key)
+            self._and_by_rhs[key] = lhs
+        return lhs
+
+    def or_(self, a: int, b: int) -> int:
+        return negate(self.and_(negate(a), negate(b)))
+
+    def xor(self, a: int, b: int) -> int:
+        return self.or_(self.and_(a, negate(b)), self.and_(negate(a), b))
+
+    def ite(self, c: int, t: int, e: int) -> int:
+        return self.or_(self.and_(c, t), self.and_(negate(c), e))
+
+    def and_all(self, lits) -> int:
+        # balanced, to keep the depth logarithmic
+        lits = list(lits)
+        if not lits:
+            return TRUE_LIT
+        while len(lits) > 1:
+            lits = [self.and_(lits[i], lits[i + 1]) if i + 1 < len(lits) else lits[i]
+                    for i in range(0, len(lits), 2)]
+        return lits[0]
+
+    def or_all(self, lits) -> int:
+        return negate(self.and_all(negate(l) for l in lits))
+
+    def add_output(self, lit: int, name: str):
+        self.outputs.append((lit, name))
+
+    def add_bad(self, lit: int, name: str):
+        self.bad.append((lit, name))
+
+    def add_constraint(self, lit: int, name: str):
+        self.constraints.append((lit, name))
+
+    def add_justice(self, lits, name: str):
+        self.justice.append((list(lits), name))
+
+    def add_fairness(self, lit: int, name: str):
+        self.fairness.append((lit, name))
+
+    def to_aiger(self) -> aiglib.aiger:
+        model = aiglib.aiger_init()
+        for (lit, name) in self.inputs:
+            aiglib.aiger_add_input(model, lit, name)
+        for (lit, next_lit, name, reset) in self.latches:
+            aiglib.aiger_add_latch(model, lit, next_lit, name)
+            if reset != FALSE_LIT:
+                aiglib.aiger_add_reset(model, lit, reset)
+        for (lhs, rhs0, rhs1) in self.ands:
+            aiglib.aiger_add_and(model, lhs, rhs0, rhs1)
+        for (lit, name) in self.outputs:
+            aiglib.aiger_add_output(model, lit, name)
+        for (lit, name) in self.bad:
+            aiglib.aiger_add_bad(model, lit, name)
+        for (lit, name) in self.constraints:
+            aiglib.aiger_add_constraint(model, lit, name)
+        for (lits, name) in self.justice:
+            aiglib.aiger_add_justice(model, len(lits), lits, name)
+        for (lit, name) in self.fairness:
+            aiglib.aiger_add_fairness(model, lit, name)
+
+        error = aiglib.aiger_check(model)
+        assert not error, error
+        return model
+
+
+def add_fairness_flags(builder: AigBuilder, fair_lits: list, name: str) -> int:
+    """
+    Generalized Buchi condition `GF fair_lits[0] & GF fair_lits[1] & ...` as one Buchi signal:
+    flag `<name>.f<i>` remembers that `fair_lits[i]` was seen,
+    and all flags are cleared when every literal was seen (encodes `spec_2_smv.build_fairness_flag_module`).
+    :return: literal of `fair`, true iff every literal was seen since the last `fair`
+    """
+    flags = [builder.add_latch('%s.f%i' % (name, i)) for i in range(len(fair_lits))]
+    seen = [builder.or_(f, lit) for (f, lit) in zip(flags, fair_lits)]
+    fair = builder.and_all(seen)
+    for (f, s) in zip(flags, seen):
+        builder.set_latch_next(f, builder.and_(s, negate(fair)))
+    return fair
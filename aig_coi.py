@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Split a model into one model per property, each reduced to the cone of influence of its property.
+
+The properties are numbered like `get_nof_properties.py` and IIMC (`--pi`) do:
+outputs, then bad, then justice.
+Every reduced model keeps all invariant constraints (they restrict the traces of any property),
+and the models of justice properties keep all fairness constraints.
+The only property of a reduced model has index 0.
+"""
+
+import argparse
+import os
+
+import aiger_swig.aiger_wrap as aiglib
+from aig_opt import read_circuit, simplify
+from aiger_io import read_aiger, write_aiger, get_aiger_extension
+from profiling import start_profiling
+
+
+def get_property_models(model: aiglib.aiger) -> list:
+    """
+    :return: the reduced models, in the order of properties
+    """
+    circuit = read_circuit(model)
+
+    restricted = []
+    for output in circuit.outputs:
+        restricted.append(circuit.with_properties(outputs=[output], constraints=circuit.constraints))
+    for bad in circuit.bad:
+        restricted.append(circuit.with_properties(bad=[bad], constraints=circuit.constraints))
+    for justice in circuit.justice:
+        restricted.append(circuit.with_properties(justice=[justice], constraints=circuit.constraints,
+                                                  fairness=circuit.fairness))
+
+    return [simplify(c, keep_inputs=False) for c in restricted]
+
+
+def get_property_file_name(out_dir, i, binary=False) -> str:
+    return os.path.join(out_dir, 'p%i' % i + get_aiger_extension(binary))
+
+
+def write_property_models(filename, out_dir, binary=False) -> list:
+    """ :return: names of the written files, in the order of properties """
+    model = read_aiger(filename)
+
+    os.makedirs(out_dir, exist_ok=True)
+    file_names = []
+    for i, property_model in enumerate(get_property_models(model)):
+        file_name = get_property_file_name(out_dir, i, binary)
+        write_aiger(property_model, file_name)
+        file_names.append(file_name)
+
+    return file_names
+
+
+def main(filename, out_dir, binary=False):
+    for file_name in write_property_models(filename, out_dir, binary):
+        print(file_name)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Write one AIGER model per property (outputs, bad, justice), '
+                                                 'containing only the cone of influence of the property '
+                                                 'and the constraints. Prints the names of the written files.')
+
+    parser.add_argument('aiger', metavar='aiger', type=str,
+                        help='input AIGER file')
+    parser.add_argument('out_dir', metavar='out_dir', type=str,
+                        help='directory for models p<i>.aag, i is the index of the property')
+    parser.add_argument('--binary', action='store_true', default=False,
+                        help='write the binary AIGER format (models p<i>.aig)')
+    parser.add_argument('--profile', default=None, metavar='FILE',
+                        help='write the profile (Chrome trace JSON, see profiling.py) into this file')
+
+    args = parser.parse_args()
+    if args.profile:
+        start_profiling(args.profile)
+
+    exit(main(args.aiger, args.out_dir, args.binary))
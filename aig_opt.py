@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Simplification of AIGER circuits:
+  - constant propagation, including latches that never leave their initial value
+    (found by ternary simulation),
+  - trivial-AND elimination (`x&x`, `x&!x`, `x&1`, `x&0`),
+  - structural hashing (equal ANDs are merged),
+  - dead-logic removal (ANDs and latches outside the cone of influence of
+    outputs, bad, constraints, justice and fairness; inputs are always kept),
+and the result is reencoded.
+"""
+
+import argparse
+import logging
+
+import aiger_swig.aiger_wrap as aiglib
+from aig_builder import AigBuilder
+from aiger_io import read_aiger, write_aiger_to
+from profiling import span, start_profiling
+
+logger = logging.getLogger(__name__)
+
+_X = None  # unknown value in ternary simulation
+
+
+def _var(lit: int) -> int:
+    return lit >> 1
+
+
+def _get_and_order(roots, rhs_by_and_var: dict) -> list:
+    """ :return: variables of ANDs in the cone of `roots` (literals), in topological order """
+    order = []
+    visited = set()
+    for root in roots:
+        stack = [(_var(root), False)]
+        while stack:
+            v, is_expanded = stack.pop()
+            if is_expanded:
+                order.append(v)
+                continue
+            if v in visited or v not in rhs_by_and_var:
+                continue
+            visited.add(v)
+            stack.append((v, True))
+            stack.extend((_var(r), False) for r in rhs_by_and_var[v])
+    return order
+
+
+def _get_constant_latches(latches, rhs_by_and_var: dict) -> dict:
+    """
+    :param latches: list of (lit, next, reset, name)
+    :return: var |-> value of the latches that always keep their initial value
+    """
+    candidates = dict((_var(lit), reset) for (lit, _, reset, _) in latches if reset in (0, 1))
+    next_by_var = dict((_var(lit), next_lit) for (lit, next_lit, _, _) in latches)
+
+    while True:
+        # assume the candidates are constant, and check that their next values agree
+        value_by_var = dict(candidates)
+        value_by_var[0] = 0
+        for v in _get_and_order((next_by_var[c] for c in candidates), rhs_by_and_var):
+            r0, r1 = (_lit_value(r, value_by_var) for r in rhs_by_and_var[v])
+            value_by_var[v] = 0 if 0 in (r0, r1) else (1 if r0 == r1 == 1 else _X)
+
+        stable = dict((c, value) for (c, value) in candidates.items()
+                      if _lit_value(next_by_var[c], value_by_var) == value)
+        if len(stable) == len(candidates):
+            return candidates
+        candidates = stable
+
+
+def _lit_value(lit: int, value_by_var: dict):
+    value = value_by_var.get(_var(lit), _X)
+    return value if value is _X else value ^ (lit & 1)
+
+
+class Circuit:
+    """ Plain Python copy of an `aiger` model (literals are the ones of the model). """
+
+    def __init__(self, inputs, latches, rhs_by_and_var, outputs, bad, constraints, justice, fairness):
+        self.inputs = inputs                  # (lit, name)
+        self.latches = latches                # (lit, next, reset, name)
+        self.rhs_by_and_var = rhs_by_and_var  # var |-> (rhs0, rhs1)
+        self.outputs = outputs                # (lit, name)
+        self.bad = bad                        # (lit, name)
+        self.constraints = constraints        # (lit, name)
+        self.justice = justice                # (lits, name)
+        self.fairness = fairness              # (lit, name)
+
+    def with_properties(self, outputs=(), bad=(), constraints=(), justice=(), fairness=()) -> 'Circuit':
+        return Circuit(self.inputs, self.latches, self.rhs_by_and_var,
+                       list(outputs), list(bad), list(constraints), list(justice), list(fairness))
+
+    def to_aiger(self) -> aiglib.aiger:
+        """ :return: new model with the literals of the circuit (more gates may be added to it) """
+        model = aiglib.aiger_init()
+        for (lit, name) in self.inputs:
+            aiglib.aiger_add_input(model, lit, name)
+        for (lit, next_lit, reset, name) in self.latches:
+            aiglib.aiger_add_latch(model, lit, next_lit, name)
+            if reset != 0:
+                aiglib.aiger_add_reset(model, lit, reset)
+        for v, (rhs0, rhs1) in self.rhs_by_and_var.items():
+            aiglib.aiger_add_and(model, 2 * v, rhs0, rhs1)
+        for (lit, name) in self.outputs:
+            aiglib.aiger_add_output(model, lit, name)
+        for (lit, name) in self.bad:
+            aiglib.aiger_add_bad(model, lit, name)
+        for (lit, name) in self.constraints:
+            aiglib.aiger_add_constraint(model, lit, name)
+        for (lits, name) in self.justice:
+            aiglib.aiger_add_justice(model, len(lits), lits, name)
+        for (lit, name) in self.fairness:
+            aiglib.aiger_add_fairness(model, lit, name)
+        return model
+
+
+def read_circuit(model: aiglib.aiger) -> Circuit:
+    rhs_by_and_var = dict()
+    for i in range(model.num_ands):
+        a = aiglib.get_ith_and(model, i)
+        rhs_by_and_var[_var(a.lhs)] = (a.rhs0, a.rhs1)
+
+    def symbols(get_ith, num):
+        return [(s.lit, s.name) for s in (get_ith(model, i) for i in range(num))]
+
+    justice = []
+    for j in range(model.num_justice):
+        s = aiglib.get_ith_justice(model, j)
+        justice.append(([aiglib.get_justice_lit(model, j, i) for i in range(s.size)], s.name))
+
+    return Circuit(symbols(aiglib.get_ith_input, model.num_inputs),
+                   [(s.lit, s.next, s.reset, s.name)
+                    for s in (aiglib.get_ith_latch(model, i) for i in range(model.num_latches))],
+                   rhs_by_and_var,
+                   symbols(aiglib.get_ith_output, model.num_outputs),
+                   symbols(aiglib.get_ith_bad, model.num_bad),
+                   symbols(aiglib.get_ith_constraint, model.num_constraints),
+                   justice,
+                   symbols(aiglib.get_ith_fairness, model.num_fairness))
+
+
+def optimize(model: aiglib.aiger) -> aiglib.aiger:
+    """
+    :return: new simplified model (`model` is not changed)
+    """
+    with span('aig_optimization', latches=model.num_latches, ands=model.num_ands):
+        result = simplify(read_circuit(model))
+    logger.info('optimized AIG: latches %i -> %i, ANDs %i -> %i',
+                model.num_latches, result.num_latches, model.num_ands, result.num_ands)
+    return result
+
+
+def simplify(circuit: Circuit, keep_inputs: bool=True) -> aiglib.aiger:
+    """
+    :param keep_inputs: if False, the inputs outside the cone of influence of the properties are removed
+    """
+    rhs_by_and_var = circuit.rhs_by_and_var
+    constant_by_var = _get_constant_latches(circuit.latches, rhs_by_and_var)
+
+    # the cone of influence of the properties
+    latch_by_var = dict((_var(l[0]), l) for l in circuit.latches)
+    roots = [lit for (lit, _) in circuit.outputs + circuit.bad + circuit.constraints + circuit.fairness] + \
+            [lit for (lits, _) in circuit.justice for lit in lits]
+    used_latch_vars = set()
+    frontier = roots
+    while frontier:
+        new_latches = set(v for v in (_var(lit) for lit in frontier) if v in latch_by_var) | \
+                      set(_var(r) for v in _get_and_order(frontier, rhs_by_and_var)
+                          for r in rhs_by_and_var[v] if _var(r) in latch_by_var)
+        new_latches = new_latches.difference(used_latch_vars, constant_by_var)
+        used_latch_vars.update(new_latches)
+        frontier = [latch_by_var[v][1] for v in new_latches]
+
+    kept_latches = [l for l in circuit.latches if _var(l[0]) in used_latch_vars]
+    latch_nexts = [next_lit for (_, next_lit, _, _) in kept_latches]
+    and_order = _get_and_order(roots + latch_nexts, rhs_by_and_var)
+
+    inputs = circuit.inputs
+    if not keep_inputs:
+        used_vars = set(_var(lit) for lit in roots + latch_nexts)
+        used_vars.update(_var(r) for v in and_order for r in rhs_by_and_var[v])
+        inputs = [(lit, name) for (lit, name) in inputs if _var(lit) in used_vars]
+
+    builder = AigBuilder()
+    new_lit_by_var = {0: 0}
+    for v, value in constant_by_var.items():
+        new_lit_by_var[v] = value
+    for (lit, name) in inputs:
+        new_lit_by_var[_var(lit)] = builder.add_input(name)
+    for (lit, _, reset, name) in kept_latches:
+        init = None if reset == lit else reset == 1
+        new_lit_by_var[_var(lit)] = builder.add_latch(name, init)
+
+    def new_lit(lit):
+        return new_lit_by_var[_var(lit)] ^ (lit & 1)
+
+    for v in and_order:
+        r0, r1 = rhs_by_and_var[v]
+        new_lit_by_var[v] = builder.and_(new_lit(r0), new_lit(r1))
+
+    for (lit, next_lit, _, _) in kept_latches:
+        builder.set_latch_next(new_lit_by_var[_var(lit)], new_lit(next_lit))
+    for (lit, name) in circuit.outputs:
+        builder.add_output(new_lit(lit), name)
+    for (lit, name) in circuit.bad:
+        builder.add_bad(new_lit(lit), name)
+    for (lit, name) in circuit.constraints:
+        builder.add_constraint(new_lit(lit), name)
+    for (lits, name) in circuit.justice:
+        builder.add_justice(map(new_lit, lits), name)
+    for (lit, name) in circuit.fairness:
+        builder.add_fairness(new_lit(lit), name)
+
+    result = builder.to_aiger()
+    aiglib.aiger_reencode(result)
+    return result
+
+
+def main(filename, out, binary=False):
+    write_aiger_to(optimize(read_aiger(filename)), out, binary)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Simplify AIGER circuit: constant propagation, '
+                                                 'structural hashing, dead-logic removal, reencoding. '
+                                                 'Inputs are never removed.')
+
+    parser.add_argument('aiger', metavar='aiger', nargs='?',
+                        type=str, default='/dev/stdin',
+                        help='input AIGER file (default stdin)')
+
+    parser.add_argument('out', metavar='out', nargs='?',
+                        type=argparse.FileType('w'), default='-',
+                        help='output file name (default stdout)')
+    parser.add_argument('--binary', action='store_true', default=False,
+                        help='write the binary AIGER format (aig) instead of the ASCII one (aag)')
+    parser.add_argument('--profile', default=None, metavar='FILE',
+                        help='write the profile (Chrome trace JSON, see profiling.py) into this file')
+
+    args = parser.parse_args()
+    if args.profile:
+        start_profiling(args.profile)
+
+    exit(main(args.aiger, args.out, args.binary))
@@ -0,0 +1,106 @@
+"""
+Reading and writing AIGER models (aiger_swig), traced when profiling (see profiling.py).
+
+The readers accept both the ASCII (`aag`) and the binary (`aig`) format;
+the writers use the binary format if given `binary` (or, for files, the extension is not `.aag`).
+Models are written into file descriptors and read from buffers directly,
+without a copy of the whole model text (streams without descriptors go through temporary files).
+"""
+
+import io
+import shutil
+import tempfile
+
+import aiger_swig.aiger_wrap as aiglib
+from profiling import span
+
+
+def _size_args(model: aiglib.aiger) -> dict:
+    return {'inputs': model.num_inputs, 'latches': model.num_latches, 'ands': model.num_ands}
+
+
+def read_aiger(file_name: str) -> aiglib.aiger:
+    with span('aiger_read', file=file_name):
+        model = aiglib.aiger_init()
+        error = aiglib.aiger_open_and_read_from_file(model, file_name)
+    assert not error, error
+    return model
+
+
+def read_aiger_from_bytes(data) -> aiglib.aiger:
+    """
+    :param data: the model in either format: `bytes`, `bytearray`, `memoryview`, `mmap`, ...
+                 (read in place, without copying)
+    """
+    with span('aiger_read', size=len(data)):
+        model = aiglib.aiger_init()
+        error = aiglib.aiger_read_from_buffer(model, data)
+    assert not error, error
+    return model
+
+
+def read_aiger_from_string(string: str) -> aiglib.aiger:
+    return read_aiger_from_bytes(string.encode())
+
+
+def aiger_to_string(model: aiglib.aiger) -> str:
+    """
+    :return: the model in the ASCII format
+    NOTE: the model goes through a temporary file on disk (aiger_swig writes into files),
+          prefer `write_aiger_to` where the result is written anyway.
+    """
+    out = io.StringIO()
+    write_aiger_to(model, out)
+    return out.getvalue()
+
+
+def get_aiger_extension(binary: bool) -> str:
+    return '.aig' if binary else '.aag'
+
+
+def write_aiger_to(model: aiglib.aiger, out, binary: bool=False):
+    """
+    Write the model into the file object `out` (e.g., `sys.stdout`).
+    If `out` has a file descriptor, aiger_swig writes into it directly, without building the model text in memory;
+    otherwise (e.g., `io.StringIO`) the model goes through a temporary file.
+    """
+    try:
+        fd = out.fileno()
+    except (AttributeError, io.UnsupportedOperation):
+        _write_aiger_through_tmp_file(model, out, binary)
+        return
+
+    out.flush()
+    _write_aiger_to_fd(model, fd, binary)
+    if out.seekable():  # the descriptor moved, and the file object should see it
+        out.seek(0, 2)
+
+
+def _write_aiger_to_fd(model: aiglib.aiger, fd: int, binary: bool):
+    mode = aiglib.aiger_binary_mode if binary else aiglib.aiger_ascii_mode
+    with span('aiger_write', **_size_args(model)):
+        res = aiglib.aiger_write_to_fd(model, mode, fd)
+    assert res != 0, 'writing failure'
+
+
+def _write_aiger_through_tmp_file(model: aiglib.aiger, out, binary: bool):
+    with tempfile.TemporaryFile(prefix='aiger_', suffix=get_aiger_extension(binary)) as f:
+        _write_aiger_to_fd(model, f.fileno(), binary)
+        f.seek(0)
+        if not isinstance(out, io.TextIOBase):
+            shutil.copyfileobj(f, out)
+            return
+        assert not binary, 'the binary format cannot be written into a text stream'
+        text = io.TextIOWrapper(f)
+        shutil.copyfileobj(text, out)
+        text.detach()  # `f` is closed by `with`
+
+
+def write_aiger(model: aiglib.aiger, file_name: str):
+    """
+    The format is given by the extension of `file_name` (`.aag` is ASCII, see aiger.h);
+    the model is written into the file directly.
+    """
+    with span('aiger_write', file=file_name, **_size_args(model)):
+        res = aiglib.aiger_open_and_write_to_file(model, file_name)
+    assert res != 0, 'writing failure: ' + file_name
@@ -2,6 +2,8 @@
 
 %{
 #define SWIG_FILE_WITH_INIT
+#include <stdio.h>
+#include <unistd.h>
 #include "aiger.h"
 static int index_err = 0;
 %}
@@ -62,11 +64,53 @@ aiger_redefine_input_as_and (aiger* public, unsigned input_lit, unsigned rhs0, u
 
 %inline %{
 
-/*
 aiger_symbol* get_ith_input(aiger* public, unsigned i) {
+  if (i < public->num_inputs)
     return public->inputs + i;
+
+  index_err = 1;
+  return NULL;
+}
+
+aiger_symbol* get_ith_output(aiger* public, unsigned i) {
+  if (i < public->num_outputs)
+    return public->outputs + i;
+
+  index_err = 1;
+  return NULL;
+}
+
+aiger_symbol* get_ith_bad(aiger* public, unsigned i) {
+  if (i < public->num_bad)
+    return public->bad + i;
+
+  index_err = 1;
+  return NULL;
+}
+
+aiger_symbol* get_ith_constraint(aiger* public, unsigned i) {
+  if (i < public->num_constraints)
+    return public->constraints + i;
+
+  index_err = 1;
+  return NULL;
+}
+
+aiger_symbol* get_ith_justice(aiger* public, unsigned i) {
+  if (i < public->num_justice)
+    return public->justice + i;
+
+  index_err = 1;
+  return NULL;
+}
+
+aiger_and* get_ith_and(aiger* public, unsigned i) {
+  if (i < public->num_ands)
+    return public->ands + i;
+
+  index_err = 1;
+  return NULL;
 }
-*/
 
 aiger_symbol* get_ith_latch(aiger* public, unsigned i) {
   if (i < public->num_latches)
@@ -111,4 +155,69 @@ void set_justice_lit(aiger* public,
 
 
 
+/* Streaming: writing into file descriptors and reading from buffers,
+   without copying the whole model into a string. */
+
+/* any object with the buffer protocol: bytes, bytearray, memoryview, mmap, ... */
+%typemap(in) (const char *buffer, size_t size) (Py_buffer view)
+{
+  if (PyObject_GetBuffer($input, &view, PyBUF_SIMPLE) != 0)
+    SWIG_fail;
+  $1 = (char *) view.buf;
+  $2 = (size_t) view.len;
+}
+%typemap(argout) (const char *buffer, size_t size)
+{
+  PyBuffer_Release(&view$argnum);
+}
+
+%{
+typedef struct
+{
+  const char *buffer;
+  size_t size;
+  size_t pos;
+} aiger_swig_reader;
+
+static int aiger_swig_get (aiger_swig_reader *reader) {
+  if (reader->pos == reader->size)
+    return EOF;
+  return (unsigned char) reader->buffer[reader->pos++];
+}
+%}
+
+%inline %{
+
+/* Same return values as `aiger_read_generic`, both formats are accepted. */
+const char *aiger_read_from_buffer (aiger *public, const char *buffer, size_t size) {
+  aiger_swig_reader reader = {buffer, size, 0};
+  return aiger_read_generic (public, &reader, (aiger_get) aiger_swig_get);
+}
+
+/* Same return values as `aiger_write_to_file`.
+   `fd` stays open (the stream uses its duplicate), and Python buffers of `fd` should be flushed before. */
+int aiger_write_to_fd (aiger *public, aiger_mode mode, int fd) {
+  int res, dup_fd;
+  FILE *file;
+
+  dup_fd = dup (fd);
+  if (dup_fd < 0)
+    return 0;
+
+  file = fdopen (dup_fd, "w");
+  if (!file) {
+    close (dup_fd);
+    return 0;
+  }
+
+  res = aiger_write_to_file (public, mode, file);
+  if (fclose (file))
+    res = 0;
+  return res;
+}
+
+%}
+
+
+
 
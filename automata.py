@@ -1,27 +1,33 @@
 from re import search, sub
-from os import remove
-from xml.etree import ElementTree
 import logging
 
-from common import reduces_to_true
-from goal_utils import get_tmp_file_name, execute_goal_script, execute_translation, strip_unused_symbols
+from automaton_cache import AutomatonCache
+from gff_reader import read_gff, read_gff_string
+from goal_utils import get_tmp_file_name, remove_tmp_file, execute_goal_script, execute_translation, \
+    strip_unused_symbols, translation_statement
+from labels import is_tautology_cubes
+from profiling import span
 from python_ext import readfile
+import safety_det
 from siregex import to_regex, regex_to_proposition
-from structs import Automaton, SpecType, PropertySpec
+from structs import CompactAutomaton, SpecType, PropertySpec
 
 logger = logging.getLogger(__name__)
 
+# change when GOAL scripts or the post-processing change:
+# cached automata built by other versions are ignored
+GOAL_SCRIPT_VERSION = '2'
 
-def automaton_from_gff(gff: str, complement: bool=False) -> Automaton:
-    gff = strip_unused_symbols(gff)
+LTL_TRANSLATION_OPTIONS = "-m ltl2ba -t nbw"
+PLTL_TRANSLATION_OPTIONS = "-m pltl2ba -t nbw"
+ORE_TRANSLATION_OPTIONS = "-se -sa"
 
-    input_file_name = get_tmp_file_name()
-    output_file_name = get_tmp_file_name()
-    output_file_name2 = get_tmp_file_name()
-
-    with open(input_file_name, 'w') as f:
-        f.write(gff)
 
+def determinization_script(input_file_name, complement, output_file_name, output_file_name2) -> str:
+    """
+    :return: GOAL script that determinizes the automaton from `input_file_name`,
+             and saves it with minimal (`output_file_name`) and maximal (`output_file_name2`) acceptance sets
+    """
     complement_stmnt = '' if not complement else '\n$res = complement $res;'
     goal_script = """
 $res = load "{input_file_name}"; {complement_stmnt}
@@ -35,33 +41,136 @@ save $res {output_file_name2};
            input_file_name=input_file_name,
            output_file_name=output_file_name,
            output_file_name2=output_file_name2)
+    return goal_script
 
-    execute_goal_script(goal_script)
 
-    gff = readfile(output_file_name)
-    gff2 = readfile(output_file_name2)
+def automaton_from_det_gffs(gff, gff2) -> CompactAutomaton:
+    """
+    :param gff, gff2: determinized automaton with minimal and maximal acceptance sets
+                      (file names of GOAL's output, or GffAutomaton)
+    """
+
+    read = lambda g: read_gff(g) if isinstance(g, str) else g
 
-    init_state2, states2, edges2, acc_states2 = gff_2_automaton_params(gff2)
-    nacc_trap_states2 = get_nacc_trap_states(states2, acc_states2, edges2)
-    if set(nacc_trap_states2).union(acc_states2) == set(states2):
+    automaton2 = CompactAutomaton.from_params(*gff_2_automaton_params(read(gff2)))
+    nacc_trap_states2 = get_nacc_trap_states(automaton2)
+    if len(nacc_trap_states2.union(automaton2.acc_states)) == len(automaton2.state_names):
         # safety automaton
-        automaton = Automaton(states2, init_state2, acc_states2, nacc_trap_states2, True, tuple(edges2.items()))
+        automaton2.dead_states = nacc_trap_states2
+        automaton2.is_safety = True
+        automaton = automaton2
     else:
         # contains both dead states, and accepting states
-        init_state, states, edges, acc_states = gff_2_automaton_params(gff)
-        nacc_trap_states = get_nacc_trap_states(states, acc_states, edges)
-        automaton = Automaton(states, init_state, acc_states, nacc_trap_states, False, tuple(edges.items()))
+        automaton = CompactAutomaton.from_params(*gff_2_automaton_params(read(gff)))
+        automaton.dead_states = get_nacc_trap_states(automaton)
 
     logger.info('after all manipulations: %s', ['liveness', 'safety'][automaton.is_safety])
 
-    remove(input_file_name)
-    remove(output_file_name)
-    remove(output_file_name2)
-
     return automaton
 
 
-def automaton_from_spec(spec: PropertySpec) -> Automaton:
+def automaton_from_gff(gff: str, complement: bool=False) -> CompactAutomaton:
+    return automata_from_gffs([(gff, complement)])[0]
+
+
+def automata_from_gffs(gffs_complement, native: bool=True) -> list:
+    """
+    Determinize all automata in one GOAL script.
+    Safety and co-safety automata are determinized without GOAL if `native` is set.
+    :param gffs_complement: list of pairs (gff, complement)
+    """
+    automata = [None] * len(gffs_complement)
+    parsed = [read_gff_string(gff) for (gff, _) in gffs_complement]
+    if native:
+        for i, (_, complement) in enumerate(gffs_complement):
+            nbw = gff_2_nbw_params(parsed[i])
+            if nbw is not None:
+                automata[i] = safety_det.determinize(*nbw, complement=complement)
+
+    todo = [i for (i, a) in enumerate(automata) if a is None]
+    if not todo:
+        return automata
+
+    file_names = []
+    try:
+        goal_script = []
+        for i in todo:
+            gff, complement = gffs_complement[i]
+            input_file_name = get_tmp_file_name()
+            output_file_name = get_tmp_file_name()
+            output_file_name2 = get_tmp_file_name()
+            file_names.append((input_file_name, output_file_name, output_file_name2))
+
+            with open(input_file_name, 'w') as f:
+                f.write(strip_unused_symbols(gff, parsed[i].used_propositions))
+
+            goal_script.append(determinization_script(input_file_name, complement,
+                                                      output_file_name, output_file_name2))
+
+        execute_goal_script(''.join(goal_script))
+
+        for i, (_, output_file_name, output_file_name2) in zip(todo, file_names):
+            automata[i] = automaton_from_det_gffs(output_file_name, output_file_name2)
+        return automata
+    finally:
+        for names in file_names:
+            for name in names:
+                remove_tmp_file(name)
+
+
+def automata_from_specs(specs, cache: AutomatonCache=None) -> list:
+    """
+    Batch version of `automaton_from_spec`:
+    all translations are done in one GOAL script, and all determinizations in another one,
+    so GOAL is called at most twice however many properties there are.
+    Errors are reported for the whole batch.
+    :return: automata in the order of `specs`
+    """
+
+    automata = [cache.get(spec) if cache is not None else None
+                for spec in specs]
+    todo = [i for (i, a) in enumerate(automata) if a is None]
+    if not todo:
+        return automata
+
+    logger.info('building automata for %i properties in batch', len(todo))
+
+    gff_by_i = dict()
+    translation_file_by_i = dict()
+    try:
+        translation_script = []
+        for i in todo:
+            spec = specs[i]
+            if spec.type == SpecType.AUTOMATON_SPEC:
+                gff_by_i[i] = readfile(spec.data)
+                continue
+            translation_file_by_i[i] = get_tmp_file_name("goal_trans_")
+            translation_script.append(translation_statement_for_spec(spec, translation_file_by_i[i]))
+
+        if translation_script:
+            execute_goal_script('\n'.join(translation_script))
+
+        for i, file_name in translation_file_by_i.items():
+            gff = readfile(file_name)
+            if specs[i].type == SpecType.ORE_SPEC:
+                gff = ore_gff_to_propositional(gff)
+            gff_by_i[i] = gff
+    finally:
+        for file_name in translation_file_by_i.values():
+            remove_tmp_file(file_name)
+
+    new_automata = automata_from_gffs([(gff_by_i[i], not specs[i].is_positive)
+                                       for i in todo])
+
+    for i, automaton in zip(todo, new_automata):
+        automata[i] = automaton
+        if cache is not None:
+            cache.put(specs[i], automaton)
+
+    return automata
+
+
+def automaton_from_spec(spec: PropertySpec, cache: AutomatonCache=None) -> CompactAutomaton:
     """
     We return an automaton that is 'positive deterministic Buchi'
     (we complement negated ones)
@@ -74,8 +183,15 @@ def automaton_from_spec(spec: PropertySpec) -> Automaton:
       - non-acc trap      (aka `dead`)
 
     NOTE we should never fall-out of the automaton.
+
+    If `cache` is given, the automaton is looked up there first and stored there after building.
     """
 
+    if cache is not None:
+        automaton = cache.get(spec)
+        if automaton is not None:
+            return automaton
+
     logger.info('building automaton from spec "%s" of type %s', spec.desc, spec.type)
     logger.debug(spec)
     # TODO better spec parsing
@@ -84,58 +200,66 @@ def automaton_from_spec(spec: PropertySpec) -> Automaton:
                SpecType.PLTL_SPEC: pltl_2_automaton_gff,
                SpecType.ORE_SPEC: ore_2_automaton_gff}
 
-    gff = get_gff[spec.type](spec.data)
+    with span('automaton', spec=spec.desc, type=str(spec.type)):
+        gff = get_gff[spec.type](spec.data)
 
-    return automaton_from_gff(gff, not spec.is_positive)
+        automaton = automaton_from_gff(gff, not spec.is_positive)
 
+    if cache is not None:
+        cache.put(spec, automaton)
 
-def get_nacc_trap_states(states, acc_states, edges):
-    nacc_states = set(states).difference(acc_states)
-    nacc_trap_states = set()
+    return automaton
 
-    for s in nacc_states:
-        s_edges = edges.get((s, s))
-        if s_edges:
-            if reduces_to_true(s_edges):
-                nacc_trap_states.add(s)  # TODOopt: also replace edges with one trivial
 
-    return nacc_trap_states
+def get_nacc_trap_states(automaton: CompactAutomaton) -> frozenset:
+    nacc_trap_states = set()
 
+    for s in range(len(automaton.state_names)):
+        if s in automaton.acc_states:
+            continue
+        s_labels = automaton.self_loop_labels(s)
+        if s_labels and is_tautology_cubes(frozenset(s_labels)):
+            nacc_trap_states.add(s)  # TODOopt: also replace edges with one trivial
 
-def gff_2_automaton_params(gff_xml: str):  # -> init, states, edges (dict (src,dst) |-> labels), acc
-    # TODOopt: (boolean) simplify transitions labels
-    # """
-    # >>> print(gff_2_automaton(readfile('/tmp/tmp.gff')))
-    # """
-    states = set()
-    edges = dict()  # (src,dst) -> set of labels
-    root = ElementTree.fromstring(gff_xml)
+    return frozenset(nacc_trap_states)
 
-    for transition_element in root.iter('Transition'):
-        src = transition_element.find('From').text
-        dst = transition_element.find('To').text
-        lbl = transition_element.find('Label').text
 
-        states.add(src)
-        states.add(dst)
+def gff_2_automaton_params(gff) -> tuple:  # -> init, states, edges (dict (src,dst) |-> labels), acc
+    """ :param gff: GffAutomaton, or the XML text """
+    # labels are minimized when emitting SMV (see spec_2_smv.get_case_split)
+    if isinstance(gff, str):
+        gff = read_gff_string(gff)
+    return gff.init_state, gff.states, gff.edges, gff.acc_states
 
-        if (src, dst) not in edges:
-            edges[(src, dst)] = set()
 
-        edges[(src, dst)].add(tuple(lbl.split()))
+def gff_2_nbw_params(gff) -> tuple or None:  # -> init states, edges (dict (src,dst) |-> labels), acc
+    """
+    :param gff: GffAutomaton, or the XML text
+    :return: None if the automaton is not Buchi
+    """
+    if isinstance(gff, str):
+        gff = read_gff_string(gff)
+    if gff.acc_type != 'Buchi':
+        return None
+    return set(gff.init_states), gff.edges, gff.acc_states
 
-    init_state = root.find('InitialStateSet').find('StateID').text
-    acc_states = set(elem.text for elem in root.find('Acc').iter('StateID'))
 
-    return init_state, states, edges, acc_states
+def translation_statement_for_spec(spec: PropertySpec, output_file_name) -> str:
+    if spec.type == SpecType.LTL_SPEC:
+        return translation_statement("QPTL", spec.data, LTL_TRANSLATION_OPTIONS, output_file_name)
+    if spec.type == SpecType.PLTL_SPEC:
+        return translation_statement("QPTL", spec.data, PLTL_TRANSLATION_OPTIONS, output_file_name)
+    if spec.type == SpecType.ORE_SPEC:
+        return translation_statement("ORE", ore_2_goal_regex(spec.data), ORE_TRANSLATION_OPTIONS, output_file_name)
+    assert False, "SpecType " + str(spec.type) + " can not be translated."
 
 
 def ltl_2_automaton_gff(ltl: str) -> str:
-    return execute_translation("QPTL", ltl, "-m ltl2ba -t nbw")
+    return execute_translation("QPTL", ltl, LTL_TRANSLATION_OPTIONS)
 
 
 def pltl_2_automaton_gff(ltl: str) -> str:
-    return execute_translation("QPTL", ltl, "-m pltl2ba -t nbw")
+    return execute_translation("QPTL", ltl, PLTL_TRANSLATION_OPTIONS)
 
 
 def check_correct_ore(omega_regex: str):
@@ -145,15 +269,21 @@ def check_correct_ore(omega_regex: str):
     assert not match, "\"%s\" contains illegal sequence '_and_'" % omega_regex
 
 
-def ore_2_automaton_gff(omega_regex: str) -> str:
+def ore_2_goal_regex(omega_regex: str) -> str:
     check_correct_ore(omega_regex)
     w_regex = to_regex(omega_regex)
     w_regex = sub("([\W])(?:[Tt]rue|\.)([\W])", "\\1True\\2", w_regex)
+    return w_regex
+
 
-    result = execute_translation("ORE", w_regex, "-se -sa")
+def ore_gff_to_propositional(gff: str) -> str:
     result = sub("<Alphabet type=\"Classical\">",
                  "<Alphabet type=\"Propositional\">",
-                 result)
+                 gff)
     result = regex_to_proposition(result)
-
     return result
+
+
+def ore_2_automaton_gff(omega_regex: str) -> str:
+    result = execute_translation("ORE", ore_2_goal_regex(omega_regex), ORE_TRANSLATION_OPTIONS)
+    return ore_gff_to_propositional(result)
@@ -0,0 +1,124 @@
+"""
+Persistent cache of automata built from property specifications.
+
+An entry is keyed by the hash of the spec text (the file content for `.gff` specs),
+its polarity, its type, and the version of GOAL scripts used to build automata,
+so editing one property invalidates only the entry of that property.
+Entries are zlib-compressed JSON files; the least recently used entries
+are removed when the cache grows beyond its size limit.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import zlib
+
+from python_ext import readfile
+from structs import CompactAutomaton, PropertySpec, SpecType
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'),
+                                 'spec-framework')
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024  # bytes
+ENTRY_SUFFIX = '.aut.z'
+ENTRY_FORMAT = '2'  # change with `automaton_to_bytes`: entries of other formats are ignored
+
+
+def automaton_to_bytes(automaton: CompactAutomaton) -> bytes:
+    data = {'states': automaton.state_names,
+            'init': automaton.init_state,
+            'acc': sorted(automaton.acc_states),
+            'dead': sorted(automaton.dead_states),
+            'safety': automaton.is_safety,
+            'propositions': automaton.propositions,
+            'succ': automaton.succ}
+    return zlib.compress(json.dumps(data, separators=(',', ':')).encode('utf-8'))
+
+
+def automaton_from_bytes(data: bytes) -> CompactAutomaton:
+    data = json.loads(zlib.decompress(data).decode('utf-8'))
+    succ = (tuple((dst, tuple(tuple(m) for m in labels)) for (dst, labels) in s_succ)
+            for s_succ in data['succ'])
+    return CompactAutomaton(data['states'], data['init'],
+                            data['acc'], data['dead'],
+                            data['safety'], data['propositions'], succ)
+
+
+class AutomatonCache:
+    def __init__(self, cache_dir: str=DEFAULT_CACHE_DIR, max_size: int=DEFAULT_MAX_SIZE, version: str=''):
+        """
+        :param version: entries built with other versions are never returned
+        """
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.version = version
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, spec: PropertySpec) -> str:
+        text = readfile(spec.data) if spec.type == SpecType.AUTOMATON_SPEC else spec.data
+        h = hashlib.sha256()
+        for part in (ENTRY_FORMAT, self.version, spec.type.name, str(bool(spec.is_positive)), text):
+            h.update(part.encode('utf-8'))
+            h.update(b'\0')
+        return h.hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ENTRY_SUFFIX)
+
+    def get(self, spec: PropertySpec) -> CompactAutomaton or None:
+        path = self._entry_path(self.key(spec))
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)  # mark as recently used
+        except OSError:
+            logger.debug('cache miss for "%s"', spec.desc)
+            return None
+
+        try:
+            automaton = automaton_from_bytes(data)
+        except (zlib.error, ValueError, KeyError, TypeError):  # truncated or corrupt entry
+            logger.warning('removing corrupt cache entry %s', path)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+        logger.info('cache hit for "%s"', spec.desc)
+        return automaton
+
+    def put(self, spec: PropertySpec, automaton: CompactAutomaton):
+        path = self._entry_path(self.key(spec))
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix='tmp_')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(automaton_to_bytes(automaton))
+        os.replace(tmp_path, path)  # atomic, concurrent writers of the same entry are safe
+
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(ENTRY_SUFFIX):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:  # removed by a concurrent process
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total_size = sum(size for (_, size, _) in entries)
+        for (_, size, path) in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            logger.debug('evicting cache entry %s', path)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total_size -= size
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Benchmarks of the toolchain on generated families of specifications:
+  - arbiter-<n>:  n clients, mutual exclusion and every request is granted (LTL),
+  - pipeline-<n>: n stages, every stage copies the previous one with a delay of one tick (LTL),
+  - ore-<n>:      n inputs, omega-regular properties over wide conjunctions of them (ORE).
+
+Every instance goes through spec_2_smv.py, spec_2_aag.py, liveness_2_safety.py, synt_2_hwmcc.py,
+and the wall-clock time of each call is measured (the minimum over repetitions).
+
+External tools can be replaced by recordings, to measure the Python side offline:
+  - `--record DIR` runs the real tools and saves their outputs into DIR,
+    and the automata built by GOAL go into the cache of automata `DIR/automata`,
+  - `--replay DIR` answers the calls of the aiger/smv tools with the saved outputs,
+    and GOAL is never called as long as the cache of automata has all automata.
+Without these options, the real tools are called and the cache of automata is not used.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import stat
+import subprocess
+import sys
+import tempfile
+import time
+
+from profiling import STAGES, read_stage_times
+from shell import execute_shell
+
+MY_DIR = os.path.dirname(os.path.realpath(__file__))
+
+FAMILIES = ('arbiter', 'pipeline', 'ore')
+DEFAULT_SIZES = (2, 4, 8)
+TOOLS = ('spec_2_smv', 'spec_2_aag', 'liveness_2_safety', 'synt_2_hwmcc')
+
+# tools outside this repository called by the toolchain (GOAL is replaced by the cache of automata)
+EXTERNAL_TOOLS = ('smvflatten', 'smvtoaig', 'aigtoaig', 'aigmove', 'aigstrip', 'aigor')
+
+SHIM_FLAG = '--shim'
+
+
+def _spec(inputs, outputs, sections) -> str:
+    """
+    :param sections: list of (section name, [(name, property)])
+    """
+    lines = ['MODULE main', 'VAR']
+    lines += ['  %s: boolean;' % i for i in inputs]
+    lines += ['', 'VAR --controllable']
+    lines += ['  %s: boolean;' % o for o in outputs]
+    for (section, properties) in sections:
+        lines += ['', section]
+        for (name, prop) in properties:
+            lines += ['-- #name ' + name, prop]
+    return '\n'.join(lines) + '\n'
+
+
+def generate_arbiter(n) -> str:
+    rs = ['r%i' % i for i in range(n)]
+    gs = ['g%i' % i for i in range(n)]
+    mutex = [('mutex_%i_%i' % (i, j), 'G!(%s & %s)' % (gs[i], gs[j]))
+             for i in range(n) for j in range(i + 1, n)]
+    response = [('grant_%i' % i, 'G(%s -> F %s)' % (r, g))
+                for (i, (r, g)) in enumerate(zip(rs, gs))]
+    return _spec(rs, gs, [('SYS_LTL_SPEC', mutex + response)])
+
+
+def generate_pipeline(n) -> str:
+    stages = ['i'] + ['s%i' % i for i in range(1, n + 1)]
+    copies = [('stage_%i' % (i + 1), 'G((%s -> X %s) & (!%s -> X !%s))' % (s, t, s, t))
+              for (i, (s, t)) in enumerate(zip(stages, stages[1:]))]
+    return _spec(stages[:1], stages[1:], [('ENV_LTL_SPEC', [('input_changes', 'GF i & GF !i')]),
+                                          ('SYS_LTL_SPEC', copies)])
+
+
+def generate_ore(n) -> str:
+    inputs = ['a%i' % i for i in range(n)]
+    all_inputs = ','.join(inputs)
+    no_input = ','.join('!' + a for a in inputs)
+    guarantees = [('grant_all', '!(.* %s !g {.})' % all_inputs),
+                  ('no_spurious_grant', '!(.* %s,g {.})' % no_input),
+                  ('grant_inf_often', '{!g* g}')]
+    return _spec(inputs, ['g'], [('SYS_ORE_SPEC', guarantees)])
+
+
+GENERATOR_BY_FAMILY = {'arbiter': generate_arbiter,
+                       'pipeline': generate_pipeline,
+                       'ore': generate_ore}
+
+
+def _get_record_name(tool, args, stdin: bytes) -> str:
+    h = hashlib.sha1()
+    h.update('\0'.join([tool] + args).encode())
+    h.update(b'\0')
+    h.update(stdin)
+    return h.hexdigest() + '.json'
+
+
+def run_shim(tool, recordings_dir, real_tool, args) -> int:
+    """
+    Called instead of an external tool:
+    runs `real_tool` (if not empty) and saves its output, otherwise replays the saved output.
+    """
+    stdin = sys.stdin.buffer.read()
+    record_file = os.path.join(recordings_dir, 'tools', _get_record_name(tool, args, stdin))
+
+    if real_tool:
+        proc = subprocess.run([real_tool] + args, input=stdin, stdout=subprocess.PIPE)
+        with open(record_file, 'w') as f:
+            json.dump({'tool': tool, 'args': args, 'returncode': proc.returncode,
+                       'stdout': str(proc.stdout, encoding='utf-8')}, f)
+    elif not os.path.exists(record_file):
+        print('%s: no recorded output for this input (args: %s), record it first with --record' %
+              (tool, ' '.join(args)), file=sys.stderr)
+        return 127
+
+    with open(record_file) as f:
+        record = json.load(f)
+    sys.stdout.write(record['stdout'])
+    return record['returncode']
+
+
+def install_shims(bin_dir, recordings_dir, record):
+    """ Put the shims of external tools into `bin_dir`, which should go first in PATH. """
+    os.makedirs(os.path.join(recordings_dir, 'tools'), exist_ok=True)
+    for tool in EXTERNAL_TOOLS:
+        real_tool = ''
+        if record:
+            real_tool = shutil.which(tool)
+            assert real_tool, 'cannot record %s: it is not in PATH' % tool
+        shim = os.path.join(bin_dir, tool)
+        with open(shim, 'w') as f:
+            f.write('#!/bin/sh\nexec %s %s %s %s %s %s "$@"\n' %
+                    (sys.executable, os.path.join(MY_DIR, 'bench.py'), SHIM_FLAG, tool,
+                     recordings_dir, real_tool or "''"))
+        os.chmod(shim, os.stat(shim).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+
+def _time_call(cmd, repeat) -> (float, str, str):
+    """ :return: minimal wall-clock time, and the output of the last call """
+    times = []
+    for _ in range(repeat):
+        start = time.time()
+        rc, out, err = execute_shell(cmd)
+        times.append(time.time() - start)
+        assert rc == 0, 'failed: %s\nret=%i\nerr=%s' % (cmd, rc, err)
+    return min(times), out, err
+
+
+def bench_instance(spec_file, cache_options, repeat) -> dict:
+    """
+    :return: tool or `spec_2_aag:<stage>` |-> seconds, `error` (if a call failed)
+    """
+    base = os.path.splitext(spec_file)[0]
+    timings_file = base + '.timings.json'
+    times = dict()
+    try:
+        t, out, err = _time_call(' '.join([os.path.join(MY_DIR, 'spec_2_smv.py'), cache_options, spec_file]),
+                                 repeat)
+        assert out.strip(), 'spec_2_smv.py failed:\n' + err  # it logs exceptions and exits with 0
+        times['spec_2_smv'] = t
+
+        t, aag, _ = _time_call(' '.join([os.path.join(MY_DIR, 'spec_2_aag.py'), cache_options,
+                                         '--timings', timings_file, spec_file]),
+                               repeat)
+        times['spec_2_aag'] = t
+        for (stage, seconds) in read_stage_times(timings_file).items():
+            times['spec_2_aag:' + stage] = seconds
+        with open(base + '.aag', 'w') as f:
+            f.write(aag)
+
+        times['liveness_2_safety'], _, _ = _time_call(' '.join([os.path.join(MY_DIR, 'liveness_2_safety.py'),
+                                                                base + '.aag', base + '.safety.aag']),
+                                                      repeat)
+        times['synt_2_hwmcc'], _, _ = _time_call(' '.join([os.path.join(MY_DIR, 'synt_2_hwmcc.py'),
+                                                           base + '.aag']),
+                                                 repeat)
+    except AssertionError as e:
+        times['error'] = str(e)
+
+    return dict((k, round(v, 3) if k != 'error' else v) for (k, v) in times.items())
+
+
+def compare(results, baseline, tolerance) -> list:
+    """ :return: list of (instance, key, baseline seconds, seconds) that are slower than `tolerance`*baseline """
+    regressions = []
+    for (instance, times) in sorted(results.items()):
+        for (key, seconds) in sorted(times.items()):
+            old = baseline.get(instance, dict()).get(key)
+            if key == 'error' or old is None:
+                continue
+            if seconds > old * tolerance and seconds - old > 0.01:  # ignore the noise of tiny stages
+                regressions.append((instance, key, old, seconds))
+    return regressions
+
+
+def print_results(results):
+    columns = list(TOOLS) + ['spec_2_aag:' + s for s in STAGES]
+    columns = [c for c in columns if any(c in times for times in results.values())]
+    width = max([len(i) for i in results] + [8])
+    print(' '.join(['instance'.ljust(width)] + [c.rjust(max(len(c), 8)) for c in columns]))
+    for (instance, times) in sorted(results.items()):
+        cells = [('%.3f' % times[c] if c in times else '-').rjust(max(len(c), 8)) for c in columns]
+        print(' '.join([instance.ljust(width)] + cells))
+        if 'error' in times:
+            print('  ' + times['error'])
+
+
+def main(families, sizes, repeat, work_dir, record_dir, replay_dir,
+         baseline_file, save_baseline_file, tolerance) -> int:
+    work_dir = work_dir or tempfile.mkdtemp(prefix='bench_')
+    os.makedirs(work_dir, exist_ok=True)
+
+    recordings_dir = record_dir or replay_dir
+    cache_options = '--no-cache'
+    if recordings_dir:
+        recordings_dir = os.path.abspath(recordings_dir)
+        bin_dir = os.path.join(work_dir, 'bin')
+        os.makedirs(bin_dir, exist_ok=True)
+        install_shims(bin_dir, recordings_dir, record=bool(record_dir))
+        os.environ['PATH'] = bin_dir + os.pathsep + os.environ['PATH']
+        cache_options = '--cache-dir ' + os.path.join(recordings_dir, 'automata')
+
+    results = dict()
+    for family in families:
+        for n in sizes:
+            instance = '%s-%i' % (family, n)
+            spec_file = os.path.join(work_dir, instance + '.smv')
+            with open(spec_file, 'w') as f:
+                f.write(GENERATOR_BY_FAMILY[family](n))
+            print('benchmarking ' + instance, file=sys.stderr)
+            results[instance] = bench_instance(spec_file, cache_options, repeat)
+
+    print_results(results)
+
+    if save_baseline_file:
+        with open(save_baseline_file, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    failed = [i for (i, times) in results.items() if 'error' in times]
+
+    regressions = []
+    if baseline_file:
+        with open(baseline_file) as f:
+            regressions = compare(results, json.load(f), tolerance)
+        for (instance, key, old, new) in regressions:
+            print('REGRESSION: %s %s: %.3fs -> %.3fs' % (instance, key, old, new))
+
+    return 1 if failed or regressions else 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == SHIM_FLAG:  # called by a shim (see install_shims)
+        exit(run_shim(sys.argv[2], sys.argv[3], sys.argv[4], sys.argv[5:]))
+
+    parser = argparse.ArgumentParser(description='Benchmark the toolchain on generated specifications. '
+                                                 'Exits with 1 if some call fails or is slower than the baseline.')
+
+    parser.add_argument('--families', nargs='+', choices=FAMILIES, default=FAMILIES,
+                        help='families of specifications (default: all)')
+    parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_SIZES,
+                        help='sizes of the instances (default: %(default)s)')
+    parser.add_argument('-r', '--repeat', type=int, default=1,
+                        help='call every tool this many times and take the minimal time (default %(default)s)')
+    parser.add_argument('--work-dir', default=None,
+                        help='directory for the generated specifications and results (default: new temporary)')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--record', default=None, metavar='DIR',
+                       help='save the outputs of external tools and the automata into DIR')
+    group.add_argument('--replay', default=None, metavar='DIR',
+                       help='use the outputs and automata saved with --record instead of external tools')
+    parser.add_argument('--baseline', default=None, metavar='FILE',
+                        help='compare the times with this baseline (JSON written by --save-baseline)')
+    parser.add_argument('--save-baseline', default=None, metavar='FILE',
+                        help='write the times into this file')
+    parser.add_argument('--tolerance', type=float, default=1.25,
+                        help='a time is a regression if it exceeds the baseline time times this factor '
+                             '(default %(default)s)')
+
+    args = parser.parse_args()
+
+    exit(main(args.families, args.sizes, args.repeat, args.work_dir, args.record, args.replay,
+              args.baseline, args.save_baseline, args.tolerance))
@@ -0,0 +1,103 @@
+"""
+Properties equal up to renaming of signals (e.g., per-client copies of one pattern) are translated once.
+
+A property is put into canonical form by renaming its signals into `p0, p1, ...`
+in the order of their first occurrence.
+The form is syntactic: properties with equal canonical forms have equal automata up to the renaming,
+but equivalent properties written differently may get different forms.
+"""
+
+import re
+
+from goal_utils import get_tmp_file_name
+from labels import atom_of
+from python_ext import readfile
+from structs import CompactAutomaton, PropertySpec, SpecType
+
+_LTL_IDENTIFIER = re.compile(r'[A-Za-z_][\w.]*')
+_ORE_IDENTIFIER = re.compile(r'[A-Za-z_]\w*')  # `.` is the ORE wildcard
+# temporal operators (`G`, `GF`, `S`, ...): words of these capital letters are never renamed
+_LTL_OPERATORS = re.compile('[ABEFGHORSTUVWXYZ]+')
+_KEYWORDS = ('True', 'False', 'true', 'false', 'TRUE', 'FALSE')
+
+_GFF_PROPOSITION = re.compile('(<Proposition>)([^<]*)(</Proposition>)')
+_GFF_LABEL = re.compile('(<Label>)([^<]*)(</Label>)')
+# lines that do not change the automaton (layout and comments), dropped from the canonical form
+_GFF_INFORMATIONAL = re.compile(' *<(X|Y|ControlPointX|ControlPointY|Description|Formula)>.*')
+
+
+class _Renaming:
+    def __init__(self):
+        self.name_by_signal = dict()
+
+    def __call__(self, signal: str) -> str:
+        if signal not in self.name_by_signal:
+            self.name_by_signal[signal] = 'p%i' % len(self.name_by_signal)
+        return self.name_by_signal[signal]
+
+    def signal_by_name(self) -> dict:
+        return dict((n, s) for (s, n) in self.name_by_signal.items())
+
+
+def _rename_formula(formula: str, identifier, rename) -> str:
+    """
+    >>> _rename_formula('G(r2 -> F g2) & GF !r2 & true', _LTL_IDENTIFIER, _Renaming())
+    'G(p0 -> F p1) & GF !p0 & true'
+    """
+    def rename_match(match):
+        word = match.group(0)
+        if word in _KEYWORDS or (identifier is _LTL_IDENTIFIER and _LTL_OPERATORS.fullmatch(word)):
+            return word
+        return rename(word)
+    return identifier.sub(rename_match, formula)
+
+
+def _rename_gff(gff: str, rename) -> str:
+    def rename_label(match):
+        literals = [l[:len(l) - len(atom_of(l))] + (atom_of(l) if atom_of(l) in _KEYWORDS else rename(atom_of(l)))
+                    for l in match.group(2).split()]
+        return match.group(1) + ' '.join(literals) + match.group(3)
+
+    result = []
+    inside_transitions = False  # states may have labels too
+    for l in gff.splitlines():
+        if '<TransitionSet' in l:
+            inside_transitions = True
+        elif '</TransitionSet' in l:
+            inside_transitions = False
+        elif _GFF_INFORMATIONAL.fullmatch(l):
+            continue
+        l = _GFF_PROPOSITION.sub(lambda m: m.group(1) + rename(m.group(2).strip()) + m.group(3), l)
+        if inside_transitions:
+            l = _GFF_LABEL.sub(rename_label, l)
+        result.append(l)
+    return '\n'.join(result) + '\n'
+
+
+def get_canonical_form(spec: PropertySpec) -> (tuple, dict):
+    """
+    :return: key (equal for properties equal up to renaming of signals),
+             and the renaming: canonical name |-> signal of `spec`
+    """
+    rename = _Renaming()
+    if spec.type == SpecType.AUTOMATON_SPEC:
+        text = _rename_gff(readfile(spec.data), rename)
+    else:
+        identifier = _ORE_IDENTIFIER if spec.type == SpecType.ORE_SPEC else _LTL_IDENTIFIER
+        text = _rename_formula(spec.data, identifier, rename)
+    return (spec.type, bool(spec.is_positive), text), rename.signal_by_name()
+
+
+def get_canonical_spec(spec: PropertySpec, key: tuple) -> PropertySpec:
+    """ :return: property of the canonical form `key` of `spec` (`.gff` files go into the scratch directory) """
+    spec_type, is_positive, text = key
+    data = text
+    if spec_type == SpecType.AUTOMATON_SPEC:
+        data = get_tmp_file_name('canonical_') + '.gff'
+        with open(data, 'w') as f:
+            f.write(text)
+    return PropertySpec(spec.desc, is_positive, spec.is_guarantee, data, spec_type)
+
+
+def rename_automaton(automaton: CompactAutomaton, signal_by_name: dict) -> CompactAutomaton:
+    return automaton.rename_propositions(signal_by_name)
@@ -1,14 +1,12 @@
 import sys
 import logging
 
-from sympy import true, sympify
-from sympy.core.symbol import Symbol
-from sympy.logic.boolalg import simplify_logic, false
-
 from ansistrm import ColorizingStreamHandler
+from labels import is_tautology
 
 
-def setup_logging(logger_name, verbose_level: int=0, filename: str=None):
+def setup_logging(logger_name, verbose_level: int=0, filename: str=None, log_file: bool=True):
+    """ :param log_file: also log into `filename` (default `last.log`), otherwise only into stderr """
     level = None
     if verbose_level == -1:
         level = logging.CRITICAL
@@ -23,21 +21,22 @@ def setup_logging(logger_name, verbose_level: int=0, filename: str=None):
     stdout_handler.setFormatter(formatter)
     stdout_handler.stream = sys.stderr
 
-    if not filename:
-        filename = 'last.log'
-    file_handler = logging.FileHandler(filename=filename, mode='w')
-    file_handler.setFormatter(formatter)
-
     root = logging.getLogger()
     root.addHandler(stdout_handler)
-    root.addHandler(file_handler)
+
+    if log_file:
+        if not filename:
+            filename = 'last.log'
+        file_handler = logging.FileHandler(filename=filename, mode='w')
+        file_handler.setFormatter(formatter)
+        root.addHandler(file_handler)
 
     root.setLevel(level)
 
     return logging.getLogger(logger_name)
 
 
-def reduces_to_true(clauses):
+def reduces_to_true(clauses, use_sympy: bool=False):
     """
     >>> reduces_to_true([('True',), ('a',)])
     True
@@ -51,10 +50,18 @@ def reduces_to_true(clauses):
     False
     >>> reduces_to_true(['a b'.split(), '~a ~b'.split(), '~a b'.split(), 'a ~b'.split()])
     True
-    >>> reduces_to_true(['a b'.split(), '~a ~b'.split(), '~a b'.split(), 'a ~b'.split()])
+    >>> reduces_to_true(['a b'.split(), '~a ~b'.split(), '~a b'.split(), 'a ~b'.split()], use_sympy=True)
     True
     """
 
+    if not use_sympy:
+        return is_tautology(clauses)
+
+    # sympy is slow to import and to simplify, use it only on request
+    from sympy import true, sympify
+    from sympy.core.symbol import Symbol
+    from sympy.logic.boolalg import simplify_logic, false
+
     clauses = list(clauses)
 
     expr = false
@@ -11,6 +11,12 @@ CONFIG_SH_NAME = 'config.sh'
 CONFIG_PY_TEXT = """
 AISY = '/home/ayrat/projects/aisy/aisy.py'
 GOAL = '/home/ayrat/projects/GOAL-20141117/gc'
+# long-lived GOAL process reading scripts from stdin
+GOAL_SHELL = GOAL + ' shell'
+# seconds to wait for one GOAL script (None -- no limit)
+GOAL_TIMEOUT = None
+# where to put the scratch directory of files exchanged with GOAL, e.g., '/dev/shm' (None -- the default temp dir)
+SCRATCH_DIR = None
 """
 CONFIG_SH_TEXT = """
 IIMC_CHECKER=/home/ayrat/projects/iimc-2.0/iimc
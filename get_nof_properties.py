@@ -4,8 +4,9 @@ import sys
 
 
 def get_nof_properties(hwmcc_model_file):
-    with open(hwmcc_model_file) as infile:
-        header = infile.readline()
+    # binary models (`aig`) have binary data after the header line
+    with open(hwmcc_model_file, 'rb') as infile:
+        header = infile.readline().decode('ascii')
 
     header_tokens = header.split()[1:]
 
@@ -0,0 +1,73 @@
+"""
+Single-pass reader of GOAL automata (`.gff` files).
+
+The XML is read with `iterparse`, and each `State` and `Transition` element
+is dropped right after it is processed, so the memory is bounded by the result,
+not by the size of the XML text.
+"""
+
+import io
+from xml.etree.ElementTree import iterparse
+
+from labels import atom_of, TRUE, FALSE
+
+
+class GffAutomaton:
+    def __init__(self):
+        self.init_states = []  # in the order of the file
+        self.states = set()    # states used in transitions
+        self.edges = dict()    # (src,dst) |-> set of labels
+        self.acc_states = set()
+        self.acc_type = None
+        self.alphabet = []     # declared propositions
+        self.used_propositions = set()
+
+    @property
+    def init_state(self):
+        return self.init_states[0]
+
+
+def read_gff(source) -> GffAutomaton:
+    """
+    :param source: file name or binary file object
+    """
+    result = GffAutomaton()
+    path = []  # open elements
+
+    for event, elem in iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            path.append(elem)
+            if elem.tag == 'Acc':
+                result.acc_type = elem.get('type')
+            continue
+
+        path.pop()
+        parent_tag = path[-1].tag if path else None
+
+        if elem.tag == 'Transition':
+            src = elem.findtext('From')
+            dst = elem.findtext('To')
+            lbl = tuple(elem.findtext('Label').split())
+
+            result.states.add(src)
+            result.states.add(dst)
+            result.edges.setdefault((src, dst), set()).add(lbl)
+            result.used_propositions.update(a for a in map(atom_of, lbl) if a not in (TRUE, FALSE))
+
+        elif elem.tag == 'StateID':
+            if parent_tag == 'InitialStateSet':
+                result.init_states.append(elem.text)
+            elif parent_tag == 'Acc':
+                result.acc_states.add(elem.text)
+
+        elif elem.tag == 'Proposition' and parent_tag == 'Alphabet':
+            result.alphabet.append(elem.text)
+
+        if elem.tag in ('Transition', 'State') and path and len(path[-1]) and path[-1][-1] is elem:
+            del path[-1][-1]  # processed, free the memory
+
+    return result
+
+
+def read_gff_string(gff_xml: str) -> GffAutomaton:
+    return read_gff(io.BytesIO(gff_xml.encode('utf-8')))
@@ -1,17 +1,80 @@
-from os import remove
-from tempfile import NamedTemporaryFile
+import atexit
+import itertools
 import logging
+import os
+import shutil
+import tempfile
+import threading
 
+import config
 from config import GOAL
-from python_ext import find, readfile, stripped_non_empty
+from goal_worker import create_pool, get_goal_errors, GoalWorkerPool
+from profiling import span, count
+from python_ext import readfile, stripped_non_empty
 from shell import execute_shell
 
+# config.py generated by an older configure.py may not define these
+GOAL_SHELL = getattr(config, 'GOAL_SHELL', GOAL + ' shell')
+GOAL_TIMEOUT = getattr(config, 'GOAL_TIMEOUT', None)
+# parent of the per-run scratch directories for files exchanged with GOAL (None -- the default temp dir)
+SCRATCH_DIR = getattr(config, 'SCRATCH_DIR', None)
+
 logger = logging.getLogger(__name__)
 
+_DEFAULT_POOL = object()
+_goal_pool = _DEFAULT_POOL
+_goal_pool_lock = threading.Lock()
+
+_scratch_dir = None
+_scratch_dir_lock = threading.Lock()
+_tmp_file_ids = itertools.count()
+_thread_local = threading.local()
+
+
+def get_scratch_dir() -> str:
+    """
+    :return: directory of this run for files exchanged with GOAL (created in `SCRATCH_DIR`),
+             it is removed with all files at exit, also after errors
+    """
+    global _scratch_dir
+    with _scratch_dir_lock:
+        if _scratch_dir is None:
+            _scratch_dir = tempfile.mkdtemp(prefix='spec_framework_', dir=SCRATCH_DIR)
+            atexit.register(shutil.rmtree, _scratch_dir, True)
+        return _scratch_dir
+
 
 def get_tmp_file_name(prefix='tmp_'):
-    tmp = NamedTemporaryFile(prefix=prefix, delete=False)
-    return tmp.name
+    """ :return: new file name in the scratch directory (the file is not created) """
+    with _scratch_dir_lock:
+        file_id = next(_tmp_file_ids)
+    return os.path.join(get_scratch_dir(), '%s%i' % (prefix, file_id))
+
+
+def remove_tmp_file(file_name):
+    """ The files not removed (e.g., after errors) go with the scratch directory at exit. """
+    try:
+        os.remove(file_name)
+    except FileNotFoundError:  # e.g., GOAL failed before writing it
+        pass
+
+
+def set_goal_pool(pool: GoalWorkerPool or None):
+    """ Use `pool` for all GOAL scripts, `None` means calling `gc batch` for every script. """
+    global _goal_pool
+    _goal_pool = pool
+
+
+def create_goal_pool(size: int=1) -> GoalWorkerPool:
+    return create_pool(GOAL_SHELL, size, GOAL_TIMEOUT)
+
+
+def get_goal_pool() -> GoalWorkerPool or None:
+    global _goal_pool
+    with _goal_pool_lock:
+        if _goal_pool is _DEFAULT_POOL:
+            _goal_pool = create_goal_pool()
+        return _goal_pool
 
 
 def execute_goal_script(script: str) -> str:
@@ -19,63 +82,91 @@ def execute_goal_script(script: str) -> str:
     :return: stdout as printed by GOAL
     """
 
-    script_tmp_file_name = get_tmp_file_name("goal_script_")
+    count('goal_calls')
+    pool = get_goal_pool()
+    with span('goal', statements=script.count(';')):
+        if pool is not None:
+            logger.debug(script)
+            return pool.execute(script)
+
+        return execute_goal_script_in_batch(script)
+
+
+def execute_goal_script_in_batch(script: str) -> str:
+    """ Run `script` in a fresh `gc batch` process. """
+
+    # one script file per thread, rewritten for every script
+    script_tmp_file_name = getattr(_thread_local, 'script_file_name', None)
+    if script_tmp_file_name is None:
+        script_tmp_file_name = _thread_local.script_file_name = get_tmp_file_name("goal_script_")
     with open(script_tmp_file_name, 'w') as f:
         f.write(script)
         logger.debug(script)
 
     cmd_to_execute = '%s batch %s' % (GOAL, script_tmp_file_name)
     res, out, err = execute_shell(cmd_to_execute)
-    assert res == 0 and err == '', 'Shell call failed:\n' + cmd_to_execute + '\nres=%i\n err=%s' % (res, err)
+    assert res == 0 and not get_goal_errors(err), \
+        'Shell call failed:\n' + cmd_to_execute + '\nres=%i\n err=%s' % (res, err)
+    if err:
+        logger.debug('GOAL stderr: %s', err)
 
-    remove(script_tmp_file_name)
     return out
 
 
-def execute_translation(what: str, formula: str, options: str="") -> str:
-    output_file_name = get_tmp_file_name("goal_trans_")
+def translation_statement(what: str, formula: str, options: str, output_file_name: str) -> str:
     if "\"" in formula:
         raise SyntaxError("Quotation marks are not allowed as parts of formulae.")
     template = "translate {what} {option} -o {output} \"{formula}\";"
-    script = template.format(what=what, option=options, formula=formula,
-                             output=output_file_name)
+    return template.format(what=what, option=options, formula=formula,
+                           output=output_file_name)
+
+
+def execute_translation(what: str, formula: str, options: str="") -> str:
+    output_file_name = get_tmp_file_name("goal_trans_")
+    script = translation_statement(what, formula, options, output_file_name)
     execute_goal_script(script)
     result = readfile(output_file_name)
-    remove(output_file_name)
+    remove_tmp_file(output_file_name)
     return result
 
 
-def strip_unused_symbols(gff_automaton_text: str) -> str:
+def strip_unused_symbols(gff_automaton_text: str, used_propositions=None) -> str:
     # GOAL may produce automaton
     # whose alphabet contains symbols
     # not used in any transition labels
     # here we remove unused propositions from the alphabet
+    # (`used_propositions` are known if the automaton was read with gff_reader,
+    #  otherwise they are collected from labels in the same pass that finds the alphabet)
 
     lines = gff_automaton_text.splitlines()
 
-    alphabet_start = find(lambda l: '<Alphabet' in l, lines)
-    alphabet_end = find(lambda l: '</Alphabet' in l, lines)
+    alphabet_start = alphabet_end = -1
+    inside_transitions = False  # states may have labels too
+    used_labels = set()
+    for i, l in enumerate(lines):
+        if alphabet_start == -1 and '<Alphabet' in l:
+            alphabet_start = i
+        elif alphabet_end == -1 and '</Alphabet' in l:
+            alphabet_end = i
+        elif '<TransitionSet' in l:
+            inside_transitions = True
+        elif used_propositions is None and inside_transitions and '<Label' in l:
+            # <Label>~g ~r</Label>
+            #: :type: str
+            lbls = l[l.find('>') + 1:
+                     l.find('<', l.find('>'))]
+            lbls = stripped_non_empty(lbls.replace('~', '').split())
+            used_labels.update(lbls)
 
     if alphabet_start == -1 or alphabet_end == -1:
         return gff_automaton_text
 
-    trans_start = find(lambda l: '<TransitionSet' in l, lines)
-    trans_end = find(lambda l: '</TransitionsSet' in l, lines)
-
-    lbl_lines = list(filter(lambda l: '<Label' in l, lines[trans_start + 1:trans_end]))
-
-    used_labels = set()
-    for lbl_line in lbl_lines:
-        # <Label>~g ~r</Label>
-        #: :type: str
-        lbls = lbl_line[lbl_line.find('>') + 1:
-                        lbl_line.find('<', lbl_line.find('>'))]
-        lbls = stripped_non_empty(lbls.replace('~', '').split())
-        used_labels.update(lbls)
+    if used_propositions is not None:
+        used_labels = used_propositions
 
     # now construct the result
     result = lines[:alphabet_start + 1]
-    for lbl in filter(lambda l: l != 'True', used_labels):
+    for lbl in sorted(filter(lambda l: l != 'True', used_labels)):
         result.append("        <Proposition>%s</Proposition>" % lbl)
 
     result += lines[alphabet_end:]
@@ -0,0 +1,196 @@
+"""
+Long-lived GOAL processes that execute scripts received over a pipe.
+
+Every `gc batch` call starts a new JVM, and on specs with many properties
+the JVM startup dominates the running time.
+A worker keeps one GOAL shell alive, writes scripts into its stdin,
+and detects the end of the script output by echoing a unique marker.
+The stderr of GOAL goes into the same pipe as its stdout,
+so everything GOAL printed on stderr for a script comes before the marker of the script;
+only GOAL error lines (see `is_goal_error_line`) fail a script, other lines (e.g., JVM warnings) do not.
+"""
+
+import atexit
+import logging
+import queue
+import re
+import subprocess
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+class GoalWorkerError(Exception):
+    pass
+
+
+class GoalWorkerTimeout(GoalWorkerError):
+    pass
+
+
+class GoalWorkerCrash(GoalWorkerError):
+    pass
+
+
+_GOAL_ERROR_LINE = re.compile(r'Error:|Exception')
+
+
+def is_goal_error_line(line: str) -> bool:
+    """
+    >>> is_goal_error_line('Exception in thread "main" java.lang.NullPointerException')
+    True
+    >>> is_goal_error_line('Error: unknown command')
+    True
+    >>> is_goal_error_line('OpenJDK 64-Bit Server VM warning: Options -Xverify:none are deprecated')
+    False
+    >>> is_goal_error_line('saved /tmp/no_errors.gff')
+    False
+    """
+    return _GOAL_ERROR_LINE.match(line) is not None
+
+
+def get_goal_errors(output: str) -> str:
+    """ :return: the GOAL error lines of `output` """
+    return ''.join(l for l in output.splitlines(True) if is_goal_error_line(l))
+
+
+def _pump(stream, lines: queue.Queue):
+    for line in iter(stream.readline, ''):
+        lines.put(line)
+    lines.put(None)  # EOF
+
+
+class GoalWorker:
+    def __init__(self, cmd: str, timeout: float or None=None):
+        """
+        :param cmd: shell command that starts GOAL reading a script from stdin,
+                    any program that understands `echo "<text>";` can stand in for GOAL
+        :param timeout: seconds to wait for a script to finish (None -- wait forever)
+        """
+        self.cmd = cmd
+        self.timeout = timeout
+        self._proc = None
+        self._out_lines = None
+
+    def is_alive(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def start(self):
+        logger.debug('starting GOAL worker: %s', self.cmd)
+        self._proc = subprocess.Popen(self.cmd,
+                                      stdin=subprocess.PIPE,
+                                      stdout=subprocess.PIPE,
+                                      stderr=subprocess.STDOUT,
+                                      shell=True,
+                                      universal_newlines=True,
+                                      bufsize=1)
+        self._out_lines = queue.Queue()
+        threading.Thread(target=_pump, args=(self._proc.stdout, self._out_lines), daemon=True).start()
+
+    def stop(self):
+        if self._proc is None:
+            return
+        if self._proc.poll() is None:
+            self._proc.kill()
+        self._proc.wait()
+        for stream in (self._proc.stdin, self._proc.stdout):
+            try:
+                stream.close()
+            except OSError:  # unflushed stdin of a dead process
+                pass
+        self._proc = None
+
+    def execute(self, script: str) -> str:
+        """
+        :return: stdout and stderr as printed by GOAL
+        """
+        if not self.is_alive():
+            self.start()
+
+        marker = 'GOAL_WORKER_DONE_' + uuid.uuid4().hex
+        try:
+            self._proc.stdin.write('%s\necho "%s";\n' % (script, marker))
+            self._proc.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            self.stop()
+            raise GoalWorkerCrash('GOAL worker is not accepting scripts: %s' % e)
+
+        deadline = None if self.timeout is None else time.time() + self.timeout
+        out = []
+        while True:
+            wait = None if deadline is None else max(0, deadline - time.time())
+            try:
+                line = self._out_lines.get(timeout=wait)
+            except queue.Empty:
+                self.stop()
+                raise GoalWorkerTimeout('GOAL worker did not finish in %s seconds, script:\n%s' %
+                                        (self.timeout, script))
+            if line is None:
+                self.stop()
+                raise GoalWorkerCrash('GOAL worker died, output:\n%s' % ''.join(out))
+            if line.strip().endswith(marker):
+                break
+            out.append(line)
+
+        out = ''.join(out)
+        errors = get_goal_errors(out)
+        if errors:
+            raise GoalWorkerError('GOAL reported an error:\n%s\nscript:\n%s' % (errors, script))
+
+        return out
+
+
+class GoalWorkerPool:
+    """
+    Thread-safe pool of at most `size` GOAL workers.
+    Workers are started lazily and restarted when they crash.
+    """
+
+    def __init__(self, cmd: str, size: int=1, timeout: float or None=None, max_restarts: int=1):
+        assert size > 0, str(size)
+        self.cmd = cmd
+        self.size = size
+        self.timeout = timeout
+        self.max_restarts = max_restarts
+        self._slots = threading.Semaphore(size)
+        self._idle = queue.LifoQueue()  # the most recently used worker is the warmest one
+        self._workers = []
+        self._lock = threading.Lock()
+
+    def _acquire(self) -> GoalWorker:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            worker = GoalWorker(self.cmd, self.timeout)
+            with self._lock:
+                self._workers.append(worker)
+            return worker
+
+    def execute(self, script: str) -> str:
+        with self._slots:
+            worker = self._acquire()
+            try:
+                for attempt in range(self.max_restarts + 1):
+                    try:
+                        return worker.execute(script)
+                    except GoalWorkerCrash as e:
+                        if attempt == self.max_restarts:
+                            raise
+                        logger.warning('%s, restarting the worker', e)
+            finally:
+                self._idle.put(worker)
+
+    def shutdown(self):
+        with self._lock:
+            for worker in self._workers:
+                worker.stop()
+            self._workers = []
+        self._idle = queue.LifoQueue()
+
+
+def create_pool(cmd: str, size: int=1, timeout: float or None=None) -> GoalWorkerPool:
+    pool = GoalWorkerPool(cmd, size, timeout)
+    atexit.register(pool.shutdown)
+    return pool
@@ -0,0 +1,321 @@
+"""
+Transition labels over propositions.
+
+A label is a tuple of literals, like `('g', '~r')`, meaning their conjunction;
+`('True',)` is the label that is always true.
+A set of labels means the disjunction of the labels.
+
+Internally, a label over the propositions `props` is a pair of bit masks (pos, neg):
+bit `i` is set in `pos` (resp. `neg`) iff `props[i]` (resp. `~props[i]`) is in the label.
+A valuation is an integer whose bit `i` is the value of `props[i]`.
+"""
+
+from functools import lru_cache
+
+TRUE = 'True'
+FALSE = 'False'
+
+
+def atom_of(literal: str) -> str:
+    return literal.strip('~').strip('!')
+
+
+def is_negated(literal: str) -> bool:
+    return literal.startswith('~') or literal.startswith('!')
+
+
+def get_propositions(labels) -> tuple:
+    """
+    >>> get_propositions([('g', '~r'), ('True',), ('~g',)])
+    ('g', 'r')
+    """
+    atoms = set(atom_of(l) for label in labels for l in label)
+    return tuple(sorted(atoms.difference((TRUE, FALSE))))
+
+
+def label_to_masks(label, index_by_prop: dict) -> (int, int) or None:
+    """
+    :return: (pos, neg) masks, or None if the label is unsatisfiable
+    >>> label_to_masks(('a', '~c'), {'a': 0, 'b': 1, 'c': 2})
+    (1, 4)
+    >>> label_to_masks(('True',), {'a': 0})
+    (0, 0)
+    >>> label_to_masks(('a', '~a'), {'a': 0}) is None
+    True
+    """
+    pos = neg = 0
+    for l in label:
+        atom = atom_of(l)
+        if atom == TRUE or atom == FALSE:
+            if (atom == TRUE) == is_negated(l):
+                return None
+            continue
+        bit = 1 << index_by_prop[atom]
+        if is_negated(l):
+            neg |= bit
+        else:
+            pos |= bit
+    if pos & neg:
+        return None
+    return pos, neg
+
+
+def masks_to_label(pos: int, neg: int, props) -> tuple:
+    """
+    >>> masks_to_label(1, 4, ('a', 'b', 'c'))
+    ('a', '~c')
+    >>> masks_to_label(0, 0, ('a',))
+    ('True',)
+    """
+    label = []
+    for i, p in enumerate(props):
+        if pos >> i & 1:
+            label.append(p)
+        elif neg >> i & 1:
+            label.append('~' + p)
+    return tuple(label) or (TRUE,)
+
+
+def is_satisfied(masks, valuation: int) -> bool:
+    pos, neg = masks
+    return valuation & pos == pos and valuation & neg == 0
+
+
+def valuations_to_labels(valuations, props) -> set:
+    """
+    :return: set of labels whose disjunction is satisfied exactly by `valuations`
+             (the labels are pairwise disjoint cubes, obtained by splitting on propositions)
+    >>> sorted(valuations_to_labels({0b01, 0b11}, ('a', 'b')))
+    [('a',)]
+    >>> sorted(valuations_to_labels({0b00, 0b11}, ('a', 'b')))
+    [('a', 'b'), ('~a', '~b')]
+    >>> valuations_to_labels(range(4), ('a', 'b'))
+    {('True',)}
+    """
+    return set(masks_to_label(pos, neg, props) for (pos, neg) in valuations_to_cubes(valuations, len(props)))
+
+
+def valuations_to_cubes(valuations, nof_props: int) -> list:
+    """
+    Same as `valuations_to_labels`, the labels are masks (pos, neg).
+    >>> valuations_to_cubes({0b00, 0b11}, 2)
+    [(3, 0), (0, 3)]
+    """
+    cubes = []
+    _split(frozenset(valuations), nof_props, 0, 0, 0, cubes)
+    return cubes
+
+
+def _split(valuations: frozenset, nof_props: int, i: int, pos: int, neg: int, cubes: list):
+    # `valuations` are the valuations of the cube (pos, neg) that should be covered
+    if not valuations:
+        return
+    if len(valuations) == 1 << (nof_props - i):
+        cubes.append((pos, neg))
+        return
+    bit = 1 << i
+    _split(frozenset(v for v in valuations if v & bit), nof_props, i + 1, pos | bit, neg, cubes)
+    _split(frozenset(v for v in valuations if not v & bit), nof_props, i + 1, pos, neg | bit, cubes)
+
+
+def is_tautology(labels) -> bool:
+    """
+    :return: True iff the disjunction of `labels` is valid
+    >>> is_tautology([('a', 'b'), ('~a',), ('~b',)])
+    True
+    >>> is_tautology([('a', 'b'), ('~a',)])
+    False
+    >>> is_tautology([('True',)])
+    True
+    >>> is_tautology([])
+    False
+    """
+    return _is_tautology_labels(frozenset(tuple(label) for label in labels))
+
+
+@lru_cache(maxsize=4096)
+def _is_tautology_labels(labels: frozenset) -> bool:
+    props = get_propositions(labels)
+    index_by_prop = dict((p, i) for (i, p) in enumerate(props))
+    cubes = frozenset(m for m in (label_to_masks(l, index_by_prop) for l in labels)
+                      if m is not None)
+    return is_tautology_cubes(cubes)
+
+
+@lru_cache(maxsize=4096)
+def is_tautology_cubes(cubes: frozenset) -> bool:
+    """ :param cubes: labels encoded as (pos, neg) masks """
+    # the unate recursive paradigm: split on a proposition, and check both cofactors
+    if (0, 0) in cubes:
+        return True
+    if not cubes:
+        return False
+
+    pos_union = neg_union = 0
+    for (pos, neg) in cubes:
+        pos_union |= pos
+        neg_union |= neg
+
+    binate = pos_union & neg_union
+    if not binate:
+        # a unate cover is valid iff it contains the empty cube
+        return False
+
+    bit = binate & -binate  # the lowest binate proposition
+    return is_tautology_cubes(_cofactor(cubes, bit, True)) and \
+        is_tautology_cubes(_cofactor(cubes, bit, False))
+
+
+def _cofactor(cubes: frozenset, bit: int, value: bool) -> frozenset:
+    res = []
+    for (pos, neg) in cubes:
+        if (neg if value else pos) & bit:
+            continue
+        res.append((pos & ~bit, neg & ~bit))
+    return frozenset(res)
+
+
+MAX_MINIMIZE_PROPOSITIONS = 10  # above, only contained cubes are removed
+MAX_COVER_PRIMES = 256          # above, the greedy cover is used
+MAX_COVER_STEPS = 10000         # above, the best cover found so far is used
+
+
+def get_minterms(cubes, nof_props: int) -> frozenset:
+    """
+    >>> sorted(get_minterms([(1, 0)], 2))
+    [1, 3]
+    """
+    full = (1 << nof_props) - 1
+    minterms = set()
+    for (pos, neg) in cubes:
+        free = full & ~(pos | neg)
+        # enumerate all subsets of `free`
+        sub = free
+        while True:
+            minterms.add(pos | sub)
+            if sub == 0:
+                break
+            sub = (sub - 1) & free
+    return frozenset(minterms)
+
+
+def minimize_cubes(cubes, nof_props: int, dont_cares=frozenset()) -> list:
+    """
+    Exact two-level minimization (Quine-McCluskey) of the disjunction of `cubes`.
+    The cost is the number of cubes, then the number of literals.
+    :param dont_cares: valuations where the result may be anything
+    :return: list of (pos, neg) cubes
+    >>> minimize_cubes([(3, 0), (1, 2)], 2)   # a&b | a&~b
+    [(1, 0)]
+    >>> minimize_cubes([(0, 3), (1, 2), (2, 1)], 2)   # ~a&~b | a&~b | ~a&b
+    [(0, 1), (0, 2)]
+    >>> minimize_cubes([(1, 2)], 2, dont_cares={0b11})
+    [(1, 0)]
+    >>> minimize_cubes([(1, 0), (0, 1)], 1)
+    [(0, 0)]
+    """
+    cubes = list(cubes)
+    if nof_props > MAX_MINIMIZE_PROPOSITIONS:
+        return _remove_contained(cubes)
+
+    on = get_minterms(cubes, nof_props)
+    if not on:
+        return []
+    care_full = (1 << nof_props) - 1
+    dc = frozenset(dont_cares).difference(on)
+    if len(on) + len(dc) == 1 << nof_props:
+        return [(0, 0)]
+
+    primes = _get_primes(on.union(dc), nof_props)
+
+    covered_by_prime = dict()
+    for (value, care) in primes:
+        cube = (value & care, ~value & care & care_full)
+        covered = get_minterms([cube], nof_props).intersection(on)
+        if covered:
+            covered_by_prime[cube] = covered
+
+    return sorted(_get_min_cover(on, covered_by_prime))
+
+
+def _remove_contained(cubes) -> list:
+    # (pos, neg) is contained in (pos2, neg2) iff the latter has a subset of literals
+    unique = sorted(set(cubes), key=lambda c: bin(c[0]).count('1') + bin(c[1]).count('1'))
+    result = []
+    for (pos, neg) in unique:
+        if not any(pos2 & pos == pos2 and neg2 & neg == neg2 for (pos2, neg2) in result):
+            result.append((pos, neg))
+    return sorted(result)
+
+
+def _get_primes(minterms: frozenset, nof_props: int) -> set:
+    # an implicant is (value, care): the valuations that agree with `value` on the bits of `care`
+    full = (1 << nof_props) - 1
+    current = set((m, full) for m in minterms)
+    primes = set()
+    while current:
+        merged = set()
+        next_level = set()
+        for (value, care) in current:
+            bits = care
+            while bits:
+                bit = bits & -bits
+                bits ^= bit
+                if (value ^ bit, care) in current:
+                    merged.add((value, care))
+                    next_level.add((value & ~bit, care & ~bit))
+        primes.update(current.difference(merged))
+        current = next_level
+    return primes
+
+
+def _cost(cover) -> (int, int):
+    return len(cover), sum(bin(pos).count('1') + bin(neg).count('1') for (pos, neg) in cover)
+
+
+def _get_min_cover(on: frozenset, covered_by_prime: dict) -> list:
+    # branch and bound, starting with the greedy cover as the best one
+    best = [_get_greedy_cover(on, covered_by_prime)]
+    if len(covered_by_prime) > MAX_COVER_PRIMES:
+        return best[0]
+
+    primes_by_minterm = dict()
+    for p, covered in covered_by_prime.items():
+        for m in covered:
+            primes_by_minterm.setdefault(m, []).append(p)
+
+    steps = [0]
+
+    def search(uncovered: frozenset, cover: list):
+        steps[0] += 1
+        if steps[0] > MAX_COVER_STEPS:
+            return
+        if not uncovered:
+            if _cost(cover) < _cost(best[0]):
+                best[0] = list(cover)
+            return
+        if len(cover) + 1 > len(best[0]):
+            return
+        # the minterm covered by the fewest primes
+        m = min(uncovered, key=lambda m: len(primes_by_minterm[m]))
+        candidates = sorted(primes_by_minterm[m],
+                            key=lambda p: -len(covered_by_prime[p].intersection(uncovered)))
+        for p in candidates:
+            cover.append(p)
+            search(uncovered.difference(covered_by_prime[p]), cover)
+            cover.pop()
+
+    search(on, [])
+    return best[0]
+
+
+def _get_greedy_cover(on: frozenset, covered_by_prime: dict) -> list:
+    # repeatedly take the prime covering the most
+    uncovered = set(on)
+    cover = []
+    primes = dict(covered_by_prime)
+    while uncovered:
+        p = max(primes, key=lambda p: (len(primes[p].intersection(uncovered)), -_cost([p])[1]))
+        cover.append(p)
+        uncovered.difference_update(primes.pop(p))
+    return cover
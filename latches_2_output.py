@@ -2,8 +2,11 @@
 
 from argparse import ArgumentParser
 from re import match
+import sys
 
 import aiger_swig.aiger_wrap as aiglib
+from aiger_io import read_aiger, write_aiger_to
+from profiling import start_profiling
 
 
 skippable = "[A-Za-z0-9_]*"
@@ -14,9 +17,8 @@ regex = "({skip}_)?{stm}(_{skip})?{end}".format(skip=skippable,
                                                 end=end)
 
 
-def main(filename):
-    model = aiglib.aiger_init()
-    aiglib.aiger_open_and_read_from_file(model, filename)
+def main(filename, binary=False):
+    model = read_aiger(filename)
 
     for i in range(model.num_latches):
         latch = aiglib.get_ith_latch(model, i)
@@ -32,13 +34,7 @@ def main(filename):
             if ltype == "f":
                 aiglib.aiger_add_fairness(model, latch.next, latch.name)
 
-    res, string = aiglib.aiger_write_to_string(model,
-                                               aiglib.aiger_ascii_mode,
-                                               2147483648)
-
-    assert res != 0, 'writing failure'
-
-    print(string)
+    write_aiger_to(model, sys.stdout, binary)
 
 
 if __name__ == "__main__":
@@ -50,7 +46,13 @@ if __name__ == "__main__":
                         type=str,
                         default='/dev/stdin',
                         help='model synthesized in AIGER format')
+    parser.add_argument('--binary', action='store_true', default=False,
+                        help='write the binary AIGER format (aig) instead of the ASCII one (aag)')
+    parser.add_argument('--profile', default=None, metavar='FILE',
+                        help='write the profile (Chrome trace JSON, see profiling.py) into this file')
 
     args = parser.parse_args()
+    if args.profile:
+        start_profiling(args.profile)
 
-    exit(main(args.aiger))
+    exit(main(args.aiger, args.binary))
@@ -1,9 +1,14 @@
 #!/usr/bin/env python3
 
 import argparse
-from inspect import cleandoc
+import os
 import sys
 import aiger_swig.aiger_wrap as aiglib
+from aig_builder import AigBuilder, add_fairness_flags, negate, TRUE_LIT, FALSE_LIT
+from aig_opt import Circuit, optimize, read_circuit
+from aiger_io import read_aiger, read_aiger_from_string, aiger_to_string, write_aiger, write_aiger_to, \
+    get_aiger_extension
+from profiling import span, start_profiling
 from shell import execute_shell
 
 
@@ -17,303 +22,180 @@ def to_str_ret_out_err(ret, out, err):
     return res
 
 
-def get_counter_aig(k):  # -> (int,int,int)
-    template = \
+def add_counter(builder: AigBuilder, k: int, reset: int, inc: int, name: str) -> int:
+    """
+    Binary counter of latches `<name><i>` starting at 0: it is set to 0 by `reset`, otherwise incremented by `inc`.
+    :return: literal that is true when the counter reaches `k`
+             (compares only the bits set in `k`: the counter reaches `k` before any larger value with these bits)
+    """
+    bits = [builder.add_latch('%s%i' % (name, i)) for i in range(k.bit_length())]
+    carry = inc
+    for i, b in enumerate(bits):
+        builder.set_latch_next(b, builder.and_(negate(reset), builder.xor(b, carry)))
+        if i + 1 < len(bits):  # the carry out of the top bit is never used
+            carry = builder.and_(b, carry)
+    return builder.and_all(b for (i, b) in enumerate(bits) if k >> i & 1)
+
+
+def get_buchi_lit(builder: AigBuilder, lits: list, name: str) -> int:
+    """ :return: literal that is true infinitely often iff every literal of `lits` is (TRUE if there are none) """
+    if not lits:
+        return TRUE_LIT
+    if len(lits) == 1:
+        return lits[0]
+    return add_fairness_flags(builder, lits, name)
+
+
+def parse_k_values(string: str) -> list:
+    """
+    :param string: comma-separated values and ranges `first..last` (`first..last:step`)
+    >>> parse_k_values('2..5,8,16..32:8')
+    [2, 3, 4, 5, 8, 16, 24, 32]
+    """
+    k_values = []
+    for item in string.split(','):
+        if '..' not in item:
+            k_values.append(int(item))
+            continue
+        first, last = item.split('..')
+        last, _, step = last.partition(':')
+        k_values.extend(range(int(first), int(last) + 1, int(step or 1)))
+    return k_values
+
+
+def to_k_liveness_model(circuit: Circuit, maxvar: int, k: int) -> aiglib.aiger:
+    """
+    :param maxvar: the largest variable of `circuit`
+    :return: new model: `circuit` without justice and fairness properties,
+             and with the bad property `k-liveness` if `circuit` has justice properties:
+             the k-th step with `fair` since the last `just`,
+             where `just` (`fair`) is true when every justice (fairness) literal was seen since the last `just` (`fair`).
+             Thus all justice properties are checked together,
+             and every justice property may have several literals (generalized Buchi conditions).
+    Only the counter depends on `k`, the gates of `circuit` are copied as they are.
+    """
+    model = circuit.with_properties(circuit.outputs, circuit.bad, circuit.constraints).to_aiger()
+    if not circuit.justice:
+        return model
+
+    builder = AigBuilder(first_var=maxvar + 1)
+    just = get_buchi_lit(builder, [lit for (lits, _) in circuit.justice for lit in lits], 'k_liveness_justice')
+    fair = get_buchi_lit(builder, [lit for (lit, _) in circuit.fairness], 'k_liveness_fairness')
+    overflow = add_counter(builder, k, just, fair, 'k_liveness_counter')
+
+    for (lit, next_lit, name, reset) in builder.latches:
+        aiglib.aiger_add_latch(model, lit, next_lit, name)
+        if reset != FALSE_LIT:
+            aiglib.aiger_add_reset(model, lit, reset)
+    for (lhs, rhs0, rhs1) in builder.ands:
+        aiglib.aiger_add_and(model, lhs, rhs0, rhs1)
+    aiglib.aiger_add_bad(model, overflow, 'k-liveness')
+    return model
+
+
+def post_process(string: str) -> str:
+    """ :return: the model in the old format: the bad properties are moved into a single output """
+    ret, out_string, err = execute_shell(
+        'aigmove -i | aigor | aigtoaig -a',
+        input=string)
+    assert ret == 0, 'post-processing failure: ' + \
+                     to_str_ret_out_err(ret, string, err) + \
+                     'input was:\n' + string
+    return out_string
+
+
+class KLivenessTransformer:
+    """
+    Transforms models into their k-liveness models (see `to_k_liveness_model`).
+    The transformer keeps only its options and never changes the given models,
+    so one transformer can be used for many models, from several threads, or sent to other processes.
+    """
+
+    def __init__(self, new_format: bool=False, optimize_result: bool=False):
         """
-        MODULE main  -- count-up till k
-          VAR
-            state: 0..{k};
-          IVAR
-            reset: boolean;
-            inc: boolean;
-
-          DEFINE
-            beep := (state={k});
-
-          ASSIGN
-            init(state) := 0;
-            next(state) := case
-                             reset: 0;
-                             inc: state + 1;
-                             TRUE:state;
-                           esac;
-
-          SPEC
-            AG(!beep)  -- then we use the bad signal
+        :param new_format: keep the k-liveness property as a bad property,
+                           otherwise it goes into the single output (requires aiger tools)
+        :param optimize_result: simplify the results (see aig_opt.py)
         """
+        self.new_format = new_format
+        self.optimize_result = optimize_result
 
-    global reset, inc
-    counter_smv = cleandoc(template).format(k=str(k))
-
-    ret, out, err = execute_shell('smvflatten | smvtoaig | aigmove | aigtoaig -a', input=counter_smv + "\n")
-    assert ret == 0, to_str_ret_out_err(ret, out, err)
-
-    out_lines = out.splitlines()
-    aag, m, i, l, o, a = out_lines[0].split()
-    # assert i == '1' and o == '1'
-    assert i == '2' and o == '1'
-
-    for i in filter(lambda l: l.startswith('i'), out_lines):
-        i = i.split()
-        if i[1] == "reset":
-            reset = int(i[0][1:])
-
-        if i[1] == "inc":
-            inc = int(i[0][1:])
-
-    reset = (reset + 1) * 2
-    inc = (inc + 1) * 2
-
-    ret, out, err = execute_shell('aigstrip | aigtoaig -a', input=out)
-    out_lines = out.splitlines()
-    aag, m, i, l, o, a = out_lines[0].split()
-
-    out_def_line = out_lines[int(i) + 1 + int(l)]
-    assert len(out_def_line.split()) == 1, out_def_line
-
-    out_signal = int(out_def_line)
-
-    return out, out_signal
-
-
-def is_negated(l):
-    return (l & 1) == 1
-
-
-def negate(lit):
-    return lit ^ 1
-
-
-def strip_lit(l):
-    return l & ~1
-
-
-def get_lit_type(l):
-    input_ = aiglib.aiger_is_input(spec, strip_lit(l))
-    latch_ = aiglib.aiger_is_latch(spec, strip_lit(l))
-    and_ = aiglib.aiger_is_and(spec, strip_lit(l))
-
-    return input_, latch_, and_
-
-
-#: :type: aiglib.aiger
-spec = None
-symbol_by_ulit = set()
-counter_and_u_new_lits, counter_latch_u_new_lits = None, None   # _u_ stands for 'unsigned', _s_ -- for 'signed'
-shift = None
-out = None
-new_format = None
-reset = None
-inc = None
-#
-
-
-def get_add_symbol(s_new_lit):
-    assert counter_and_u_new_lits or counter_latch_u_new_lits, \
-        'not initialized'
-
-    u_new_lit = strip_lit(s_new_lit)
-
-    if u_new_lit == 0:
-        input_, latch_, and_ = get_lit_type(u_new_lit)
-        return input_ or latch_ or and_
-
-    if u_new_lit in symbol_by_ulit:
-        input_, latch_, and_ = get_lit_type(u_new_lit)
-        return input_ or latch_ or and_
-
-    if u_new_lit in [strip_lit(get_new_s_lit(reset)), strip_lit(get_new_s_lit(inc))]:
-        # previously input literal, it was not AND nor latch in the counter
-        input_, latch_, and_ = get_lit_type(u_new_lit)
-        return input_ or latch_ or and_
-
-    assert u_new_lit in counter_and_u_new_lits or \
-        u_new_lit in counter_latch_u_new_lits, "%s\n%s\n%s" % (u_new_lit, counter_and_u_new_lits, counter_latch_u_new_lits)
-
-    if u_new_lit in counter_and_u_new_lits:
-        aiglib.aiger_add_and(spec, u_new_lit, 1, 1)
-    else:  # u_new_lit in counter_latch_u_new_lits:
-        aiglib.aiger_add_latch(spec, u_new_lit, 1, 'counter_latch')
-
-    symbol_by_ulit.add(u_new_lit)
-    input_, latch_, and_ = get_lit_type(u_new_lit)
-    return input_ or latch_ or and_
+    def transform(self, model: aiglib.aiger, k: int) -> aiglib.aiger:
+        (_, result), = self.transform_k_values(model, [k])
+        return result
 
+    def transform_k_values(self, model: aiglib.aiger, k_values):
+        """
+        Transform `model` for every k of `k_values` (the model is read once).
+        :return: generator of (k, the result)
+        """
+        for (k, result) in self._transform(model, k_values):
+            if not self.new_format:
+                result = read_aiger_from_string(post_process(aiger_to_string(result)))
+            yield k, result
 
-def get_new_s_lit(old_lit):
-    """ :return: _signed_ literal """
-    # 2 is the input of a counter aig
-    # 2 -> spec.justice[0].lits[0], 3 -> negate(spec.fairness.lit)
-    # counter_other_lit -> counter_other_lit + shift
-
-    if strip_lit(old_lit) == reset:
-        res = aiglib.get_justice_lit(spec, 0, 0)
-        if is_negated(old_lit):
-            res = negate(res)
-        return res
-
-    if strip_lit(old_lit) == inc:
-        if not spec.num_fairness:
-            # Here we have something like GF true -> GF just
-            # so we always increment our counter
-            if is_negated(old_lit):
-                return 0
-            return 1
-
-        # here we have GF fair -> GF just
-        res = aiglib.get_ith_fairness(spec, 0).lit
-        if is_negated(old_lit):
-            res = negate(res)
-        return res
-
-    return old_lit + shift
-
-#
-#    old_beep_lit = get_counter_aig_output_lit(counter_aig)
-#    new_beep_lit = old_beep_lit + shift
-
-
-def define_counter_new_lits(counter_aig):
-    global counter_and_u_new_lits, counter_latch_u_new_lits
-    counter_latch_u_new_lits = set()
-    counter_and_u_new_lits = set()
-
-    # print counter_aig
-
-    for l in counter_aig.splitlines()[3:]:  # ignore header and input
-        tokens = l.split()
-
-        if len(tokens) == 1:  # output, ignore
+    def transform_to_strings(self, model: aiglib.aiger, k_values):
+        """
+        Same as `transform_k_values`, without reading the results of the old format back.
+        :return: generator of (k, the result in the ASCII format)
+        """
+        for (k, result) in self._transform(model, k_values):
+            string = aiger_to_string(result)
+            yield k, string if self.new_format else post_process(string)
+
+    def _transform(self, model: aiglib.aiger, k_values):
+        assert all(k > 0 for k in k_values), 'the values of k should be positive: %s' % k_values
+        circuit = read_circuit(model)
+        for k in k_values:
+            with span('k_liveness_counter', k=k):
+                result = to_k_liveness_model(circuit, model.maxvar, k)
+            yield k, optimize(result) if self.optimize_result else result
+
+
+def get_k_file_name(out_dir, k, binary=False) -> str:
+    return os.path.join(out_dir, 'k%i' % k + get_aiger_extension(binary))
+
+
+def main(spec_filename, k_values, out, out_dir=None, new_format=False, optimize_result=False, binary=False):
+    """
+    The result goes into `out` (only one k), or into files `<out_dir>/k<k>.aag` (`.aig` if `binary`),
+    whose names are printed.
+    """
+    assert k_values, 'no values of k'
+    assert out_dir or len(k_values) == 1, 'several values of k need a directory for the models'
+
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+
+    transformer = KLivenessTransformer(new_format, optimize_result)
+    if binary or new_format:  # the models are written directly, the old format goes through the aiger tools as text
+        for (k, result) in transformer.transform_k_values(read_aiger(spec_filename), k_values):
+            if not out_dir:
+                write_aiger_to(result, out, binary)
+                continue
+
+            file_name = get_k_file_name(out_dir, k, binary)
+            write_aiger(result, file_name)
+            print(file_name)
+        return 0
+
+    for (k, string) in transformer.transform_to_strings(read_aiger(spec_filename), k_values):
+        if not out_dir:
+            out.write(string)
             continue
-        if len(tokens) == 2:  # latch
-            old_l = int(tokens[0])
-            new_l = get_new_s_lit(old_l)
-            counter_latch_u_new_lits.add(new_l)
-
-        elif len(tokens) == 3:  # AND gate
-            old_l = int(tokens[0])
-            new_l = get_new_s_lit(old_l)
-            counter_and_u_new_lits.add(new_l)
 
-        else:
-            assert 0, l
+        file_name = get_k_file_name(out_dir, k)
+        with open(file_name, 'w') as f:
+            f.write(string)
+        print(file_name)
 
-
-def define_shift():   # should go before any additions to the spec
-    global shift
-    # two inputs: reset and inc
-    # each input is used twice (as-is and negated)
-    next_lit = spec.maxvar * 2 + 4
-    # 6 is the first literal, which is not an input
-    shift = next_lit - 6
-
-
-def add_counter_to_spec(k):
-    counter_aig, out_overflow_signal = get_counter_aig(k)
-    define_shift()
-    define_counter_new_lits(counter_aig)
-
-    for l in counter_aig.splitlines()[3:]:  # ignore header and input
-        tokens = l.split()
-
-        if len(tokens) == 1:  # output, ignore
-            continue
-
-        if len(tokens) == 2:  # latch
-            old_l, old_next = int(tokens[0]), int(tokens[1])
-            new_l, new_next = get_new_s_lit(old_l), get_new_s_lit(old_next)
-            #: :type: aiglib.aiger_symbol
-            l_symbol = get_add_symbol(new_l)
-            get_add_symbol(new_next)
-            l_symbol.next = new_next
-
-        elif len(tokens) == 3:  # AND gate
-            old_and, old_rhs0, old_rhs1 = (int(tokens[0]),
-                                           int(tokens[1]),
-                                           int(tokens[2]))
-            new_and, new_rhs0, new_rhs1 = (get_new_s_lit(old_and),
-                                           get_new_s_lit(old_rhs0),
-                                           get_new_s_lit(old_rhs1))
-            #: :type: aiglib.aiger_and
-            and_symbol = get_add_symbol(new_and)
-            get_add_symbol(new_rhs0)
-            get_add_symbol(new_rhs1)
-            and_symbol.rhs0 = new_rhs0
-            and_symbol.rhs1 = new_rhs1
-
-            # print 'and: old_and, old_rhs0, old_rhs1 -> ' \
-            #       'new_and, new_rhs0, new_rhs1', \
-            #     old_and, old_rhs0, old_rhs1, \
-            #     new_and, new_rhs0, new_rhs1
-        else:
-            assert 0, l
-
-    # every literal gets defined above, so now goes
-    aiglib.aiger_add_bad(spec, get_new_s_lit(out_overflow_signal), 'k-liveness')
-
-
-def aiger_hacky_remove_jf(spec):
-    """ 'Remove' all justice signals from spec. """
-
-    # aiger uses num_justice to store the length of the justice section
-    # and relies on it when printing
-    just = spec.num_justice
-    spec.num_justice = 0
-    fair = spec.num_fairness
-    spec.num_fairness = 0
-    # we return the old value, so that we can reset num_justice afterwards
-    return just, fair
-
-
-def write_and_die():
-    global spec, out, new_format
-    (j, f) = aiger_hacky_remove_jf(spec)
-    res, string = aiglib.aiger_write_to_string(spec,
-                                               aiglib.aiger_ascii_mode,
-                                               2147483648)
-    # maybe useful for gc?
-    spec.num_justice = j
-    spec.num_fairness = f
-    assert res != 0, 'writing failure'
-
-    if not new_format:
-        # post-process
-        ret, out_string, err = execute_shell(
-            'aigmove -i | aigor | aigtoaig -a',
-            input=string)
-        assert ret == 0, 'post-processing failure: ' + \
-                         to_str_ret_out_err(ret, string, err) + \
-                         'input was:\n' + string
-        string = out_string
-
-    out.write(string)
-    exit(0)
-
-
-def main(spec_filename, k):
-    assert k > 0, str(k)
-
-    global spec
-    #: :type: aiglib.aiger
-    spec = aiglib.aiger_init()
-    aiglib.aiger_open_and_read_from_file(spec, spec_filename)
-
-    assert spec.num_fairness <= 1, 'more than one fairness property is not supported yet'
-
-    if spec.num_justice == 0:
-        write_and_die()
-
-    assert spec.num_justice == 1, 'more than one justice property is not supported yet: ' + str(spec.num_justice)
-    assert spec.justice.size == 1, 'the justice section should contain exactly one literal: ' + str(spec.justice.size)
-
-    add_counter_to_spec(k)
-
-    write_and_die()
+    return 0
 
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description='Convert justice liveness into k-safety. '
-                                                 'Requires: smvflatten, and aiger tools in your $PATH. '
+    parser = argparse.ArgumentParser(description='Convert justice liveness into k-safety '
+                                                 '(all justice properties together, under all fairness constraints). '
+                                                 'Requires: aiger tools in your $PATH. '
                                                  'By default, the format is with the single bad output. '
                                                  'NOTE: justice signal is replaced with True.')
 
@@ -332,6 +214,16 @@ if __name__ == "__main__":
                              'Max value of the counter. Counting starts from 0.'
                              'Reaching this value produces spec violation.')
 
+    parser.add_argument('--sweep', metavar='K_VALUES', type=parse_k_values, default=None,
+                        help='transform the model for every value of k, '
+                             'given like `2..10,16,32..64:8` (requires --out-dir)')
+
+    parser.add_argument('--out-dir', default=None,
+                        help='write the model of every k into <out-dir>/k<k>.aag, and print the file names')
+
+    parser.add_argument('--binary', action='store_true', default=False,
+                        help='write the binary AIGER format (aig) instead of the ASCII one (aag)')
+
     parser.add_argument('--new', '-n',
                         action='store_true',
                         default=False,
@@ -339,9 +231,21 @@ if __name__ == "__main__":
                              'it adds new k-liveness Bad property '
                              'but it keeps the justice signal too.')
 
-    args = parser.parse_args()
-
-    out = args.out
-    new_format = args.new
+    parser.add_argument('--optimize', '-O',
+                        action='store_true',
+                        default=False,
+                        help='Simplify the result (see aig_opt.py).')
+    parser.add_argument('--profile', default=None, metavar='FILE',
+                        help='write the profile (Chrome trace JSON, see profiling.py) into this file')
 
-    exit(main(args.aiger, args.k))
+    args = parser.parse_args()
+    if args.sweep is not None and not args.out_dir:
+        parser.error('--sweep requires --out-dir')
+    k_values = [args.k] if args.sweep is None else args.sweep
+    if not k_values or min(k_values) < 1:
+        parser.error('the values of k should be positive: %s' % k_values)
+    if args.profile:
+        start_profiling(args.profile)
+
+    exit(main(args.aiger, k_values, args.out, args.out_dir, args.new, args.optimize,
+              args.binary))
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Model checking of all properties of a HWMCC model,
+the properties are checked in parallel by a pool of checker processes.
+
+A checker is called as `<checker> <model> --pi <property index>` (like IIMC),
+and it should print `0` (the property holds) or `1` (it fails) on its last output line.
+As soon as one property fails, the running checks are killed and the remaining ones are skipped.
+"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import json
+import logging
+import os
+import shlex
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+
+from common import setup_logging
+from get_nof_properties import get_nof_properties
+from profiling import span, count, start_profiling
+
+logger = logging.getLogger(__name__)
+
+CORRECT = 'correct'
+INCORRECT = 'incorrect'
+TIMEOUT = 'timeout'
+ERROR = 'error'
+CANCELLED = 'cancelled'
+
+
+class CommandChecker:
+    """ Runs an IIMC-like checker, can be aborted from another thread. """
+
+    def __init__(self, cmd: str):
+        self.cmd = shlex.split(cmd)
+        self._procs = set()
+        self._lock = threading.Lock()
+        self._aborted = False
+
+    def __call__(self, model_file: str, pi: int, timeout: float or None) -> (str, str):
+        """
+        :return: status and the checker output
+        """
+        with self._lock:
+            if self._aborted:
+                return CANCELLED, ''
+            proc = subprocess.Popen(self.cmd + [model_file, '--pi', str(pi)],
+                                    stdout=subprocess.PIPE,
+                                    stderr=subprocess.STDOUT,
+                                    universal_newlines=True,
+                                    start_new_session=True)  # to kill the checker with its children
+            self._procs.add(proc)
+        try:
+            out, _ = proc.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            _kill(proc)
+            out, _ = proc.communicate()
+            return TIMEOUT, out
+        finally:
+            with self._lock:
+                self._procs.discard(proc)
+
+        if self._aborted:
+            return CANCELLED, out
+        if proc.returncode != 0:
+            return ERROR, out
+
+        lines = out.strip().splitlines()
+        answer = lines[-1].strip() if lines else ''
+        if answer == '0':
+            return CORRECT, out
+        if answer == '1':
+            return INCORRECT, out
+        return ERROR, out
+
+    def abort(self):
+        with self._lock:
+            self._aborted = True
+            for proc in self._procs:
+                _kill(proc)
+
+
+def _kill(proc: subprocess.Popen):
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except OSError:  # already finished
+        pass
+
+
+def check_model(model_file: str, checker, jobs: int=1, timeout: float or None=None, coi: bool=False) -> dict:
+    """
+    :param checker: callable (model_file, property index, timeout) -> (status, output)
+                    with method `abort()` that cancels the running and future calls
+    :param coi: check each property on its cone of influence (see aig_coi.py)
+    :return: summary: {'model', 'correct', 'time', 'properties': [{'property', 'status', 'time'}]}
+    """
+    start = time.time()
+    nof_properties = get_nof_properties(model_file)
+    logger.info('the number of properties to be checked is %i', nof_properties)
+
+    coi_dir = property_files = None
+    if coi:
+        from aig_coi import write_property_models  # needs aiger_swig
+        coi_dir = tempfile.mkdtemp(prefix='mc_coi_')
+        with span('coi_models'):
+            property_files = write_property_models(model_file, coi_dir)
+
+    def check(pi):
+        pi_model, pi_index = (property_files[pi], 0) if coi else (model_file, pi)
+        pi_start = time.time()
+        with span('check_property', property=pi):
+            status, out = checker(pi_model, pi_index, timeout)
+        count('properties_' + status)
+        result = {'property': pi, 'status': status, 'time': round(time.time() - pi_start, 3)}
+        logger.info('property #%i: %s (%.2fs)', pi, status, result['time'])
+        if status in (INCORRECT, ERROR):
+            if status == ERROR:
+                logger.error('checker failed on property #%i:\n%s', pi, out)
+            checker.abort()
+        return result
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+            results = list(executor.map(check, range(nof_properties)))
+    finally:
+        if coi_dir:
+            shutil.rmtree(coi_dir, ignore_errors=True)
+
+    return {'model': model_file,
+            'correct': all(r['status'] == CORRECT for r in results),
+            'time': round(time.time() - start, 3),
+            'properties': results}
+
+
+def main(model_file, checker_cmd, jobs, timeout, coi, json_file):
+    summary = check_model(model_file, CommandChecker(checker_cmd), jobs, timeout, coi)
+
+    text = json.dumps(summary, indent=2)
+    if json_file:
+        with open(json_file, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if summary['correct']:
+        logger.info('model checking is done, the circuit is correct')
+        return 0
+    logger.error('model checking: the circuit is not proven correct')
+    return 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Model check all properties of a HWMCC model. '
+                                                 'Prints JSON summary, exits with 0 iff all properties hold.')
+
+    parser.add_argument('model', metavar='model', type=str,
+                        help='model in the HWMCC format')
+    parser.add_argument('--checker', required=True,
+                        help='checker command, called as `<checker> <model> --pi <i>`, '
+                             'its last output line should be 0 (holds) or 1 (fails)')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='number of properties checked in parallel (default %(default)s)')
+    parser.add_argument('--timeout', type=float, default=None,
+                        help='seconds for checking one property (default: no limit)')
+    parser.add_argument('--coi', action='store_true', default=False,
+                        help='check each property on its cone of influence (see aig_coi.py)')
+    parser.add_argument('--json', default=None,
+                        help='write the summary into this file instead of stdout')
+    parser.add_argument('-v', '--verbose', action='count', default=0)
+    parser.add_argument('--profile', default=None, metavar='FILE',
+                        help='write the profile (Chrome trace JSON, see profiling.py) into this file')
+
+    args = parser.parse_args()
+    if args.profile:
+        start_profiling(args.profile)
+
+    setup_logging(__name__, verbose_level=args.verbose)
+
+    exit(main(args.model, args.checker, args.jobs, args.timeout, args.coi, args.json))
@@ -0,0 +1,136 @@
+"""
+Wall-clock time of the stages of the toolchain, and tracing.
+
+The stages of `spec_2_aag.py` are:
+  parsing, translation (building automata, GOAL calls), smv_emission,
+  flattening (smvflatten), aig_conversion, optimization;
+`run_tests.py` adds synthesis.
+The time of a stage that is entered several times (e.g., from several threads) is summed.
+
+Tracing is off unless `start_profiling` is called (the `--profile FILE` option of the tools).
+Then stages and spans (GOAL calls, automata, shell calls, AIGER reads and writes, ...) are recorded
+as Chrome trace events, and counters (states, edges, labels, ...) are summed.
+The profile is written at exit in the Chrome trace format (open it in chrome://tracing or Perfetto),
+with two additional keys: `stages` (stage |-> seconds) and `counters` (counter |-> value).
+"""
+
+import atexit
+from contextlib import contextmanager
+import json
+import os
+import threading
+import time
+
+STAGES = ('parsing', 'translation', 'smv_emission', 'flattening', 'aig_conversion', 'optimization', 'synthesis')
+
+_lock = threading.Lock()
+_stage_times = dict()  # stage |-> seconds
+_counters = dict()     # counter |-> value
+_events = []           # Chrome trace events
+_is_tracing = False
+
+
+def _micros(seconds: float) -> int:
+    return int(seconds * 1000000)
+
+
+def _add_event(event: dict):
+    event['pid'] = os.getpid()
+    event['tid'] = threading.get_ident()
+    with _lock:
+        _events.append(event)
+
+
+@contextmanager
+def span(name: str, cat: str='span', **args):
+    """ Trace the time spent inside the `with` block; `args` are shown with the event. """
+    if not _is_tracing:
+        yield
+        return
+
+    start = time.time()
+    try:
+        yield
+    finally:
+        _add_event({'name': name, 'cat': cat, 'ph': 'X',
+                    'ts': _micros(start), 'dur': _micros(time.time() - start),
+                    'args': args})
+
+
+@contextmanager
+def stage(name: str):
+    start = time.time()
+    try:
+        with span(name, cat='stage'):
+            yield
+    finally:
+        add_stage_time(name, time.time() - start)
+
+
+def add_stage_time(name: str, seconds: float):
+    with _lock:
+        _stage_times[name] = _stage_times.get(name, 0) + seconds
+
+
+def get_stage_times() -> dict:
+    with _lock:
+        return dict(_stage_times)
+
+
+def write_stage_times(file_name: str):
+    with open(file_name, 'w') as f:
+        json.dump(dict((name, round(t, 3)) for (name, t) in get_stage_times().items()), f)
+
+
+def read_stage_times(file_name: str) -> dict:
+    with open(file_name) as f:
+        return json.load(f)
+
+
+def count(name: str, value: int=1):
+    """ Add `value` to counter `name` (counters are kept only while tracing). """
+    if not _is_tracing:
+        return
+    with _lock:
+        total = _counters[name] = _counters.get(name, 0) + value
+    _add_event({'name': name, 'cat': 'counter', 'ph': 'C', 'ts': _micros(time.time()),
+                'args': {name: total}})
+
+
+def get_counters() -> dict:
+    with _lock:
+        return dict(_counters)
+
+
+def is_tracing() -> bool:
+    return _is_tracing
+
+
+def start_profiling(file_name: str):
+    """ Start tracing, and write the profile into `file_name` at exit (also on errors). """
+    global _is_tracing
+    _is_tracing = True
+    atexit.register(write_profile, file_name)
+
+
+def write_profile(file_name: str):
+    with _lock:
+        profile = {'traceEvents': list(_events),
+                   'displayTimeUnit': 'ms',
+                   'stages': dict((name, round(t, 3)) for (name, t) in _stage_times.items()),
+                   'counters': dict(_counters)}
+    with open(file_name, 'w') as f:
+        json.dump(profile, f)
+
+
+def merge_profile(file_name: str):
+    """ Add the stage times, counters and events of the profile written by another process. """
+    with open(file_name) as f:
+        profile = json.load(f)
+    for (name, seconds) in profile['stages'].items():
+        add_stage_time(name, seconds)
+    with _lock:
+        for (name, value) in profile['counters'].items():
+            _counters[name] = _counters.get(name, 0) + value
+        if _is_tracing:
+            _events.extend(profile['traceEvents'])
@@ -1,9 +1,15 @@
 #!/usr/bin/env python3
 import os
 import argparse
+import csv
+import json
 import re
+import shlex
+import time
+from concurrent.futures import ThreadPoolExecutor
 from tempfile import NamedTemporaryFile
 from nose.tools import assert_equal
+from profiling import STAGES, read_stage_times
 from python_ext import readfile, stripped_non_empty
 from shell import execute_shell
 
@@ -25,6 +31,12 @@ TESTS_DIRS = ["./tests/"]
 TOOL = os.path.join(MY_DIR, "spec_2_aag.py")
 ############################################################################
 
+PASSED = 'passed'
+FAILED = 'failed'
+REPORT_COLUMNS = ('test', 'status', 'total') + STAGES + ('error',)
+
+DEFAULT_LOGS_DIR = 'test_logs'
+
 
 def get_tmp_file_name():
     tmp = NamedTemporaryFile(delete=False)
@@ -45,15 +57,14 @@ def status_to_str(exit_status):
     return ['unrealizable', 'realizable'][exit_status == EXIT_STATUS_REALIZABLE]
 
 
-def convert_and_check(test):
-    rc, out, err = execute_shell(TOOL + ' ' + test)
-
-    if rc != 0:
-        print()
-        print(test)
-        print('The tool returned a non-zero status: ', to_str_ret_out_err(rc, out, err))
-        exit(1)
-
+def convert_and_check(test, timings_file, log_dir=None):
+    """ :param log_dir: run the tool there, so that it writes its log `last.log` there """
+    cmd = TOOL + ' --timings ' + timings_file + ' ' + test
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+        cmd = 'cd %s && %s' % (shlex.quote(log_dir), cmd)
+    rc, out, err = execute_shell(cmd)
+    assert rc == 0, 'The tool returned a non-zero status: ' + to_str_ret_out_err(rc, out, err)
     return out
 
 
@@ -68,7 +79,6 @@ def synthesize_spec(aag_spec: str) -> bool:
         f.write(aag_spec)
 
     cmd_line = AISY + ' ' + tmp_file_name + ' -q -r'
-    print('  synthesizing: \n', cmd_line)
     ret, out, err = execute_shell(cmd_line)
 
     assert not err.strip(), err
@@ -92,22 +102,77 @@ def get_all_smv_files(directory: str):
     return matching_files
 
 
-def main(synthesize):
+def get_log_dir(logs_dir, test) -> str:
+    """
+    >>> get_log_dir('logs', os.path.join(MY_DIR, 'tests', 'arbiter-unreal', 'interface.smv'))
+    'logs/tests_arbiter-unreal_interface'
+    """
+    name = os.path.splitext(os.path.relpath(test, MY_DIR))[0]
+    return os.path.join(logs_dir, re.sub(r'[^\w.-]', '_', name.replace(os.sep, '_')))
+
+
+def run_test(test, synthesize, log_dir=None) -> dict:
+    """
+    :param log_dir: see `convert_and_check`
+    :return: report row: test, status, error (if failed), total and stage times in seconds
+    """
+    start = time.time()
+    row = {'test': test, 'status': PASSED}
+    timings_file = get_tmp_file_name()
+    try:
+        aag_spec = convert_and_check(test, timings_file, log_dir)
+        row.update(read_stage_times(timings_file))
+        if synthesize:
+            synthesis_start = time.time()
+            is_realizable_actual = synthesize_spec(aag_spec)
+            row['synthesis'] = round(time.time() - synthesis_start, 3)
+            assert_equal(is_realizable(test), is_realizable_actual, 'wrong realizability')
+    except Exception as e:
+        row['status'] = FAILED
+        row['error'] = str(e)
+    finally:
+        os.remove(timings_file)
+    row['total'] = round(time.time() - start, 3)
+
+    print('{status}: {test} ({total:.2f}s)'.format(**row))
+    if row['status'] == FAILED:
+        print(row['error'])
+    return row
+
+
+def write_report(rows, file_name):
+    """ CSV if `file_name` ends with `.csv`, otherwise JSON """
+    with open(file_name, 'w') as f:
+        if file_name.endswith('.csv'):
+            writer = csv.DictWriter(f, REPORT_COLUMNS, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(rows)
+        else:
+            json.dump(rows, f, indent=2)
+
+
+def main(synthesize, jobs=1, report_file=None, logs_dir=DEFAULT_LOGS_DIR):
+    """ :param logs_dir: with several `jobs`, each test writes its log into its own directory there """
     tests = []
     for td in TESTS_DIRS:
         tests.extend(get_all_smv_files(os.path.join(MY_DIR, td)))
 
     assert tests, 'no tests found'
+    tests = [os.path.abspath(t) for t in tests]
 
-    for t in tests:
-        t = os.path.abspath(t)
-        print('converting:\n' + TOOL + ' ' + t)
-        aag_spec = convert_and_check(t)
-        if synthesize:
-            is_realizable_expected = is_realizable(t)
-            is_realizable_actual = synthesize_spec(aag_spec)
-            assert_equal(is_realizable_expected, is_realizable_actual, 'test failed: ' + t)
-        print()
+    get_test_log_dir = (lambda t: get_log_dir(logs_dir, t)) if jobs > 1 else (lambda t: None)
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+        rows = list(executor.map(lambda t: run_test(t, synthesize, get_test_log_dir(t)), tests))
+
+    if report_file:
+        write_report(rows, report_file)
+
+    failed = [r['test'] for r in rows if r['status'] == FAILED]
+    print()
+    if failed:
+        print('FAILED TESTS ({} of {}):'.format(len(failed), len(rows)))
+        print('\n'.join(failed))
+        return 1
 
     print('ALL TESTS PASSED')
     return 0
@@ -120,7 +185,15 @@ if __name__ == "__main__":
                         required=False, default=False,
                         help='synthesize the resulting spec, default: False. '
                              'NOTE: modify the path to aisy.')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='number of tests run in parallel (default %(default)s)')
+    parser.add_argument('--report', default=None, metavar='FILE',
+                        help='write the status and stage times of each test into this file '
+                             '(CSV if it ends with .csv, JSON otherwise)')
+    parser.add_argument('--logs-dir', default=DEFAULT_LOGS_DIR, metavar='DIR',
+                        help='with several jobs, the log of each test goes into its own directory in DIR '
+                             '(default %(default)s), otherwise into last.log')
 
     args = parser.parse_args()
 
-    exit(main(args.aisy))
+    exit(main(args.aisy, args.jobs, args.report, os.path.abspath(args.logs_dir)))
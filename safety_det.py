@@ -0,0 +1,165 @@
+"""
+In-process determinization of safety and co-safety Buchi automata,
+so that the common case does not need GOAL.
+
+A nondeterministic Buchi automaton is handled if
+  - all its reachable states are accepting (safety):
+    a word is accepted iff every prefix has a run (by Koenig's lemma),
+    i.e., iff the subset construction never reaches the empty set, or
+  - all its accepting states have a `True` self-loop (co-safety):
+    a word is accepted iff some prefix reaches an accepting state.
+The result of the subset construction is minimized (Moore's algorithm)
+and converted into `CompactAutomaton` (complemented if needed).
+Other automata, or automata over too many propositions, are left to GOAL.
+"""
+
+import logging
+
+from labels import get_propositions, label_to_masks, is_satisfied, valuations_to_cubes
+from structs import CompactAutomaton
+
+logger = logging.getLogger(__name__)
+
+MAX_PROPOSITIONS = 10
+MAX_DET_STATES = 1000
+
+_ACC = 'acc'  # the subset containing an accepting state of a co-safety automaton
+
+
+def determinize(init_states, edges: dict, acc_states, complement: bool=False) -> CompactAutomaton or None:
+    """
+    :param edges: dict (src,dst) |-> set of labels
+    :return: deterministic automaton, or None if the automaton is not handled
+
+    >>> determinize({'q0'}, {('q0','q0'): {('True',)}, ('q0','q1'): {('a',)}, ('q1','q1'): {('a',)}}, {'q0'},
+    ...             complement=True) is None
+    True
+    """
+
+    props = get_propositions(l for labels in edges.values() for l in labels)
+    if not props or len(props) > MAX_PROPOSITIONS:
+        logger.debug('unsupported number of propositions for native determinization: %i', len(props))
+        return None
+    index_by_prop = dict((p, i) for (i, p) in enumerate(props))
+
+    succ_by_state = dict()  # state |-> list of (dst, list of label masks)
+    for ((src, dst), labels) in edges.items():
+        masks = [m for m in (label_to_masks(l, index_by_prop) for l in labels) if m is not None]
+        if masks:
+            succ_by_state.setdefault(src, []).append((dst, masks))
+
+    reachable = _get_reachable(init_states, succ_by_state)
+    if reachable.issubset(acc_states):
+        is_cosafety = False
+    elif all(_has_true_self_loop(s, edges) for s in reachable.intersection(acc_states)):
+        is_cosafety = True
+    else:
+        return None
+
+    valuations = range(1 << len(props))
+
+    def post(subset, v):
+        if subset == _ACC:
+            return _ACC
+        res = frozenset(dst
+                        for s in subset
+                        for (dst, masks) in succ_by_state.get(s, ())
+                        if any(is_satisfied(m, v) for m in masks))
+        if is_cosafety and not res.isdisjoint(acc_states):
+            return _ACC
+        return res
+
+    init = frozenset(init_states)
+    if is_cosafety and not init.isdisjoint(acc_states):
+        init = _ACC
+
+    delta = dict()  # subset |-> tuple of successors, indexed by valuations
+    queue = [init]
+    while queue:
+        subset = queue.pop()
+        if subset in delta:
+            continue
+        delta[subset] = tuple(post(subset, v) for v in valuations)
+        if len(delta) > MAX_DET_STATES:
+            logger.debug('too many states for native determinization')
+            return None
+        queue.extend(s for s in set(delta[subset]) if s not in delta)
+
+    # the special state that makes the automaton (co-)safety
+    special = _ACC if is_cosafety else frozenset()
+    # trivial language (the special state is unreachable, or initial), leave it to GOAL
+    if special not in delta or init == special:
+        return None
+
+    block_by_subset = minimize(delta, lambda s: (s == special, s == frozenset()))
+
+    nof_blocks = max(block_by_subset.values()) + 1
+    valuations_by_edge = dict()
+    for subset, succs in delta.items():
+        src = block_by_subset[subset]
+        for v, dst_subset in enumerate(succs):
+            valuations_by_edge.setdefault((src, block_by_subset[dst_subset]), set()).add(v)
+
+    succ = [[] for _ in range(nof_blocks)]
+    for ((src, dst), vals) in sorted(valuations_by_edge.items()):
+        succ[src].append((dst, tuple(sorted(valuations_to_cubes(vals, len(props))))))
+
+    # the names are chosen like in GOAL's output
+    state_names = tuple(str(b) for b in range(nof_blocks))
+    states = frozenset(range(nof_blocks))
+    special_state = block_by_subset[special]
+    init_state = block_by_subset[init]
+
+    if not is_cosafety and not complement:
+        acc, dead, is_safety = states - {special_state}, {special_state}, True
+    elif not is_cosafety and complement:
+        acc, dead, is_safety = {special_state}, set(), False
+    elif is_cosafety and not complement:
+        empty = frozenset()
+        acc, dead, is_safety = {special_state}, {block_by_subset[empty]} if empty in delta else set(), False
+    else:
+        acc, dead, is_safety = states - {special_state}, {special_state}, True
+
+    automaton = CompactAutomaton(state_names, init_state, acc, dead, is_safety, props, (tuple(s) for s in succ))
+
+    logger.info('native determinization: %s automaton with %i states',
+                ['co-safety', 'safety'][automaton.is_safety], nof_blocks)
+
+    return automaton
+
+
+def _get_reachable(init_states, succ_by_state) -> set:
+    reachable = set(init_states)
+    queue = list(init_states)
+    while queue:
+        s = queue.pop()
+        for (dst, _) in succ_by_state.get(s, ()):
+            if dst not in reachable:
+                reachable.add(dst)
+                queue.append(dst)
+    return reachable
+
+
+def _has_true_self_loop(s, edges) -> bool:
+    return any(all(l == 'True' for l in label)
+               for label in edges.get((s, s), ()))
+
+
+def minimize(delta: dict, get_class) -> dict:
+    """
+    Moore's partition refinement.
+    :param get_class: states of different classes are never merged
+    :return: dict state |-> block number
+    """
+    class_ids = dict()
+    block_by_state = dict((s, class_ids.setdefault(get_class(s), len(class_ids)))
+                          for s in delta)
+    while True:
+        signatures = dict()
+        new_block_by_state = dict()
+        for s, succs in delta.items():
+            signature = (block_by_state[s], tuple(block_by_state[d] for d in succs))
+            new_block_by_state[s] = signatures.setdefault(signature, len(signatures))
+        if len(signatures) == len(set(block_by_state.values())):
+            return new_block_by_state
+        block_by_state = new_block_by_state
@@ -0,0 +1,117 @@
+"""
+In-process product of deterministic safety automata, minimized,
+so that several safety properties are encoded by one automaton (often much smaller than all of them).
+
+The product is `bad` iff one of the automata is `bad` (i.e., in a dead state).
+The product states where some automaton is dead are merged into one dead trap state
+(the trace is already rejected, see `Automaton`),
+and an automaton that falls out (has no edge for the input) stays in its sink, which is not `bad`,
+like in the SMV module of the automaton (see `spec_2_smv.det_automaton_to_smv_module`).
+The product is built over the valuations of all propositions and minimized (Moore's algorithm);
+products over too many propositions, or with too many states, are not built.
+"""
+
+import logging
+
+from labels import is_satisfied, valuations_to_cubes
+from safety_det import minimize
+from structs import Automaton, CompactAutomaton
+
+logger = logging.getLogger(__name__)
+
+MAX_PROPOSITIONS = 12
+MAX_PRODUCT_STATES = 5000
+
+_DEAD = 'dead'  # the product state where some automaton is dead
+_DEAD_COMPONENT = -1
+
+
+def build_safety_product(automata) -> CompactAutomaton or None:
+    """
+    :param automata: deterministic safety automata (`Automaton` or `CompactAutomaton`)
+    :return: minimized product automaton,
+             or None if it is too large, or cannot reach a dead state (the properties always hold)
+    """
+    automata = [CompactAutomaton.from_automaton(a) if isinstance(a, Automaton) else a
+                for a in automata]
+    assert all(a.is_safety for a in automata)
+
+    props = tuple(sorted(set(p for a in automata for p in a.propositions)))
+    if len(props) > MAX_PROPOSITIONS:
+        logger.info('safety product is not built: %i propositions (maximum %i)', len(props), MAX_PROPOSITIONS)
+        return None
+    index_by_prop = dict((p, i) for (i, p) in enumerate(props))
+    valuations = range(1 << len(props))
+
+    # rows[k][s]: the successor of state `s` of the k-th automaton for every valuation of `props`
+    # (len(state_names) is the sink, dead states are _DEAD_COMPONENT)
+    rows = [_get_successor_rows(a, [index_by_prop[p] for p in a.propositions], valuations)
+            for a in automata]
+
+    init = tuple(a.init_state for a in automata)
+    if any(s in a.dead_states for (s, a) in zip(init, automata)):
+        init = _DEAD
+
+    delta = dict()  # product state |-> tuple of successors, indexed by valuations
+    queue = [init]
+    while queue:
+        state = queue.pop()
+        if state in delta:
+            continue
+        if state == _DEAD:
+            delta[state] = (_DEAD,) * len(valuations)
+        else:
+            delta[state] = tuple(_DEAD if _DEAD_COMPONENT in succ else succ
+                                 for succ in zip(*(r[s] for (r, s) in zip(rows, state))))
+        if len(delta) > MAX_PRODUCT_STATES:
+            logger.info('safety product is not built: more than %i states', MAX_PRODUCT_STATES)
+            return None
+        queue.extend(s for s in set(delta[state]) if s not in delta)
+
+    if _DEAD not in delta:
+        logger.info('safety product is not built: the properties cannot be violated')
+        return None
+
+    block_by_state = minimize(delta, lambda s: s == _DEAD)
+
+    nof_blocks = max(block_by_state.values()) + 1
+    valuations_by_edge = dict()
+    for state, succs in delta.items():
+        src = block_by_state[state]
+        for v, dst_state in enumerate(succs):
+            valuations_by_edge.setdefault((src, block_by_state[dst_state]), set()).add(v)
+
+    succ = [[] for _ in range(nof_blocks)]
+    for ((src, dst), vals) in sorted(valuations_by_edge.items()):
+        succ[src].append((dst, tuple(sorted(valuations_to_cubes(vals, len(props))))))
+
+    dead_state = block_by_state[_DEAD]
+
+    logger.info('safety product of %i automata: %i states (%i before minimization, %i in the automata)',
+                len(automata), nof_blocks, len(delta), sum(len(a.state_names) for a in automata))
+
+    return CompactAutomaton(tuple(str(b) for b in range(nof_blocks)), block_by_state[init],
+                            set(range(nof_blocks)) - {dead_state}, {dead_state}, True,
+                            props, (tuple(s) for s in succ))
+
+
+def _get_successor_rows(automaton: CompactAutomaton, prop_indices, valuations) -> list:
+    """ :param prop_indices: indices of the propositions of `automaton` in the valuations """
+    sink = len(automaton.state_names)
+
+    projections = [sum((v >> index & 1) << i for (i, index) in enumerate(prop_indices))
+                   for v in valuations]
+
+    rows = []
+    for s in range(sink):
+        succ_by_projection = [sink] * (1 << len(prop_indices))
+        for projection in range(len(succ_by_projection)):
+            for (dst, labels) in automaton.succ[s]:
+                if any(is_satisfied(m, projection) for m in labels):
+                    succ_by_projection[projection] = dst
+                    break
+        rows.append(tuple(succ_by_projection[p] for p in projections))
+    rows.append((sink,) * len(valuations))
+
+    return [tuple(_DEAD_COMPONENT if s in automaton.dead_states else s for s in row)
+            for row in rows]
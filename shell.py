@@ -1,10 +1,12 @@
 import subprocess
 import sys
 
+from profiling import span
+
 
 if sys.version_info < (3, 0):
     # python2.7 version
-    def execute_shell(cmd, input=''):
+    def _execute_shell(cmd, input=''):
         """
         :param cmd:
         :param input: sent to sdtin
@@ -29,7 +31,7 @@ if sys.version_info < (3, 0):
         return p.returncode, out, err
 
 else:
-    def execute_shell(cmd, input=''):
+    def _execute_shell(cmd, input=''):
         """
         :param cmd:
         :param input: sent to sdtin
@@ -51,3 +53,9 @@ else:
             out, err = p.communicate()
 
         return p.returncode, str(out, encoding='utf-8'), str(err, encoding='utf-8')
+
+
+def execute_shell(cmd, input=''):
+    """ :return: returncode, stdout, stderr (see `_execute_shell`) """
+    with span('shell', cmd=cmd):
+        return _execute_shell(cmd, input)
@@ -5,11 +5,24 @@ import subprocess
 import sys
 import os
 import argparse
+import shlex
+import tempfile
 
 from nose.tools import assert_equal
 
+from aig_opt import optimize
+import aiger_swig.aiger_wrap as aiglib
+from aiger_io import read_aiger_from_bytes, write_aiger_to
+from automata import GOAL_SCRIPT_VERSION
+from automaton_cache import AutomatonCache, DEFAULT_CACHE_DIR
+from common import setup_logging
+from goal_utils import set_goal_pool, create_goal_pool
+from profiling import stage, merge_profile, write_stage_times, start_profiling
 from python_ext import find, readfile
 from spec_parser import is_section_declaration
+import spec_2_aig
+
+BACKENDS = ('aig', 'smv')
 
 
 def get_controllable_var_section(smv_lines) -> list:
@@ -49,26 +62,106 @@ def rename(l, outputs) -> str:
         return l
 
 
-def main(smv_spec_file_name, verbose_level):
+def build_aiger_directly(smv_spec_file_name, no_cache=False, cache_dir=None, jobs=1, state_encoding=None,
+                         optimize_result=False, safety_product=False) -> aiglib.aiger:
+    """
+    Build the circuit in this process (see `spec_2_aig.py`).
+    :raise spec_2_aig.UnsupportedSmvError: if the specification needs the SMV route
+    """
+    if jobs > 1:
+        set_goal_pool(create_goal_pool(jobs))
+
+    cache = None
+    if not no_cache:
+        cache = AutomatonCache(cache_dir or DEFAULT_CACHE_DIR, version=GOAL_SCRIPT_VERSION)
+
+    builder = spec_2_aig.main(readfile(smv_spec_file_name).splitlines(),
+                              os.path.dirname(smv_spec_file_name),
+                              cache,
+                              jobs,
+                              encoding=state_encoding or 'enum',
+                              safety_product=safety_product)
+
+    with stage('aig_conversion'):
+        model = builder.to_aiger()
+    if optimize_result:
+        with stage('optimization'):
+            model = optimize(model)
+    return model
+
+
+def main(smv_spec_file_name, verbose_level, no_cache=False, cache_dir=None, jobs=1, state_encoding=None,
+         backend='aig', optimize_result=False, timings_file=None, safety_product=False, binary=False):
+    """
+    :param timings_file: write the time of each stage into this file (JSON, see profiling.py)
+    :param binary: print the binary AIGER format (aig) instead of the ASCII one (aag)
+    """
+    try:
+        return _main(smv_spec_file_name, verbose_level, no_cache, cache_dir, jobs, state_encoding,
+                     backend, optimize_result, safety_product, binary)
+    finally:
+        if timings_file:
+            write_stage_times(timings_file)
+
+
+def _main(smv_spec_file_name, verbose_level, no_cache, cache_dir, jobs, state_encoding,
+          backend, optimize_result, safety_product, binary):
     logger = logging.getLogger(__name__)
+
+    outputs = get_controllable(readfile(smv_spec_file_name).splitlines())
+    assert outputs, 'there are no controllable signals, abort'
+
+    if backend == 'aig':
+        try:
+            model = build_aiger_directly(smv_spec_file_name, no_cache, cache_dir, jobs, state_encoding,
+                                         optimize_result, safety_product)
+            with stage('aig_conversion'):
+                write_aiger_to(model, sys.stdout, binary)
+            return 0
+        except spec_2_aig.UnsupportedSmvError as e:
+            logger.info('using the SMV route, the direct AIG backend does not support: %s', e)
+
     scripts_dir = os.path.dirname(os.path.abspath(__file__))
     spec_2_smv_path = scripts_dir + '/spec_2_smv.py'
-    verbosity = '-{}'.format('v'*verbose_level) if verbose_level else ''
+    spec_2_smv_options = []
+    if verbose_level:
+        spec_2_smv_options.append('-{}'.format('v'*verbose_level))
+    if no_cache:
+        spec_2_smv_options.append('--no-cache')
+    if cache_dir:
+        spec_2_smv_options.append('--cache-dir ' + shlex.quote(cache_dir))
+    if jobs > 1:
+        spec_2_smv_options.append('--jobs %i' % jobs)
+    if state_encoding:
+        spec_2_smv_options.append('--state-encoding ' + state_encoding)
+    if safety_product:
+        spec_2_smv_options.append('--safety-product')
     latches_2_output_path = scripts_dir + '/latches_2_output.py'
     logger.debug('calling to %s' % spec_2_smv_path)
 
     # i could not fix the problem with unicode encodings when using execute_shell (with separate checks of exit statuses),
-    # so use piping here instead
-    aig = str(subprocess.check_output('{spec_2_smv} {verbosity} {spec_file} | smvflatten | smvtoaig | aigtoaig -a | {latches_2_output}'
+    # so pipe bytes here instead; the stages run one after another to be timed separately
+    with tempfile.NamedTemporaryFile(prefix='spec_2_smv_profile_', suffix='.json') as smv_profile:
+        smv = subprocess.check_output('{spec_2_smv} {options} --profile {profile} {spec_file}'
                                       .format(spec_2_smv=spec_2_smv_path,
-                                              verbosity=verbosity,
-                                              spec_file=smv_spec_file_name,
-                                              latches_2_output=latches_2_output_path),
-                                      shell=True),
-              encoding=sys.getdefaultencoding())
+                                              options=' '.join(spec_2_smv_options),
+                                              profile=smv_profile.name,
+                                              spec_file=smv_spec_file_name),
+                                      shell=True)
+        merge_profile(smv_profile.name)  # stage times, and the trace of spec_2_smv.py
 
-    outputs = get_controllable(readfile(smv_spec_file_name).splitlines())
-    assert outputs, 'there are no controllable signals, abort'
+    with stage('flattening'):
+        flat_smv = subprocess.check_output('smvflatten', input=smv, shell=True)
+
+    with stage('aig_conversion'):
+        aig = subprocess.check_output('smvtoaig | aigtoaig -a | ' + latches_2_output_path,
+                                      input=flat_smv, shell=True)
+
+    if optimize_result:
+        with stage('optimization'):
+            aig = subprocess.check_output(scripts_dir + '/aig_opt.py', input=aig, shell=True)
+
+    aig = str(aig, encoding=sys.getdefaultencoding())
 
     lines = aig.splitlines()
 
@@ -86,6 +179,11 @@ def main(smv_spec_file_name, verbose_level):
 
     result += lines[i:]
 
+    if binary:
+        with stage('aig_conversion'):
+            write_aiger_to(read_aiger_from_bytes(('\n'.join(result) + '\n').encode()), sys.stdout, binary)
+        return 0
+
     print('\n'.join(result))
     return 0
 
@@ -99,6 +197,35 @@ if __name__ == "__main__":
     parser.add_argument('file', metavar='file',
                         type=argparse.FileType(),
                         help='input smv spec file')
+    parser.add_argument('--no-cache', action='store_true', default=False,
+                        help='do not use the cache of automata built in previous runs')
+    parser.add_argument('--cache-dir', default=None,
+                        help='directory of the cache of automata (see spec_2_smv.py)')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='number of properties built in parallel (default %(default)s)')
+    parser.add_argument('--state-encoding', choices=('enum', 'binary', 'onehot', 'gray'), default=None,
+                        help='encoding of automata states (see spec_2_smv.py)')
+    parser.add_argument('--backend', choices=BACKENDS, default='aig',
+                        help='aig builds the circuit in this process '
+                             '(falls back to smv for specifications it does not support), '
+                             'smv pipes spec_2_smv.py through smvflatten and smvtoaig (default %(default)s)')
+    parser.add_argument('--optimize', '-O', action='store_true', default=False,
+                        help='simplify the circuit (see aig_opt.py)')
+    parser.add_argument('--safety-product', action='store_true', default=False,
+                        help='encode the safety assumptions (guarantees) by the minimized product '
+                             'of their automata (see spec_2_smv.py)')
+    parser.add_argument('--binary', action='store_true', default=False,
+                        help='print the binary AIGER format (aig) instead of the ASCII one (aag)')
+    parser.add_argument('--timings', default=None, metavar='FILE',
+                        help='write the time of each stage into this file (JSON)')
+    parser.add_argument('--profile', default=None, metavar='FILE',
+                        help='write the profile (Chrome trace JSON, see profiling.py) into this file')
 
     args = parser.parse_args()
-    exit(main(args.file.name, args.verbose))
+    if args.profile:
+        start_profiling(args.profile)
+    # like spec_2_smv.py given the same `-v`s, but into stderr only (no `last.log` in the working directory)
+    setup_logging(__name__, verbose_level=args.verbose - 1, log_file=False)
+    exit(main(args.file.name, args.verbose, args.no_cache, args.cache_dir, args.jobs, args.state_encoding,
+              args.backend, args.optimize, args.timings, args.safety_product,
+              args.binary))
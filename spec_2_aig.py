@@ -0,0 +1,346 @@
+"""
+Direct translation of the extended SMV format into AIGER,
+without printing SMV and running `smvflatten | smvtoaig | aigtoaig | latches_2_output.py`.
+
+Only the specification module with boolean variables and boolean DEFINEs is supported:
+other modules, `ASSIGN`, `INIT`, `TRANS`, non-boolean variables, etc., raise `UnsupportedSmvError`,
+and the caller should use the SMV route (see `spec_2_aag.py`).
+The circuit is the one described by the SMV of `spec_2_smv.py`:
+automata states are binary-encoded latches, the fairness flags are latches,
+and the special latches `sys_prop_bad_variable`, `env_prop_constr_variable`,
+`sys_prop_just_variable`, `env_prop_fair_variable` define the AIGER properties
+(like `latches_2_output.py` does).
+"""
+
+import logging
+import re
+
+from aig_builder import AigBuilder, add_fairness_flags, negate, TRUE_LIT, FALSE_LIT
+from automaton_cache import AutomatonCache
+from spec_parser import parse_smv
+from canonical_spec import rename_automaton
+from spec_2_smv import build_canonical_automata, merge_safety_properties, get_state_codes, \
+    generate_name_for_property_module
+from labels import minimize_cubes
+from profiling import stage
+from structs import Automaton, CompactAutomaton
+
+logger = logging.getLogger(__name__)
+
+
+class UnsupportedSmvError(Exception):
+    pass
+
+
+_SECTIONS = ('VAR', 'DEFINE')
+_UNSUPPORTED_SECTIONS = ('ASSIGN', 'INIT', 'TRANS', 'INVAR', 'IVAR', 'FROZENVAR', 'CONSTANTS',
+                         'FAIRNESS', 'JUSTICE', 'COMPASSION',
+                         'SPEC', 'CTLSPEC', 'LTLSPEC', 'INVARSPEC', 'PSLSPEC', 'COMPUTE', 'ISA')
+
+
+def parse_main_module(module_str: str) -> (list, dict):
+    """
+    :return: variables as a list of (name, is_controllable), and definitions as dict name |-> expression
+    >>> parse_main_module('MODULE main\\nVAR\\n  r: boolean;\\nVAR --controllable\\n  g: boolean;\\n'
+    ...                   'DEFINE\\n  rg := r & g; -- comment')
+    ([('r', False), ('g', True)], {'rg': 'r & g'})
+    """
+    variables = []
+    definitions = dict()
+    section = None
+    is_controllable = False
+    statement = ''
+
+    for line in module_str.splitlines():
+        code, _, comment = line.partition('--')
+        code = code.strip()
+        if not code:
+            continue
+
+        tokens = code.split()
+        if tokens[0] == 'MODULE':
+            if not re.fullmatch('MODULE\s+\w+', code):
+                raise UnsupportedSmvError('module parameters: ' + code)
+            continue
+        if tokens[0] in _SECTIONS:
+            assert not statement.strip(), 'unfinished statement: ' + statement
+            section = tokens[0]
+            is_controllable = section == 'VAR' and re.fullmatch(' *controllable.*', comment) is not None
+            code = code[len(tokens[0]):]
+        elif section is None or tokens[0] in _UNSUPPORTED_SECTIONS:
+            raise UnsupportedSmvError('section: ' + code)
+
+        statement += ' ' + code
+        *complete, statement = statement.split(';')
+        for s in filter(str.strip, complete):
+            if section == 'VAR':
+                match = re.fullmatch(' *(\w+) *: *boolean *', s)
+                if not match:
+                    raise UnsupportedSmvError('variable: ' + s.strip())
+                variables.append((match.group(1), is_controllable))
+            else:
+                match = re.fullmatch(' *(\w+) *:= *(.+)', s)
+                if not match:
+                    raise UnsupportedSmvError('definition: ' + s.strip())
+                definitions[match.group(1)] = match.group(2).strip()
+
+    assert not statement.strip(), 'unfinished statement: ' + statement
+    return variables, definitions
+
+
+_TOKEN_RE = re.compile('\s*(<->|->|!=|[()!&|=]|\w+)')
+
+
+def _tokenize(expr: str) -> list:
+    tokens = []
+    pos = 0
+    expr = expr.rstrip()
+    while pos < len(expr):
+        match = _TOKEN_RE.match(expr, pos)
+        if not match:
+            raise UnsupportedSmvError('expression: ' + expr)
+        tokens.append(match.group(1))
+        pos = match.end()
+    return tokens
+
+
+class _ExprEncoder:
+    """
+    Encodes boolean SMV expressions, the operators in the order of increasing precedence:
+    `->` (right associative), `<->`, `| xor xnor`, `&`, `= !=`, `!`.
+    """
+
+    def __init__(self, builder: AigBuilder, get_signal_lit):
+        self.builder = builder
+        self.get_signal_lit = get_signal_lit
+        self.tokens = None
+        self.pos = None
+
+    def encode(self, expr: str) -> int:
+        self.tokens = _tokenize(expr)
+        self.pos = 0
+        lit = self._implies()
+        if self.pos != len(self.tokens):
+            raise UnsupportedSmvError('expression: ' + expr)
+        return lit
+
+    def _peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def _next(self):
+        token = self._peek()
+        if token is None:
+            raise UnsupportedSmvError('unexpected end of expression: ' + ' '.join(self.tokens))
+        self.pos += 1
+        return token
+
+    def _implies(self) -> int:
+        lhs = self._iff()
+        if self._peek() == '->':
+            self._next()
+            return self.builder.or_(negate(lhs), self._implies())
+        return lhs
+
+    def _iff(self) -> int:
+        lit = self._or()
+        while self._peek() == '<->':
+            self._next()
+            lit = negate(self.builder.xor(lit, self._or()))
+        return lit
+
+    def _or(self) -> int:
+        lit = self._and()
+        while self._peek() in ('|', 'xor', 'xnor'):
+            op = self._next()
+            rhs = self._and()
+            if op == '|':
+                lit = self.builder.or_(lit, rhs)
+            else:
+                lit = self.builder.xor(lit, rhs) ^ (op == 'xnor')
+        return lit
+
+    def _and(self) -> int:
+        lit = self._eq()
+        while self._peek() == '&':
+            self._next()
+            lit = self.builder.and_(lit, self._eq())
+        return lit
+
+    def _eq(self) -> int:
+        lit = self._not()
+        while self._peek() in ('=', '!='):
+            op = self._next()
+            lit = self.builder.xor(lit, self._not()) ^ (op == '=')
+        return lit
+
+    def _not(self) -> int:
+        token = self._next()
+        if token == '!':
+            return negate(self._not())
+        if token == '(':
+            lit = self._implies()
+            if self._next() != ')':
+                raise UnsupportedSmvError('unbalanced parentheses: ' + ' '.join(self.tokens))
+            return lit
+        if token in ('TRUE', '1'):
+            return TRUE_LIT
+        if token in ('FALSE', '0'):
+            return FALSE_LIT
+        if re.fullmatch('[A-Za-z_]\w*', token) and token not in ('xor', 'xnor', 'case', 'esac', 'in', 'mod'):
+            return self.get_signal_lit(token)
+        raise UnsupportedSmvError('expression token: ' + token)
+
+
+def add_automaton(builder: AigBuilder, automaton: Automaton or CompactAutomaton, name: str,
+                  lit_by_prop: dict, encoding: str='binary') -> (int or None, int or None):
+    """
+    Encode the automaton like `spec_2_smv.det_automaton_to_bits_smv_module` does
+    (`enum` is encoded as `binary`); the latches are named `<name>.state_bit<i>`.
+    :return: literals of `bad` and `fair` (None if the automaton has none)
+    """
+    if isinstance(automaton, Automaton):
+        automaton = CompactAutomaton.from_automaton(automaton)
+    nof_states = len(automaton.state_names) + 1
+    sink = nof_states - 1
+
+    nof_bits, codes = get_state_codes(nof_states, 'binary' if encoding == 'enum' else encoding)
+    init_code = codes[automaton.init_state]
+    bits = [builder.add_latch('%s.state_bit%i' % (name, i), init=bool(init_code >> i & 1))
+            for i in range(nof_bits)]
+
+    state_is = []
+    for s in range(nof_states):
+        if encoding == 'onehot':
+            state_is.append(bits[s])
+        else:
+            state_is.append(builder.and_all(bits[i] if codes[s] >> i & 1 else negate(bits[i])
+                                            for i in range(nof_bits)))
+
+    prop_lits = [lit_by_prop[p] for p in automaton.propositions]
+
+    def cube_lit(pos, neg):
+        return builder.and_all([prop_lits[i] for i in range(len(prop_lits)) if pos >> i & 1] +
+                               [negate(prop_lits[i]) for i in range(len(prop_lits)) if neg >> i & 1])
+
+    nof_props = len(automaton.propositions)
+    edges = []  # (dst, edge literal)
+    for u, u_succ in enumerate(automaton.succ):
+        for (v, labels) in u_succ:
+            label_lit = builder.or_all(cube_lit(pos, neg) for (pos, neg) in minimize_cubes(labels, nof_props))
+            edges.append((v, builder.and_(state_is[u], label_lit)))
+    no_edge = negate(builder.or_all(lit for (_, lit) in edges))
+
+    for b in range(nof_bits):
+        disjuncts = [lit for (v, lit) in edges if codes[v] >> b & 1]
+        if codes[sink] >> b & 1:
+            disjuncts.append(no_edge)
+        builder.set_latch_next(bits[b], builder.or_all(disjuncts))
+
+    bad = fair = None
+    if automaton.dead_states:
+        bad = builder.or_all(state_is[s] for s in sorted(automaton.dead_states))
+    if not automaton.is_safety:
+        fair = builder.or_all(state_is[s] for s in sorted(automaton.acc_states))
+    return bad, fair
+
+
+def _add_property_latch(builder: AigBuilder, name: str, init: bool, next_lit: int) -> int:
+    # the latch is kept for compatibility with the SMV route,
+    # the property is defined by its next-state function (see latches_2_output.py)
+    latch = builder.add_latch(name, init)
+    builder.set_latch_next(latch, next_lit)
+    return next_lit
+
+
+def main(smv_lines, base_dir, cache: AutomatonCache=None, jobs: int=1, batch: bool=False,
+         encoding: str='enum', safety_product: bool=False) -> AigBuilder:
+    """
+    :param safety_product: encode the safety assumptions (guarantees) by their product
+                           (see `spec_2_smv.merge_safety_properties`)
+    :return: the circuit of the specification, the controllable inputs are prefixed with `controllable_`
+    :raise UnsupportedSmvError: if the specification is outside the supported subset of SMV
+    """
+    with stage('parsing'):
+        module_a_g_by_name = parse_smv(smv_lines, base_dir)
+        if len(module_a_g_by_name) != 1:
+            raise UnsupportedSmvError('several modules')
+        name, (main_module, assumptions, guarantees) = next(iter(module_a_g_by_name.items()))
+        assert assumptions or guarantees, 'there is no specification'
+
+        variables, definitions = parse_main_module(main_module.module_str)  # before calling GOAL
+
+    with stage('aig_conversion'):
+        builder, get_signal_lit = _encode_main_module(variables, definitions)
+
+    with stage('translation'):
+        automata, instances = build_canonical_automata(assumptions + guarantees, cache, jobs, batch)
+        if safety_product:
+            assumptions, guarantees, automata, instances = \
+                merge_safety_properties(assumptions, guarantees, automata, instances)
+        automata = [rename_automaton(automata[i], signal_by_name) for (i, signal_by_name) in instances]
+
+    with stage('aig_conversion'):
+        _encode_specs(builder, get_signal_lit, name, assumptions, guarantees, automata, encoding)
+
+    logger.info('direct AIG: %i inputs, %i latches, %i ANDs',
+                len(builder.inputs), len(builder.latches), len(builder.ands))
+    return builder
+
+
+def _encode_main_module(variables, definitions) -> (AigBuilder, 'function'):
+    builder = AigBuilder()
+    lit_by_signal = dict()
+    for (var, is_controllable) in variables:
+        lit_by_signal[var] = builder.add_input(('controllable_' if is_controllable else '') + var)
+
+    being_defined = set()
+
+    def get_signal_lit(signal):
+        if signal in lit_by_signal:
+            return lit_by_signal[signal]
+        assert signal in definitions, 'unknown signal: ' + signal
+        assert signal not in being_defined, 'cyclic definition: ' + signal
+        being_defined.add(signal)
+        lit_by_signal[signal] = _ExprEncoder(builder, get_signal_lit).encode(definitions[signal])
+        return lit_by_signal[signal]
+
+    for signal in definitions:  # unsupported expressions fail before calling GOAL
+        get_signal_lit(signal)
+
+    return builder, get_signal_lit
+
+
+def _encode_specs(builder: AigBuilder, get_signal_lit, name: str, assumptions, guarantees, automata, encoding):
+    specs = assumptions + guarantees
+    bad_and_fair = []
+    for (spec, automaton) in zip(specs, automata):
+        prefix = 'sys_prop_' if spec.is_guarantee else 'env_prop_'
+        module_name = prefix + generate_name_for_property_module(spec)
+        lit_by_prop = dict((p, get_signal_lit(p)) for p in automaton.propositions)
+        bad_and_fair.append(add_automaton(builder, automaton, module_name, lit_by_prop, encoding))
+
+    env_bad_fair = bad_and_fair[:len(assumptions)]
+    sys_bad_fair = bad_and_fair[len(assumptions):]
+
+    sys_bads = [bad for (bad, _) in sys_bad_fair if bad is not None]
+    if sys_bads:
+        builder.add_bad(_add_property_latch(builder, 'sys_prop_bad_variable', False, builder.or_all(sys_bads)),
+                        'sys_prop_bad_variable')
+
+    env_bads = [bad for (bad, _) in env_bad_fair if bad is not None]
+    if env_bads:
+        constr = negate(builder.or_all(env_bads))
+        builder.add_constraint(_add_property_latch(builder, 'env_prop_constr_variable', True, constr),
+                               'env_prop_constr_variable')
+
+    sys_fairs = [fair for (_, fair) in sys_bad_fair if fair is not None]
+    if sys_fairs:
+        just = add_fairness_flags(builder, sys_fairs, 'sys_prop_counting_justice_' + name)
+        builder.add_justice([_add_property_latch(builder, 'sys_prop_just_variable', False, just)],
+                            'sys_prop_just_variable')
+
+    env_fairs = [fair for (_, fair) in env_bad_fair if fair is not None]
+    if env_fairs:
+        fair = add_fairness_flags(builder, env_fairs, 'env_prop_counting_fairness_' + name)
+        builder.add_fairness(_add_property_latch(builder, 'env_prop_fair_variable', True, fair),
+                             'env_prop_fair_variable')
@@ -1,6 +1,10 @@
 #!/usr/bin/env python3
 import argparse
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from inspect import cleandoc
+import logging
 import re
 import os
 
@@ -8,22 +12,108 @@ from common import setup_logging
 from python_ext import find
 from spec_parser import parse_smv
 from str_aware_list import StrAwareList
-from structs import Automaton, PropertySpec, SmvModule
+from labels import atom_of, is_negated, masks_to_label, minimize_cubes, get_minterms, is_tautology_cubes, MAX_MINIMIZE_PROPOSITIONS
+from structs import Automaton, CompactAutomaton, PropertySpec, SmvModule
 from prettysmv import prettify
-from automata import automaton_from_spec
+from automata import automaton_from_spec, automata_from_specs, GOAL_SCRIPT_VERSION
+from automaton_cache import AutomatonCache, DEFAULT_CACHE_DIR
+from canonical_spec import get_canonical_form, get_canonical_spec, rename_automaton
+from safety_product import build_safety_product
+from goal_utils import set_goal_pool, create_goal_pool
+from profiling import stage, span, count, write_stage_times, start_profiling
 
 INVAR_SIGNAL_NAME = "invar_violated_signal"
 BAD_SIGNAL_NAME = "bad_signal"
 JUSTICE_SIGNAL_NAME = 'justice_signal'
 
+logger = logging.getLogger(__name__)
+
+
+_SMV_CONSTANT_BY_ATOM = {'True': 'TRUE', 'False': 'FALSE'}
+
+
+def literal2smvexpr(literal: str) -> str:
+    """
+    >>> literal2smvexpr('~isTrue'), literal2smvexpr('!True')
+    ('!isTrue', '!TRUE')
+    """
+    atom = atom_of(literal)
+    return ('!' if is_negated(literal) else '') + _SMV_CONSTANT_BY_ATOM.get(atom, atom)
+
 
 def label2smvexpr(clauses: set):
-    c_to_smv = lambda c: '(%s)' % ' & '.join(l.replace('~', '!') for l in c)
+    """
+    >>> label2smvexpr([('isTrue', '~notFalse')])
+    '((isTrue & !notFalse))'
+    >>> label2smvexpr([('True',)])
+    '((TRUE))'
+    """
+    c_to_smv = lambda c: '(%s)' % ' & '.join(map(literal2smvexpr, c))
     smv_expr = '(%s)' % ' | '.join(map(c_to_smv, clauses))
     return smv_expr
 
 
-def det_automaton_to_smv_module(automaton: Automaton, module_name: str, desc: str) -> SmvModule:
+def masks2smvexpr(labels, propositions) -> str:
+    return label2smvexpr([masks_to_label(pos, neg, propositions) for (pos, neg) in labels])
+
+
+def get_case_split(automaton: CompactAutomaton, u: int) -> list:
+    """
+    :return: the edges from `u` as a list of (dst, labels) to be checked in this order (like in SMV `case`),
+             the labels are minimized using the labels of the preceding edges as don't cares;
+             if the edges from `u` cover all valuations, the labels of the last edge are None (meaning `TRUE`)
+    """
+    u_succ = list(automaton.succ[u])
+    if not u_succ:
+        return []
+
+    nof_props = len(automaton.propositions)
+    is_complete = is_tautology_cubes(frozenset(l for (_, labels) in u_succ for l in labels))
+    if is_complete:
+        # the edge with the largest label goes last and needs no label
+        u_succ.sort(key=lambda v_labels: len(v_labels[1]))
+
+    use_dont_cares = nof_props <= MAX_MINIMIZE_PROPOSITIONS
+    result = []
+    previous = set()
+    for i, (v, labels) in enumerate(u_succ):
+        if is_complete and i == len(u_succ) - 1:
+            result.append((v, None))
+            break
+        result.append((v, minimize_cubes(labels, nof_props, previous)))
+        if use_dont_cares:
+            previous.update(get_minterms(labels, nof_props))
+
+    return result
+
+
+STATE_ENCODINGS = ('enum', 'binary', 'onehot', 'gray')
+
+
+def get_state_codes(nof_states: int, encoding: str) -> (int, list):
+    """
+    :return: number of state bits, and the code of each state
+    >>> get_state_codes(3, 'binary')
+    (2, [0, 1, 2])
+    >>> get_state_codes(4, 'gray')
+    (2, [0, 1, 3, 2])
+    >>> get_state_codes(3, 'onehot')
+    (3, [1, 2, 4])
+    """
+    if encoding == 'onehot':
+        return nof_states, [1 << i for i in range(nof_states)]
+
+    nof_bits = max(1, (nof_states - 1).bit_length())
+    if encoding == 'binary':
+        return nof_bits, list(range(nof_states))
+    if encoding == 'gray':
+        return nof_bits, [i ^ (i >> 1) for i in range(nof_states)]
+
+    assert 0, 'unknown state encoding: ' + encoding
+
+
+def det_automaton_to_smv_module(automaton: Automaton or CompactAutomaton, module_name: str, desc: str,
+                                encoding: str='enum') -> SmvModule:
     """
     :return: smv module named `module_name`.
     The module defines (output) signals: `bad`, `fair`, `fall_out`.
@@ -32,16 +122,25 @@ def det_automaton_to_smv_module(automaton: Automaton, module_name: str, desc: st
     Signal `bad` is true iff reach a dead state.
     Signal `fair` is true iff reach an accepting state and is_safety is False.
     The function assumes the automaton is determenistic.
+    With `encoding` other than `enum`, the state is stored in explicitly encoded boolean variables
+    (see `det_automaton_to_bits_smv_module`).
     """
 
+    if encoding != 'enum':
+        return det_automaton_to_bits_smv_module(automaton, module_name, desc, encoding)
+
+    if isinstance(automaton, Automaton):
+        automaton = CompactAutomaton.from_automaton(automaton)
+    names = automaton.state_names
+
     logger.debug("automaton_to_smv_module: %s: %s: states %d, acc states: %d" %
                  (module_name,
                   ['liveness', 'safety'][automaton.is_safety],
-                  len(automaton.states),
+                  len(names),
                   len(automaton.acc_states)))
 
-    assert 'sink_state' not in automaton.states
-    assert 'state' not in automaton.states
+    assert 'sink_state' not in names
+    assert 'state' not in names
 
     template = cleandoc(
         """
@@ -62,22 +161,28 @@ def det_automaton_to_smv_module(automaton: Automaton, module_name: str, desc: st
               {transitions}
             esac;
         """)
-    enum_states = ', '.join(automaton.states)
+    enum_states = ', '.join(names)
     enum_states += ', sink_state'
 
     transitions_list = []
-    for ((u, v), clauses) in automaton.edges:
-        transitions_list += ['state={u} & {lbl_expr} : {v};'.format(u=u, v=v, lbl_expr=label2smvexpr(clauses))]
+    for u in range(len(names)):
+        for (v, labels) in get_case_split(automaton, u):
+            if labels is None:
+                transitions_list += ['state={u} : {v};'.format(u=names[u], v=names[v])]
+                continue
+            transitions_list += ['state={u} & {lbl_expr} : {v};'.format(u=names[u], v=names[v],
+                                                                       lbl_expr=masks2smvexpr(labels,
+                                                                                              automaton.propositions))]
     transitions_list.append('TRUE: sink_state;')
     transitions = '\n'.join(transitions_list)
 
     bad_def = fair_def = ''
     if automaton.dead_states:
-        bad_def = 'bad := %s;\n' % ' | '.join('(state=%s)' % s
-                                                  for s in automaton.dead_states)
+        bad_def = 'bad := %s;\n' % ' | '.join('(state=%s)' % names[s]
+                                                  for s in sorted(automaton.dead_states))
     if not automaton.is_safety:
-        fair_def = 'fair := %s;\n' % ' | '.join('(state=%s)' % s
-                                                    for s in automaton.acc_states)
+        fair_def = 'fair := %s;\n' % ' | '.join('(state=%s)' % names[s]
+                                                    for s in sorted(automaton.acc_states))
 
     fall_out = 'fall_out := (state=sink_state);'
 
@@ -85,7 +190,7 @@ def det_automaton_to_smv_module(automaton: Automaton, module_name: str, desc: st
 
     module_str = template.format(name=module_name,
                                  signals=', '.join(map(str, module_inputs)),
-                                 init_state=automaton.init_state, enum_states=enum_states,
+                                 init_state=names[automaton.init_state], enum_states=enum_states,
                                  transitions=transitions,
                                  bad_def=bad_def, fair_def=fair_def, fall_out=fall_out)
 
@@ -94,20 +199,278 @@ def det_automaton_to_smv_module(automaton: Automaton, module_name: str, desc: st
                      not automaton.is_safety)
 
 
+def det_automaton_to_bits_smv_module(automaton: Automaton or CompactAutomaton, module_name: str, desc: str,
+                                     encoding: str) -> SmvModule:
+    """
+    Same as `det_automaton_to_smv_module`,
+    but the states (and `sink_state`) are encoded by boolean variables `state_bit<i>` according to `encoding`.
+    Signal `state_is_<s>` is true iff the automaton is in state `s`,
+    and signal `edge_<i>` is true iff the i-th edge is taken.
+    """
+
+    if isinstance(automaton, Automaton):
+        automaton = CompactAutomaton.from_automaton(automaton)
+    names = automaton.state_names + ('sink_state',)
+    sink = len(names) - 1
+
+    logger.debug("automaton_to_smv_module: %s: %s: states %d, acc states: %d, encoding: %s" %
+                 (module_name,
+                  ['liveness', 'safety'][automaton.is_safety],
+                  len(automaton.state_names),
+                  len(automaton.acc_states),
+                  encoding))
+
+    assert 'sink_state' not in automaton.state_names
+
+    template = cleandoc(
+        """
+        MODULE {name}({signals})
+
+          VAR
+            {bit_vars}
+
+          DEFINE
+            {state_defs}
+            {edge_defs}
+            {bad_def}{fair_def}{fall_out}
+
+          INIT
+            {init_state}
+
+          ASSIGN
+            {next_bits}
+        """)
+
+    nof_bits, codes = get_state_codes(len(names), encoding)
+    bit = lambda i: 'state_bit%i' % i
+    state_is = lambda s: 'state_is_%s' % names[s]
+
+    def code_expr(s):
+        if encoding == 'onehot':
+            return bit(s)
+        return ' & '.join(('' if codes[s] >> i & 1 else '!') + bit(i) for i in range(nof_bits))
+
+    bit_vars = '\n'.join('%s : boolean;' % bit(i) for i in range(nof_bits))
+    state_defs = '\n'.join('%s := %s;' % (state_is(s), code_expr(s)) for s in range(len(names)))
+
+    # edges are not ordered here, so their labels are minimized without don't cares
+    nof_props = len(automaton.propositions)
+    edges = [(u, v, minimize_cubes(labels, nof_props))
+             for u, u_succ in enumerate(automaton.succ)
+             for (v, labels) in u_succ]
+    edge_defs = ['edge_{i} := {u} & {lbl_expr};'.format(i=i, u=state_is(u),
+                                                        lbl_expr=masks2smvexpr(labels, automaton.propositions))
+                 for i, (u, v, labels) in enumerate(edges)]
+    no_edge = '!(%s)' % ' | '.join('edge_%i' % i for i in range(len(edges))) if edges else 'TRUE'
+    edge_defs.append('no_edge := %s;' % no_edge)
+    edge_defs = '\n'.join(edge_defs)
+
+    next_bits = []
+    for b in range(nof_bits):
+        disjuncts = ['edge_%i' % i for i, (_, v, _) in enumerate(edges) if codes[v] >> b & 1]
+        if codes[sink] >> b & 1:
+            disjuncts.append('no_edge')
+        next_bits.append('next(%s) := %s;' % (bit(b), ' | '.join(disjuncts) or 'FALSE'))
+    next_bits = '\n'.join(next_bits)
+
+    init_state = code_expr(automaton.init_state) if encoding != 'onehot' else \
+        ' & '.join(('' if i == automaton.init_state else '!') + bit(i) for i in range(nof_bits))
+
+    bad_def = fair_def = ''
+    if automaton.dead_states:
+        bad_def = 'bad := %s;\n' % ' | '.join(state_is(s) for s in sorted(automaton.dead_states))
+    if not automaton.is_safety:
+        fair_def = 'fair := %s;\n' % ' | '.join(state_is(s) for s in sorted(automaton.acc_states))
+
+    fall_out = 'fall_out := %s;' % state_is(sink)
+
+    module_inputs = automaton.propositions  # NOTE: we do not check that user defined all propositions
+
+    module_str = template.format(name=module_name,
+                                 signals=', '.join(map(str, module_inputs)),
+                                 bit_vars=bit_vars, state_defs=state_defs, edge_defs=edge_defs,
+                                 init_state=init_state, next_bits=next_bits,
+                                 bad_def=bad_def, fair_def=fair_def, fall_out=fall_out)
+
+    return SmvModule(module_name, module_inputs, desc, module_str,
+                     len(automaton.dead_states) > 0,
+                     not automaton.is_safety)
+
+
 def generate_name_for_property_module(spec: PropertySpec) -> str:
     res = 'module_%s' % re.sub('\W', '_', spec.desc)
     return res
 
 
-def build_spec_module(spec: PropertySpec) -> SmvModule:
-    automaton = automaton_from_spec(spec)
+def build_spec_module(spec: PropertySpec, cache: AutomatonCache=None, encoding: str='enum') -> SmvModule:
+    automaton = automaton_from_spec(spec, cache)
 
     name = generate_name_for_property_module(spec)
-    smv_module = det_automaton_to_smv_module(automaton, name, spec.desc)
+    smv_module = det_automaton_to_smv_module(automaton, name, spec.desc, encoding)
 
     return smv_module
 
 
+def build_spec_automata(specs, cache: AutomatonCache=None, jobs: int=1, batch: bool=False) -> list:
+    """
+    Build automata of `specs` (see `build_canonical_automata`).
+    :return: automata in the order of `specs`
+    """
+    automata, instances = build_canonical_automata(specs, cache, jobs, batch)
+    return [rename_automaton(automata[i], signal_by_name) for (i, signal_by_name) in instances]
+
+
+def build_canonical_automata(specs, cache: AutomatonCache=None, jobs: int=1, batch: bool=False) -> (list, list):
+    """
+    Build automata of `specs`, the properties equal up to renaming of signals are translated once
+    (see canonical_spec.py).
+    :return: automata of the distinct properties (over canonical signal names),
+             and for each spec: (index of its automaton, renaming: canonical name |-> signal)
+    """
+    canonical_specs = []
+    index_by_key = dict()
+    instances = []
+    for spec in specs:
+        key, signal_by_name = get_canonical_form(spec)
+        if key not in index_by_key:
+            index_by_key[key] = len(canonical_specs)
+            canonical_specs.append(get_canonical_spec(spec, key))
+        instances.append((index_by_key[key], signal_by_name))
+
+    if len(canonical_specs) < len(specs):
+        logger.info('%i properties, %i of them distinct up to renaming of signals',
+                    len(specs), len(canonical_specs))
+
+    return _build_automata(canonical_specs, cache, jobs, batch), instances
+
+
+def _build_automata(specs, cache: AutomatonCache, jobs: int, batch: bool) -> list:
+    """
+    Build automata of `specs` using `jobs` threads
+    (each property is an independent GOAL job, the threads mostly wait for GOAL).
+    In the `batch` mode, the properties are split into `jobs` chunks,
+    and each chunk is built with one GOAL script for translation and one for determinization.
+    """
+    if not specs:
+        return []
+
+    if batch:
+        chunk_size = -(-len(specs) // max(jobs, 1))  # ceil
+        chunks = [specs[i:i + chunk_size] for i in range(0, len(specs), chunk_size)]
+
+        def build_chunk(chunk):
+            with span('automata_batch', properties=len(chunk)):
+                return automata_from_specs(chunk, cache)
+
+        automata_by_chunk = _map_reporting_errors(build_chunk,
+                                                  chunks,
+                                                  [', '.join(spec.desc for spec in chunk) for chunk in chunks],
+                                                  len(chunks))
+        automata = [a for automata in automata_by_chunk for a in automata]
+    else:
+        automata = _map_reporting_errors(partial(automaton_from_spec, cache=cache),
+                                         specs,
+                                         [spec.desc for spec in specs],
+                                         jobs)
+
+    for automaton in automata:
+        count('automaton_states', len(automaton.state_names))
+        count('automaton_edges', sum(len(s_succ) for s_succ in automaton.succ))
+        count('automaton_labels', sum(len(labels) for s_succ in automaton.succ for (_, labels) in s_succ))
+    return automata
+
+
+def build_spec_modules(specs, cache: AutomatonCache=None, jobs: int=1, batch: bool=False,
+                       encoding: str='enum') -> list:
+    """
+    Build modules of `specs` (see `build_spec_automata`).
+    :return: modules in the order of `specs`
+    """
+    automata = build_spec_automata(specs, cache, jobs, batch)
+    return [det_automaton_to_smv_module(automaton, generate_name_for_property_module(spec), spec.desc, encoding)
+            for (spec, automaton) in zip(specs, automata)]
+
+
+def build_spec_instances(specs, automata, instances, encoding: str='enum') -> list:
+    """
+    :param automata, instances: see `build_canonical_automata`
+    :return: modules in the order of `specs`;
+             the properties sharing an automaton are instances of one MODULE,
+             defined in `module_str` of the first of them
+    """
+    nof_instances = Counter(i for (i, _) in instances)
+    module_by_index = dict()
+    result = []
+    for spec, (i, signal_by_name) in zip(specs, instances):
+        name = generate_name_for_property_module(spec)
+        if nof_instances[i] == 1:
+            result.append(det_automaton_to_smv_module(rename_automaton(automata[i], signal_by_name),
+                                                      name, spec.desc, encoding))
+            continue
+
+        module = module_by_index.get(i)
+        module_str = ''
+        if module is None:
+            module = module_by_index[i] = det_automaton_to_smv_module(automata[i], name, spec.desc, encoding)
+            module_str = module.module_str
+        result.append(SmvModule(name, (signal_by_name.get(p, p) for p in module.module_inputs), spec.desc, module_str,
+                                module.has_bad, module.has_fair, type_name=module.name))
+    return result
+
+
+def merge_safety_properties(assumptions, guarantees, automata, instances) -> (list, list, list, list):
+    """
+    Replace the safety assumptions by one assumption, whose automaton is the minimized product of their automata
+    (see safety_product.py), and the same for the safety guarantees.
+    The properties are kept if the product is not built.
+    :param automata, instances: see `build_canonical_automata`
+    :return: assumptions, guarantees, automata, instances (the products go after the other properties)
+    """
+    automata = list(automata)
+    result = []
+    for (specs, spec_instances, kind) in ((assumptions, instances[:len(assumptions)], 'assumptions'),
+                                          (guarantees, instances[len(assumptions):], 'guarantees')):
+        safety = [k for (k, (i, _)) in enumerate(spec_instances) if automata[i].is_safety]
+        product = None
+        if len(safety) > 1:
+            with span('safety_product', properties=len(safety)):
+                product = build_safety_product([rename_automaton(automata[spec_instances[k][0]],
+                                                                 spec_instances[k][1])
+                                                for k in safety])
+        if product is None:
+            result.append((specs, spec_instances))
+            continue
+
+        count('safety_product_states', len(product.state_names))
+        kept = [k for k in range(len(specs)) if k not in safety]
+        logger.info('%s %s are encoded by their product', kind, ', '.join(specs[k].desc for k in safety))
+        product_spec = PropertySpec(kind + '_safety_product', True, kind == 'guarantees', None, None)
+        result.append(([specs[k] for k in kept] + [product_spec],
+                       [spec_instances[k] for k in kept] + [(len(automata), dict())]))
+        automata.append(product)
+
+    (assumptions, asmpt_instances), (guarantees, grnt_instances) = result
+    return assumptions, guarantees, automata, asmpt_instances + grnt_instances
+
+
+def _map_reporting_errors(build, items, descs, jobs) -> list:
+    if jobs <= 1:
+        return list(map(build, items))
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(build, item) for item in items]
+
+    failed = []
+    for desc, future in zip(descs, futures):
+        e = future.exception()
+        if e is not None:
+            logger.error('failed to build the property "%s": %s', desc, e)
+            failed.append(desc)
+    assert not failed, 'failed to build properties: %s' % ', '.join(failed)
+
+    return [future.result() for future in futures]
+
+
 def build_counting_fairness_module(nof_fair_signals: int, name: str) -> SmvModule:
     template = cleandoc(
         """
@@ -182,13 +545,10 @@ def compose_smv(non_spec_modules,
         smv += m.module_str
         smv.sep()
 
-    for am in asmpt_modules:
-        smv += am.module_str
-        smv.sep()
-
-    for gm in grnt_modules:
-        smv += gm.module_str
-        smv.sep()
+    for m in asmpt_modules + grnt_modules:
+        if m.module_str:  # empty for instances of a module defined by another property
+            smv += m.module_str
+            smv.sep()
 
     if counting_fairness_module:
         smv += counting_fairness_module.module_str
@@ -204,7 +564,7 @@ def compose_smv(non_spec_modules,
     if asmpt_modules:
         smv += "VAR --assumptions modules"
         for m in asmpt_modules:
-            smv += 'env_prop_%s : %s(%s);' % (m.name, m.name, ','.join(m.module_inputs))
+            smv += 'env_prop_%s : %s(%s);' % (m.name, m.type_name, ','.join(m.module_inputs))
 
         if counting_fairness_module:
             fair_signals = ['env_prop_%s.fair' % m.name
@@ -218,7 +578,7 @@ def compose_smv(non_spec_modules,
 
     smv += "VAR --guarantees modules"
     for m in grnt_modules:
-        smv += 'sys_prop_%s : %s(%s);' % (m.name, m.name, ','.join(m.module_inputs))
+        smv += 'sys_prop_%s : %s(%s);' % (m.name, m.type_name, ','.join(m.module_inputs))
         assert m.has_bad or m.has_fair, str(m)
 
     if counting_justice_module:
@@ -270,8 +630,10 @@ def compose_smv(non_spec_modules,
     return smv
 
 
-def main(smv_lines, base_dir):
-    module_a_g_by_name = parse_smv(smv_lines, base_dir)
+def main(smv_lines, base_dir, cache: AutomatonCache=None, jobs: int=1, batch: bool=False,
+         encoding: str='enum', safety_product: bool=False):
+    with stage('parsing'):
+        module_a_g_by_name = parse_smv(smv_lines, base_dir)
 
     name_d_a_g_records = tuple(filter(lambda n_d_a_g: len(n_d_a_g[1][1]) > 0 or len(n_d_a_g[1][2]) > 0,
                                       module_a_g_by_name.items()))
@@ -286,8 +648,25 @@ def main(smv_lines, base_dir):
         head = re.sub("(MODULE )\w+(.*)", "\\1main\\2 -- {}\n".format(name), head)
         clean_main_module.module_str = head + '\n'.join(clean_main_module.module_str.splitlines()[1:])
 
-    asmpt_modules = list(map(build_spec_module, assumptions))
-    grnt_modules = list(map(build_spec_module, guarantees))
+    with stage('translation'):
+        automata, instances = build_canonical_automata(assumptions + guarantees, cache, jobs, batch)
+        if safety_product:
+            assumptions, guarantees, automata, instances = \
+                merge_safety_properties(assumptions, guarantees, automata, instances)
+
+    with stage('smv_emission'):
+        print(prettify(str(build_final_smv(module_a_g_by_name, name, clean_main_module,
+                                           assumptions, guarantees, automata, instances, encoding))))
+
+    return 0
+
+
+def build_final_smv(module_a_g_by_name, name, clean_main_module, assumptions, guarantees, automata, instances,
+                    encoding: str='enum') -> StrAwareList:
+    """ :param automata, instances: see `build_canonical_automata` """
+    spec_modules = build_spec_instances(assumptions + guarantees, automata, instances, encoding)
+    asmpt_modules = spec_modules[:len(assumptions)]
+    grnt_modules = spec_modules[len(assumptions):]
 
     non_spec_modules = tuple(map(lambda n_m_a_g: n_m_a_g[1][0],  # (name, (module,assumptions,guarantees))
                                  filter(lambda n_m_a_g: n_m_a_g[0] != name,
@@ -307,16 +686,13 @@ def main(smv_lines, base_dir):
     # for m in asmpt_modules + grnt_modules:
     #     assert set(m.module_inputs).issubset(signals_and_macros)
 
-    final_smv = compose_smv(non_spec_modules,
-                            asmpt_modules,
-                            grnt_modules,
-                            clean_main_module,
-                            counting_fairness_module,
-                            counting_justice_module)
-
-    print(prettify(str(final_smv)))
-
-    return 0
+    with span('smv_composition', modules=len(spec_modules)):
+        return compose_smv(non_spec_modules,
+                           asmpt_modules,
+                           grnt_modules,
+                           clean_main_module,
+                           counting_fairness_module,
+                           counting_justice_module)
 
 
 if __name__ == "__main__":
@@ -326,15 +702,54 @@ if __name__ == "__main__":
     parser.add_argument('smv', metavar='smv',
                         type=argparse.FileType(),
                         help='input SMV file')
+    parser.add_argument('--no-goal-pool', action='store_true', default=False,
+                        help='start a new GOAL process (`gc batch`) for every script '
+                             'instead of reusing long-lived GOAL workers')
+    parser.add_argument('--no-cache', action='store_true', default=False,
+                        help='do not use the cache of automata built in previous runs')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                        help='directory of the cache of automata (default %(default)s)')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='number of properties built in parallel (default %(default)s)')
+    parser.add_argument('--batch', action='store_true', default=False,
+                        help='build all properties with one GOAL script for translation '
+                             'and one for determinization (per job)')
+    parser.add_argument('--state-encoding', choices=STATE_ENCODINGS, default='enum',
+                        help='encoding of automata states: '
+                             'enum leaves it to smvflatten/smvtoaig, '
+                             'others use explicit boolean state variables (default %(default)s)')
+    parser.add_argument('--safety-product', action='store_true', default=False,
+                        help='encode the safety assumptions by one module, '
+                             'the minimized product of their automata, and the same for the safety guarantees')
+    parser.add_argument('--timings', default=None, metavar='FILE',
+                        help='write the time of each stage into this file (JSON)')
+    parser.add_argument('--profile', default=None, metavar='FILE',
+                        help='write the profile (Chrome trace JSON, see profiling.py) into this file')
 
     args = parser.parse_args()
+    if args.profile:
+        start_profiling(args.profile)
 
     logger = setup_logging(__name__, verbose_level=args.verbose)
     logger.info("run with args:%s", args)
 
+    if args.no_goal_pool:
+        set_goal_pool(None)
+    elif args.jobs > 1:
+        set_goal_pool(create_goal_pool(args.jobs))
+
+    cache = None
+    if not args.no_cache:
+        cache = AutomatonCache(args.cache_dir, version=GOAL_SCRIPT_VERSION)
+
     try:
         exit(main(args.smv.read().splitlines(),
-                  os.path.dirname(args.smv.name)))
+                  os.path.dirname(args.smv.name),
+                  cache,
+                  args.jobs,
+                  args.batch,
+                  args.state_encoding,
+                  args.safety_product))
     except KeyboardInterrupt:
         print()  # empty line, so that command line prompt is on a new one
     except SystemExit:
@@ -344,3 +759,6 @@ if __name__ == "__main__":
         # print exception in an appropriate format
         logger.setLevel(INFO)
         logger.exception(e)
+    finally:
+        if args.timings:
+            write_stage_times(args.timings)
@@ -1,5 +1,7 @@
 from enum import Enum
 
+from labels import get_propositions, label_to_masks, masks_to_label
+
 
 class Automaton:
     """
@@ -34,7 +36,8 @@ class Automaton:
             for label in labels:
                 for lit in label:
                     atom = lit.strip('~').strip('!')
-                    propositions.add(atom)
+                    if atom not in ('True', 'False'):
+                        propositions.add(atom)
         return tuple(propositions)   # fixing the order
 
     def __str__(self):
@@ -42,10 +45,91 @@ class Automaton:
             (self.states, self.init_state, self.acc_states, self.dead_states, self.edges)
 
 
+class CompactAutomaton:
+    """
+    Memory-friendly form of `Automaton`:
+    states are integers `0..len(state_names)-1`,
+    propositions are interned in the table `propositions`,
+    and a label is a pair of masks (pos, neg) over `propositions` (see `labels.py`).
+    `succ[src]` is a tuple of (dst, tuple of labels) -- the edges going from `src`.
+    """
+    __slots__ = ('state_names', 'init_state', 'acc_states', 'dead_states', 'is_safety',
+                 'propositions', 'succ')
+
+    def __init__(self, state_names, init_state: int, acc_states, dead_states, is_safety, propositions, succ):
+        self.state_names = tuple(state_names)
+        self.init_state = init_state
+        self.acc_states = frozenset(acc_states)
+        self.dead_states = frozenset(dead_states)
+        self.is_safety = is_safety
+        self.propositions = tuple(propositions)
+        self.succ = tuple(succ)
+
+    @classmethod
+    def from_params(cls, init_state, states, edges, acc_states, dead_states=(), is_safety=False):
+        """
+        :param edges: iterable of ((src,dst), set of labels), where a label is a tuple of literals
+        """
+        edges = tuple(edges.items()) if isinstance(edges, dict) else tuple(edges)
+        state_names = sorted(set(states).union([init_state], (s for ((src, dst), _) in edges for s in (src, dst))))
+        id_by_name = dict((n, i) for (i, n) in enumerate(state_names))
+        propositions = get_propositions(l for (_, labels) in edges for l in labels)
+        index_by_prop = dict((p, i) for (i, p) in enumerate(propositions))
+
+        succ = [[] for _ in state_names]
+        for ((src, dst), labels) in edges:
+            masks = tuple(sorted(set(m for m in (label_to_masks(l, index_by_prop) for l in labels)
+                                     if m is not None)))
+            if masks:
+                succ[id_by_name[src]].append((id_by_name[dst], masks))
+
+        return cls(state_names,
+                   id_by_name[init_state],
+                   (id_by_name[s] for s in acc_states),
+                   (id_by_name[s] for s in dead_states),
+                   is_safety,
+                   propositions,
+                   (tuple(s) for s in succ))
+
+    @classmethod
+    def from_automaton(cls, automaton: 'Automaton'):
+        return cls.from_params(automaton.init_state, automaton.states, automaton.edges,
+                               automaton.acc_states, automaton.dead_states, automaton.is_safety)
+
+    def rename_propositions(self, name_by_prop: dict) -> 'CompactAutomaton':
+        """ :return: automaton sharing the states and edges of this one (the labels do not change) """
+        return CompactAutomaton(self.state_names, self.init_state, self.acc_states, self.dead_states, self.is_safety,
+                                (name_by_prop.get(p, p) for p in self.propositions), self.succ)
+
+    def self_loop_labels(self, s: int) -> tuple:
+        for (dst, labels) in self.succ[s]:
+            if dst == s:
+                return labels
+        return ()
+
+    def to_automaton(self) -> 'Automaton':
+        name = self.state_names.__getitem__
+        edges = tuple(((name(src), name(dst)),
+                       set(masks_to_label(pos, neg, self.propositions) for (pos, neg) in labels))
+                      for (src, src_succ) in enumerate(self.succ)
+                      for (dst, labels) in src_succ)
+        return Automaton(set(self.state_names), name(self.init_state),
+                         set(map(name, self.acc_states)), set(map(name, self.dead_states)),
+                         self.is_safety, edges)
+
+    def __str__(self):
+        return str(self.to_automaton())
+
+
 class SmvModule:
-    def __init__(self, name, module_inputs, desc, module_str, has_bad, has_fair):
+    def __init__(self, name, module_inputs, desc, module_str, has_bad, has_fair, type_name=None):
+        """
+        :param type_name: name of the instantiated MODULE, if it differs from `name`
+                          (the module is defined elsewhere, and `module_str` is empty)
+        """
         self.module_inputs = tuple(module_inputs)
         self.name = name
+        self.type_name = type_name or name
         self.desc = desc
         self.module_str = module_str
         self.has_bad = has_bad
@@ -56,26 +56,27 @@
 
 
 import argparse
+import sys
 import aiger_swig.aiger_wrap as aiglib
+from aig_opt import optimize
+from aiger_io import read_aiger, write_aiger_to
+from profiling import start_profiling
 
 
-def _write_result(model):
+def _write_result(model, optimize_result=False, binary=False):
     # aiglib.aiger_reencode(model)  # ic3-ref needs (?) 'right' order of indices of ANDs, etc.
+    if optimize_result:
+        model = optimize(model)  # also reencodes
 
-    res, string = aiglib.aiger_write_to_string(model, aiglib.aiger_ascii_mode, 2147483648)
+    write_aiger_to(model, sys.stdout, binary)  # the ASCII ends with a new line, and aiger readers reject empty lines
 
-    assert res != 0, 'writing failure'
 
-    print(string)
-
-
-def main(filename):
+def main(filename, optimize_result=False, binary=False):
     #: :type: aiglib.aiger
-    model = aiglib.aiger_init()
-    aiglib.aiger_open_and_read_from_file(model, filename)
+    model = read_aiger(filename)
 
     if model.num_justice == 0:
-        _write_result(model)
+        _write_result(model, optimize_result, binary)
         return
 
     assert model.num_justice == 1
@@ -135,7 +136,7 @@ def main(filename):
     aiglib.set_justice_lit(model, 0, 0, and4.lhs)
 
     #
-    _write_result(model)
+    _write_result(model, optimize_result, binary)
 
 
 if __name__ == "__main__":
@@ -148,9 +149,19 @@ if __name__ == "__main__":
                         type=str,
                         default='/dev/stdin',
                         help='model synthesized in AIGER format')
+    parser.add_argument('--optimize', '-O',
+                        action='store_true',
+                        default=False,
+                        help='simplify the result (see aig_opt.py)')
+    parser.add_argument('--binary', action='store_true', default=False,
+                        help='write the binary AIGER format (aig) instead of the ASCII one (aag)')
+    parser.add_argument('--profile', default=None, metavar='FILE',
+                        help='write the profile (Chrome trace JSON, see profiling.py) into this file')
 
     args = parser.parse_args()
+    if args.profile:
+        start_profiling(args.profile)
 
-    main(args.aiger)
+    main(args.aiger, args.optimize, args.binary)
 
     exit(0)
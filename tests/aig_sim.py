@@ -0,0 +1,53 @@
+"""
+Simulation of AIGER models in tests: two models are equivalent on an input sequence
+if their outputs, bad, constraints, justice and fairness literals agree at every step.
+"""
+
+import random
+
+from aig_opt import read_circuit
+
+PROPERTY_KINDS = ('outputs', 'bad', 'constraints', 'justice', 'fairness')
+
+
+def simulate(model, input_values) -> list:
+    """
+    :param input_values: list of dicts (input name |-> bool), one per step
+    :return: list of dicts (kind |-> tuple of values of its properties), one per step;
+             the value of a justice property is the tuple of values of its literals.
+             Uninitialized latches start with FALSE.
+    """
+    circuit = read_circuit(model)
+    state = dict((lit >> 1, reset == 1) for (lit, _, reset, _) in circuit.latches)
+
+    trace = []
+    for values in input_values:
+        value_by_var = {0: False}
+        value_by_var.update(state)
+        value_by_var.update((lit >> 1, values[name]) for (lit, name) in circuit.inputs)
+
+        def value(lit):
+            v = lit >> 1
+            if v not in value_by_var:
+                rhs0, rhs1 = circuit.rhs_by_and_var[v]
+                value_by_var[v] = value(rhs0) and value(rhs1)
+            return value_by_var[v] != bool(lit & 1)
+
+        step = dict((kind, tuple(value(lit) for (lit, _) in getattr(circuit, kind)))
+                    for kind in PROPERTY_KINDS if kind != 'justice')
+        step['justice'] = tuple(tuple(value(lit) for lit in lits) for (lits, _) in circuit.justice)
+        trace.append(step)
+        state = dict((lit >> 1, value(next_lit)) for (lit, next_lit, _, _) in circuit.latches)
+    return trace
+
+
+def random_inputs(model, nof_steps: int, rng: random.Random) -> list:
+    names = [name for (_, name) in read_circuit(model).inputs]
+    return [dict((name, rng.random() < 0.5) for name in names) for _ in range(nof_steps)]
+
+
+def assert_equivalent(model, model2, nof_runs: int=100, nof_steps: int=20, seed: int=0):
+    rng = random.Random(seed)
+    for _ in range(nof_runs):
+        inputs = random_inputs(model, nof_steps, rng)
+        assert simulate(model, inputs) == simulate(model2, inputs), inputs
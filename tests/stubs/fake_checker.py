@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for IIMC (tests of mc.py without a model checker).
+
+    fake_checker.py [--results R0,R1,...] [--log FILE] <model> --pi <i>
+
+The result of property `i` is `R<i>` (default `0`):
+    0, 1     print the answer (the property holds, fails)
+    hang     sleep for a minute, then print 0
+    crash    exit with code 1
+The property index is appended to the log file when the check starts, and `<i> done` when it ends.
+"""
+
+import argparse
+import sys
+import time
+
+
+def _log(file_name, text):
+    if file_name:
+        with open(file_name, 'a') as f:
+            f.write(text + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--results', default='')
+    parser.add_argument('--log', default=None)
+    parser.add_argument('model')
+    parser.add_argument('--pi', type=int, required=True)
+    args = parser.parse_args()
+
+    results = args.results.split(',') if args.results else []
+    result = results[args.pi] if args.pi < len(results) else '0'
+
+    _log(args.log, str(args.pi))
+    print('checking property %i of %s' % (args.pi, args.model))
+    if result == 'crash':
+        return 1
+    if result == 'hang':
+        time.sleep(60)
+        result = '0'
+    print(result, flush=True)
+    _log(args.log, '%i done' % args.pi)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for GOAL's `gc` (tests of goal_worker.py without a JVM).
+
+    fake_gc.py shell          read statements from stdin (like `gc shell`)
+    fake_gc.py batch <file>   execute the statements of the file (like `gc batch`)
+
+One statement per line:
+    echo "<text>";                          print the text
+    translate <...> -o <file> "<formula>";  write the automaton FAKE_GC_AUTOMATON into the file
+    $<var> = load "<file>";                 read the file into the variable
+    $<var> = <operation> ... $<var>;        keep the variable as is (determinization, complement, ...)
+    acc -min|-max $<var>;                   keep the acceptance condition as is
+    save $<var> <file>;                     write the variable into the file
+and the statements for tests:
+    sleep <seconds>;                        hang
+    exit <code>;                            crash
+    crash_once "<file>";                    crash if the file does not exist, and create it
+    warn "<text>";                          print the text on stderr (not an error)
+    error "<text>";                         print a GOAL error on stderr
+"""
+
+import os
+import re
+import sys
+import time
+
+AUTOMATON = os.environ.get('FAKE_GC_AUTOMATON',
+                           os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                        '..', 'arbiter-4-grants', 'ucw-no-spurious-grants.gff'))
+
+
+def _read(file_name):
+    with open(file_name) as f:
+        return f.read()
+
+
+def _write(file_name, text):
+    with open(file_name, 'w') as f:
+        f.write(text)
+
+
+def execute(statement, variables):
+    statement = statement.strip()
+    if not statement:
+        return
+
+    m = re.fullmatch(r'(echo|warn|error) "(.*)";', statement)
+    if m:
+        cmd, text = m.groups()
+        if cmd == 'echo':
+            print(text, flush=True)
+        else:
+            print(text if cmd == 'warn' else 'Error: ' + text, file=sys.stderr, flush=True)
+        return
+
+    m = re.fullmatch(r'translate .* -o (\S+) ".*";', statement)
+    if m:
+        _write(m.group(1), _read(AUTOMATON))
+        return
+
+    m = re.fullmatch(r'\$(\w+) = load "(.*)";', statement)
+    if m:
+        variables[m.group(1)] = _read(m.group(2))
+        return
+
+    m = re.fullmatch(r'\$(\w+) = \w+ .*\$(\w+);', statement)
+    if m:
+        variables[m.group(1)] = variables[m.group(2)]
+        return
+
+    m = re.fullmatch(r'acc -(min|max) \$(\w+);', statement)
+    if m:
+        assert m.group(2) in variables
+        return
+
+    m = re.fullmatch(r'save \$(\w+) (\S+);', statement)
+    if m:
+        _write(m.group(2), variables[m.group(1)])
+        return
+
+    m = re.fullmatch(r'crash_once "(.*)";', statement)
+    if m:
+        if not os.path.exists(m.group(1)):
+            _write(m.group(1), '')
+            sys.exit(1)
+        return
+
+    m = re.fullmatch(r'(sleep|exit) (\d+(\.\d+)?);', statement)
+    if m:
+        if m.group(1) == 'sleep':
+            time.sleep(float(m.group(2)))
+        else:
+            sys.exit(int(float(m.group(2))))
+        return
+
+    print('Error: unknown statement: ' + statement, file=sys.stderr, flush=True)
+
+
+def main(args):
+    variables = dict()
+    if args[:1] == ['shell']:
+        for line in sys.stdin:
+            execute(line, variables)
+    elif args[:1] == ['batch'] and len(args) == 2:
+        for line in _read(args[1]).splitlines():
+            execute(line, variables)
+    else:
+        print('usage: fake_gc.py shell | batch <file>', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,84 @@
+import random
+
+import pytest
+
+pytest.importorskip('aiger_swig.aiger_wrap')  # built by aiger_swig/make_swig.sh
+
+from aig_builder import AigBuilder
+from aig_coi import get_property_models, write_property_models
+from aig_opt import read_circuit
+from aig_sim import random_inputs, simulate
+from aiger_io import read_aiger
+from get_nof_properties import get_nof_properties
+
+
+def _two_bad_model():
+    """ bad `p0` depends on `a` only (through latch `la`), bad `p1` on `b` and `c` (through latch `lb`) """
+    b = AigBuilder()
+    a, b_, c = b.add_input('a'), b.add_input('b'), b.add_input('c')
+    la, lb = b.add_latch('la'), b.add_latch('lb')
+    b.set_latch_next(la, b.or_(la, a))
+    b.set_latch_next(lb, b.xor(lb, b_))
+    b.add_bad(la, 'p0')
+    b.add_bad(b.and_(lb, c), 'p1')
+    return b.to_aiger()
+
+
+def _names(model):
+    circuit = read_circuit(model)
+    return (sorted(name for (_, name) in circuit.inputs),
+            sorted(name for (_, _, _, name) in circuit.latches))
+
+
+def test_two_properties_give_two_models():
+    model = _two_bad_model()
+
+    p0, p1 = get_property_models(model)
+
+    assert _names(p0) == (['a'], ['la'])
+    assert _names(p1) == (['b', 'c'], ['lb'])
+    assert [name for (_, name) in read_circuit(p0).bad] == ['p0']
+    assert [name for (_, name) in read_circuit(p1).bad] == ['p1']
+
+    rng = random.Random(0)
+    for _ in range(50):
+        inputs = random_inputs(model, 10, rng)
+        original = [step['bad'] for step in simulate(model, inputs)]
+        assert [step['bad'] for step in simulate(p0, inputs)] == [(bad[0],) for bad in original]
+        assert [step['bad'] for step in simulate(p1, inputs)] == [(bad[1],) for bad in original]
+
+
+def test_constraints_and_fairness_are_kept():
+    b = AigBuilder()
+    a, c, f = b.add_input('a'), b.add_input('c'), b.add_input('f')
+    b.add_output(a, 'o')
+    b.add_justice([c], 'j')
+    b.add_constraint(c, 'invariant')
+    b.add_fairness(f, 'fair')
+    model = b.to_aiger()
+
+    output_model, justice_model = get_property_models(model)
+
+    assert _names(output_model) == (['a', 'c'], [])
+    assert len(read_circuit(output_model).constraints) == 1
+    assert read_circuit(output_model).fairness == []
+
+    assert _names(justice_model) == (['c', 'f'], [])
+    assert len(read_circuit(justice_model).constraints) == 1
+    assert len(read_circuit(justice_model).fairness) == 1
+
+
+@pytest.mark.parametrize('binary', [False, True])
+def test_write_property_models(tmp_path, binary):
+    model_file = str(tmp_path / 'model.aag')
+    with open(model_file, 'w') as f:
+        f.write('aag 3 2 0 0 1 2\n2\n4\n6\n5\n6 2 4\n')  # bad: a & b, !b
+
+    file_names = write_property_models(model_file, str(tmp_path / 'out'), binary)
+
+    ext = '.aig' if binary else '.aag'
+    assert file_names == [str(tmp_path / 'out' / ('p0' + ext)), str(tmp_path / 'out' / ('p1' + ext))]
+    assert [get_nof_properties(name) for name in file_names] == [1, 1]
+    p0, p1 = (read_aiger(name) for name in file_names)
+    assert (p0.num_inputs, p0.num_ands) == (2, 1)
+    assert (p1.num_inputs, p1.num_ands) == (1, 0)
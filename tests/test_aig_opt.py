@@ -0,0 +1,103 @@
+import random
+
+import pytest
+
+pytest.importorskip('aiger_swig.aiger_wrap')  # built by aiger_swig/make_swig.sh
+
+from aig_builder import AigBuilder, negate
+from aig_opt import optimize, read_circuit
+from aig_sim import assert_equivalent
+from aiger_io import aiger_to_string
+
+
+def _latch_names(model):
+    return sorted(name for (_, _, _, name) in read_circuit(model).latches)
+
+
+def test_stuck_latches_become_constants():
+    b = AigBuilder()
+    i = b.add_input('i')
+    low = b.add_latch('low', init=False)    # stays FALSE: low' = low & i
+    high = b.add_latch('high', init=True)   # stays TRUE: high' = high | i
+    t = b.add_latch('t', init=False)        # t' = i
+    b.set_latch_next(low, b.and_(low, i))
+    b.set_latch_next(high, b.or_(high, i))
+    b.set_latch_next(t, i)
+    b.add_bad(b.or_(low, b.and_(t, high)), 'bad')
+    model = b.to_aiger()
+
+    result = optimize(model)
+
+    assert _latch_names(result) == ['t']
+    assert result.num_ands == 0  # bad is the latch `t`
+    assert_equivalent(model, result)
+
+
+def test_latch_depending_on_a_changing_latch_is_not_constant():
+    b = AigBuilder()
+    i = b.add_input('i')
+    a = b.add_latch('a')
+    c = b.add_latch('c')
+    b.set_latch_next(a, i)
+    b.set_latch_next(c, b.or_(c, a))  # FALSE until `a` was TRUE
+    b.add_bad(c, 'bad')
+    model = b.to_aiger()
+
+    result = optimize(model)
+
+    assert _latch_names(result) == ['a', 'c']
+    assert_equivalent(model, result)
+
+
+def test_dead_cone_is_removed():
+    b = AigBuilder()
+    i, j = b.add_input('i'), b.add_input('j')
+    used = b.add_latch('used')
+    dead = b.add_latch('dead')
+    dead2 = b.add_latch('dead2')
+    b.set_latch_next(used, b.xor(used, i))
+    b.set_latch_next(dead, b.and_(dead2, j))  # `dead` and `dead2` feed only each other
+    b.set_latch_next(dead2, b.or_(dead, i))
+    b.and_(dead, used)  # dangling AND
+    b.add_bad(b.and_(used, negate(i)), 'bad')
+    model = b.to_aiger()
+
+    result = optimize(model)
+
+    assert _latch_names(result) == ['used']
+    assert sorted(name for (_, name) in read_circuit(result).inputs) == ['i', 'j']  # inputs are kept
+    assert result.num_ands == 3  # the xor (bad is its AND `used & !i`)
+    assert_equivalent(model, result)
+
+
+def _random_model(rng: random.Random):
+    b = AigBuilder()
+    lits = [b.add_input('i%i' % k) for k in range(3)]
+    latches = [b.add_latch('l%i' % k, init=rng.choice([False, True])) for k in range(6)]
+    lits += latches
+    for _ in range(20):
+        a, c = (rng.choice(lits) ^ rng.randint(0, 1) for _ in range(2))
+        lits.append(b.and_(a, c))
+    for k, latch in enumerate(latches):
+        # some latches keep their value
+        b.set_latch_next(latch, latch if k == 0 else rng.choice(lits) ^ rng.randint(0, 1))
+
+    pick = lambda: rng.choice(lits) ^ rng.randint(0, 1)
+    b.add_output(pick(), 'o')
+    b.add_bad(pick(), 'bad')
+    b.add_constraint(pick(), 'c')
+    b.add_justice([pick(), pick()], 'j')
+    b.add_fairness(pick(), 'f')
+    return b.to_aiger()
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_optimized_model_is_equivalent(seed):
+    model = _random_model(random.Random(seed))
+    text = aiger_to_string(model)
+
+    result = optimize(model)
+
+    assert aiger_to_string(model) == text  # not changed
+    assert result.num_latches <= model.num_latches and result.num_ands <= model.num_ands
+    assert_equivalent(model, result, seed=seed)
@@ -0,0 +1,126 @@
+import argparse
+import io
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip('aiger_swig.aiger_wrap')  # built by aiger_swig/make_swig.sh
+
+from aig_builder import AigBuilder
+from aiger_io import aiger_to_string, read_aiger, read_aiger_from_bytes, read_aiger_from_string, write_aiger, \
+    write_aiger_to
+from get_nof_properties import get_nof_properties
+
+
+def _model():
+    """ 1 output, 2 bad, 2 justice (5 properties), 1 constraint, 1 fairness; ANDs far from their inputs """
+    b = AigBuilder()
+    inputs = [b.add_input('i%i' % k) for k in range(70)]
+    latch = b.add_latch('l', init=True)
+    far = b.and_(inputs[0], inputs[1])  # its delta in the binary format is > 127
+    b.set_latch_next(latch, b.xor(latch, far))
+    b.add_output(far, 'o')
+    b.add_bad(b.and_(latch, inputs[2]), 'p0')
+    b.add_bad(b.and_(latch, inputs[3]), 'p1')
+    b.add_constraint(inputs[4], 'c')
+    b.add_justice([latch, inputs[5]], 'j0')
+    b.add_justice([inputs[6]], 'j1')
+    b.add_fairness(inputs[7], 'f')
+    return b.to_aiger()
+
+
+def _binary(model) -> bytes:
+    out = io.BytesIO()
+    write_aiger_to(model, out, binary=True)  # reencodes `model`
+    return out.getvalue()
+
+
+def test_binary_round_trip():
+    model = _model()
+    data = _binary(model)
+    assert data.startswith(b'aig ')
+    assert any(byte > 127 for byte in data)
+
+    for buffer in (data, bytearray(data), memoryview(data)):
+        assert aiger_to_string(read_aiger_from_bytes(buffer)) == aiger_to_string(model)
+
+
+def test_binary_file(tmp_path):
+    model = _model()
+    file_name = str(tmp_path / 'model.aig')
+    write_aiger(model, file_name)
+
+    with open(file_name, 'rb') as f:
+        assert f.read().startswith(b'aig ')
+    assert get_nof_properties(file_name) == 5
+    assert aiger_to_string(read_aiger(file_name)) == aiger_to_string(model)
+
+    ascii_file_name = str(tmp_path / 'model.aag')
+    write_aiger(model, ascii_file_name)
+    assert get_nof_properties(ascii_file_name) == 5
+
+
+def test_read_errors():
+    data = _binary(_model())
+    with pytest.raises(AssertionError):
+        read_aiger_from_bytes(data[:data.index(b'\n') + 1])  # only the header
+    with pytest.raises(AssertionError):
+        read_aiger_from_string('aag 1 1 0 0 0\n')
+
+
+def test_write_into_string_io():
+    model = _model()
+    out = io.StringIO()
+    out.write('# before\n')
+
+    write_aiger_to(model, out)
+
+    text = out.getvalue()
+    assert text.startswith('# before\naag ')
+    assert aiger_to_string(read_aiger_from_string(text[len('# before\n'):])) == text[len('# before\n'):]
+    with pytest.raises(AssertionError):
+        write_aiger_to(model, io.StringIO(), binary=True)
+
+
+@pytest.mark.parametrize('binary', [False, True])
+def test_write_into_bytes_io(binary):
+    model = _model()
+    out = io.BytesIO()
+
+    write_aiger_to(model, out, binary)
+
+    data = out.getvalue()
+    assert data.startswith(b'aig ' if binary else b'aag ')
+    assert aiger_to_string(read_aiger_from_bytes(data)) == aiger_to_string(model)
+
+
+@pytest.mark.parametrize('mode', ['w', 'wb'])
+@pytest.mark.parametrize('binary', [False, True])
+def test_write_into_file(tmp_path, mode, binary):
+    model = _model()
+    file_name = str(tmp_path / 'model')
+
+    # like the `out` arguments of the tools: argparse.FileType('w'), text mode even for binary models
+    with argparse.FileType(mode)(file_name) as out:
+        write_aiger_to(model, out, binary)
+        out.write('c\nwritten after the model\n' if 'b' not in mode else b'c\nwritten after the model\n')
+
+    with open(file_name, 'rb') as f:
+        data = f.read()
+    assert data.startswith(b'aig ' if binary else b'aag ')
+    assert data.endswith(b'\nc\nwritten after the model\n')  # the comment section
+    assert aiger_to_string(read_aiger(file_name)) == aiger_to_string(model) + 'c\nwritten after the model\n'
+
+
+def test_write_binary_into_stdout(tmp_path):
+    model_file = str(tmp_path / 'model.aag')
+    write_aiger(_model(), model_file)
+    aig_opt = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'aig_opt.py')
+
+    data = subprocess.check_output([sys.executable, aig_opt, model_file, '--binary'])  # stdout is a pipe
+
+    assert data.startswith(b'aig ')
+    result = read_aiger_from_bytes(data)
+    assert (result.num_outputs, result.num_bad, result.num_justice) == (1, 2, 2)
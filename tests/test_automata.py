@@ -0,0 +1,84 @@
+import os
+
+import pytest
+
+pytest.importorskip('config')  # generated by configure.py
+
+import automata
+import goal_utils
+from automata import automata_from_specs, automaton_from_spec, automaton_from_det_gffs, gff_2_nbw_params
+from gff_reader import read_gff
+from goal_worker import GoalWorkerPool
+import safety_det
+from structs import PropertySpec, SpecType
+from test_goal_worker import FAKE_GC_SHELL
+
+ARBITER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'arbiter-4-grants')
+# not safety or co-safety: determinized by (the stand-in of) GOAL
+DBW = os.path.join(ARBITER, 'dbw-every-request-is-granted.gff')
+DBW2 = os.path.join(ARBITER, 'dbw-grant-is-lowered-finally.gff')
+
+
+def _fields(automaton):
+    return (automaton.state_names, automaton.init_state, automaton.acc_states, automaton.dead_states,
+            automaton.is_safety, automaton.propositions, automaton.succ)
+
+
+@pytest.fixture
+def goal_pool(monkeypatch):
+    # every translation of the stand-in returns DBW, and its determinization keeps the automaton as is
+    monkeypatch.setenv('FAKE_GC_AUTOMATON', DBW)
+    pool = GoalWorkerPool(FAKE_GC_SHELL, size=2, timeout=10)
+    calls = []
+    pool_execute = pool.execute
+
+    def execute(script):
+        calls.append(script)
+        return pool_execute(script)
+
+    monkeypatch.setattr(goal_utils, '_goal_pool', pool)
+    monkeypatch.setattr(pool, 'execute', execute)
+    yield calls
+    pool.shutdown()
+
+
+def test_automata_are_not_native():
+    for gff in (DBW, DBW2):
+        for complement in (False, True):
+            assert safety_det.determinize(*gff_2_nbw_params(read_gff(gff)), complement=complement) is None
+
+
+def test_automaton_from_spec(goal_pool):
+    spec = PropertySpec('G(r -> F g)', True, True, 'G(r -> F g)', SpecType.LTL_SPEC)
+    automaton = automaton_from_spec(spec)
+
+    assert len(goal_pool) == 2  # translation, determinization
+    assert goal_pool[0].startswith('translate QPTL')
+    assert 'acc -min $res;' in goal_pool[1] and 'acc -max $res;' in goal_pool[1]
+    assert _fields(automaton) == _fields(automaton_from_det_gffs(DBW, DBW))
+
+
+def test_automata_from_specs(goal_pool):
+    specs = [PropertySpec('ltl', True, True, 'G(r -> F g)', SpecType.LTL_SPEC),
+             PropertySpec('pltl', False, True, 'G(r -> Y g)', SpecType.PLTL_SPEC),
+             PropertySpec('gff', True, False, DBW2, SpecType.AUTOMATON_SPEC)]
+    result = automata_from_specs(specs)
+
+    # one script for all translations, one for all determinizations
+    assert len(goal_pool) == 2
+    assert goal_pool[0].count('translate ') == 2
+    assert goal_pool[1].count('determinization ') == 3
+    assert goal_pool[1].count('complement ') == 1
+
+    expected = _fields(automaton_from_det_gffs(DBW, DBW))
+    assert _fields(result[0]) == expected
+    assert _fields(result[1]) == expected
+    assert _fields(result[2]) == _fields(automaton_from_spec(specs[2]))
+
+
+def test_automata_from_specs_goal_error(goal_pool, monkeypatch):
+    monkeypatch.setattr(automata, 'determinization_script',
+                        lambda *args: 'error "determinization failed";')
+    spec = PropertySpec('G(r -> F g)', True, True, 'G(r -> F g)', SpecType.LTL_SPEC)
+    with pytest.raises(Exception, match='determinization failed'):
+        automata_from_specs([spec])
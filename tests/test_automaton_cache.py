@@ -0,0 +1,102 @@
+import os
+import zlib
+
+import pytest
+
+from automaton_cache import AutomatonCache, ENTRY_SUFFIX
+from structs import CompactAutomaton, PropertySpec, SpecType
+
+VERSION = '2'  # like automata.GOAL_SCRIPT_VERSION
+
+
+def _automaton(nof_states=2):
+    states = ['s%i' % i for i in range(nof_states)]
+    edges = dict(((s, states[(i + 1) % nof_states]), {('r', '~g'), ('g',)}) for (i, s) in enumerate(states))
+    edges[(states[0], states[0])] = {('~r',)}
+    return CompactAutomaton.from_params(states[0], states, edges, [states[0]])
+
+
+def _fields(automaton):
+    return (automaton.state_names, automaton.init_state, automaton.acc_states, automaton.dead_states,
+            automaton.is_safety, automaton.propositions, automaton.succ)
+
+
+def _spec(data, is_positive=True, type=SpecType.LTL_SPEC):
+    return PropertySpec(data, is_positive, True, data, type)
+
+
+def _entries(cache_dir):
+    return sorted(n for n in os.listdir(str(cache_dir)) if n.endswith(ENTRY_SUFFIX))
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return AutomatonCache(str(tmp_path), version=VERSION)
+
+
+def test_hit(cache):
+    automaton = _automaton()
+    cache.put(_spec('G(r -> F g)'), automaton)
+    assert _fields(cache.get(_spec('G(r -> F g)'))) == _fields(automaton)
+
+
+def test_miss(cache):
+    assert cache.get(_spec('G(r -> F g)')) is None
+
+    cache.put(_spec('G(r -> F g)'), _automaton())
+    assert cache.get(_spec('G(r -> X g)')) is None
+    assert cache.get(_spec('G(r -> F g)', is_positive=False)) is None
+    assert cache.get(_spec('G(r -> F g)', type=SpecType.PLTL_SPEC)) is None
+
+
+def test_edited_gff_spec_is_a_miss(cache, tmp_path):
+    gff = tmp_path / 'spec.gff'
+    gff.write_text('<Structure/>')
+    spec = _spec(str(gff), type=SpecType.AUTOMATON_SPEC)
+    cache.put(spec, _automaton())
+    assert cache.get(spec) is not None
+
+    gff.write_text('<Structure></Structure>')
+    assert cache.get(spec) is None
+
+
+def test_version_bump(cache, tmp_path):
+    cache.put(_spec('G(r -> F g)'), _automaton())
+
+    assert AutomatonCache(str(tmp_path), version=VERSION).get(_spec('G(r -> F g)')) is not None
+    assert AutomatonCache(str(tmp_path), version=VERSION + '.1').get(_spec('G(r -> F g)')) is None
+
+
+@pytest.mark.parametrize('damage', [lambda data: data[:len(data) // 2],  # truncated zlib stream
+                                    lambda data: b'not zlib',
+                                    lambda data: zlib.compress(b'{"states": ')])
+def test_corrupt_entry_is_a_miss(cache, tmp_path, damage):
+    cache.put(_spec('G(r -> F g)'), _automaton())
+    entry, = _entries(tmp_path)
+    path = tmp_path / entry
+    path.write_bytes(damage(path.read_bytes()))
+
+    assert cache.get(_spec('G(r -> F g)')) is None
+    assert _entries(tmp_path) == []  # removed
+
+    cache.put(_spec('G(r -> F g)'), _automaton())
+    assert cache.get(_spec('G(r -> F g)')) is not None
+
+
+def test_lru_eviction(tmp_path):
+    cache = AutomatonCache(str(tmp_path), version=VERSION)
+    cache.put(_spec('a'), _automaton())
+    entry_size = os.path.getsize(cache._entry_path(cache.key(_spec('a'))))
+
+    cache = AutomatonCache(str(tmp_path), max_size=2 * entry_size, version=VERSION)
+    cache.put(_spec('b'), _automaton())
+    os.utime(cache._entry_path(cache.key(_spec('a'))), (1000, 1000))
+    os.utime(cache._entry_path(cache.key(_spec('b'))), (2000, 2000))
+    assert cache.get(_spec('a')) is not None  # `a` is older than `b`, but it is used later
+
+    cache.put(_spec('c'), _automaton())
+
+    assert len(_entries(tmp_path)) == 2
+    assert cache.get(_spec('b')) is None
+    assert cache.get(_spec('a')) is not None
+    assert cache.get(_spec('c')) is not None
@@ -0,0 +1,93 @@
+import os
+import sys
+
+import pytest
+
+from goal_worker import GoalWorker, GoalWorkerPool, GoalWorkerError, GoalWorkerTimeout, GoalWorkerCrash
+
+FAKE_GC = '%s %s' % (sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stubs', 'fake_gc.py'))
+FAKE_GC_SHELL = FAKE_GC + ' shell'
+
+
+@pytest.fixture
+def worker():
+    w = GoalWorker(FAKE_GC_SHELL, timeout=10)
+    yield w
+    w.stop()
+
+
+def test_echo(worker):
+    assert worker.execute('echo "a";\necho "b";') == 'a\nb\n'
+    assert worker.execute('echo "c";') == 'c\n'
+
+
+def test_translate_and_save(worker, tmp_path):
+    translated, saved = str(tmp_path / 'nbw.gff'), str(tmp_path / 'dbw.gff')
+    worker.execute('translate QPTL -o %s "G(r -> F g)";\n'
+                   '$res = load "%s";\n'
+                   '$res = determinization -m bk09 $res;\n'
+                   'save $res %s;' % (translated, translated, saved))
+    with open(translated) as f1, open(saved) as f2:
+        assert f1.read() == f2.read()
+
+
+def test_stderr_of_script_is_not_missed(worker):
+    # the error is the last line of the script, it must not wait for the next script
+    with pytest.raises(GoalWorkerError, match='Error: boom'):
+        worker.execute('echo "a";\nerror "boom";')
+    assert worker.execute('echo "b";') == 'b\n'
+
+
+def test_warnings_are_not_errors(worker):
+    assert worker.execute('warn "OpenJDK 64-Bit Server VM warning: deprecated option";\necho "a";') == \
+        'OpenJDK 64-Bit Server VM warning: deprecated option\na\n'
+
+
+def test_words_error_and_exception_are_not_errors(worker):
+    # only lines starting with GOAL's `Error:` or `Exception` are errors
+    script = 'echo "G(error -> F exception)";\nwarn "loaded /tmp/errors.gff";\necho "no Error: here";'
+    assert worker.execute(script) == 'G(error -> F exception)\nloaded /tmp/errors.gff\nno Error: here\n'
+
+
+def test_marker_in_output(worker):
+    # the output may contain marker-like text, only the unique marker of the script ends it
+    assert worker.execute('echo "GOAL_WORKER_DONE_0";\necho "a";') == 'GOAL_WORKER_DONE_0\na\n'
+
+
+def test_timeout():
+    w = GoalWorker(FAKE_GC_SHELL, timeout=0.5)
+    with pytest.raises(GoalWorkerTimeout):
+        w.execute('sleep 5;')
+    assert not w.is_alive()
+    w.timeout = 10
+    assert w.execute('echo "a";') == 'a\n'  # restarted
+    w.stop()
+
+
+def test_crash(worker):
+    with pytest.raises(GoalWorkerCrash):
+        worker.execute('exit 1;')
+    assert worker.execute('echo "a";') == 'a\n'
+
+
+def test_pool_restarts_crashed_worker(tmp_path):
+    pool = GoalWorkerPool(FAKE_GC_SHELL, size=1, timeout=10, max_restarts=1)
+    try:
+        assert pool.execute('crash_once "%s";\necho "a";' % (tmp_path / 'crashed')) == 'a\n'
+        with pytest.raises(GoalWorkerCrash):  # crashes on every attempt
+            pool.execute('exit 1;')
+        assert pool.execute('echo "b";') == 'b\n'
+    finally:
+        pool.shutdown()
+
+
+def test_pool_in_parallel():
+    from concurrent.futures import ThreadPoolExecutor
+    pool = GoalWorkerPool(FAKE_GC_SHELL, size=3, timeout=10)
+    try:
+        with ThreadPoolExecutor(6) as executor:
+            outs = list(executor.map(lambda i: pool.execute('echo "%i";' % i), range(20)))
+        assert outs == ['%i\n' % i for i in range(20)]
+        assert len(pool._workers) <= 3
+    finally:
+        pool.shutdown()
@@ -0,0 +1,212 @@
+import os
+import random
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip('aiger_swig.aiger_wrap')  # built by aiger_swig/make_swig.sh
+
+from aig_builder import AigBuilder
+from aig_opt import read_circuit
+from aig_sim import simulate
+from aiger_io import aiger_to_string, read_aiger, write_aiger
+from liveness_2_safety import KLivenessTransformer, to_k_liveness_model
+
+INPUTS = ('a', 'b', 'c', 'f1', 'f2')
+LIVENESS_2_SAFETY = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'liveness_2_safety.py')
+
+
+def _model(justice=(('a',), ('b', 'c')), fairness=('f1', 'f2'), safety=False):
+    """
+    :param justice: input names of every justice property
+    :param safety: add the output `o` and the bad property `p`
+    """
+    b = AigBuilder()
+    lit_by_name = dict((name, b.add_input(name)) for name in INPUTS)
+    if safety:
+        latch = b.add_latch('l')
+        b.set_latch_next(latch, lit_by_name['a'])
+        b.add_output(b.and_(latch, lit_by_name['b']), 'o')
+        b.add_bad(b.and_(latch, lit_by_name['c']), 'p')
+    for i, names in enumerate(justice):
+        b.add_justice([lit_by_name[n] for n in names], 'j%i' % i)
+    for name in fairness:
+        b.add_fairness(lit_by_name[name], name)
+    return b.to_aiger()
+
+
+def _k_liveness_bad(model, k, steps) -> list:
+    """ :param steps: list of sets of the true inputs """
+    result = to_k_liveness_model(read_circuit(model), model.maxvar, k)
+    assert [name for (_, name) in read_circuit(result).bad] == ['k-liveness']
+    assert result.num_justice == 0 and result.num_fairness == 0
+    return _simulate_bad(result, steps)
+
+
+def _simulate_bad(model, steps) -> list:
+    trace = simulate(model, [dict((name, name in step) for name in INPUTS) for step in steps])
+    return [step['bad'][-1] for step in trace]
+
+
+def _expected_bad(k, steps, justice=(('a',), ('b', 'c')), fairness=('f1', 'f2')) -> list:
+    """ the counter of `fair` steps since the last `just` (every justice literal seen) reaches k """
+    justice_lits = [name for names in justice for name in names]
+    seen_just, seen_fair, counter, bad = set(), set(), 0, []
+    for step in steps:
+        bad.append(counter == k)
+        seen_just |= step.intersection(justice_lits)
+        seen_fair |= step.intersection(fairness)
+        just, fair = len(seen_just) == len(justice_lits), len(seen_fair) == len(fairness)
+        if just:
+            seen_just = set()
+        if fair:
+            seen_fair = set()
+        counter = 0 if just else counter + fair
+    return bad
+
+
+@pytest.mark.parametrize('k', [1, 2, 3, 5, 8])
+def test_bad_after_k_fair_steps(k):
+    steps = [{'f1', 'f2'}] * 12
+    assert _k_liveness_bad(_model(), k, steps).index(True) == k
+
+
+def test_justice_literals_seen_partly():
+    # `a` and `b` are seen, `c` of the generalized justice property `j1` never is
+    steps = [{'a', 'b', 'f1', 'f2'}] * 6
+    assert _k_liveness_bad(_model(), 3, steps).index(True) == 3
+
+
+def test_justice_resets_the_counter():
+    # all justice literals are seen (over two steps) at step 2
+    steps = [{'f1', 'f2'}, {'f1', 'f2', 'a', 'b'}, {'f1', 'f2', 'c'}] + [{'f1', 'f2'}] * 9
+    assert _k_liveness_bad(_model(), 3, steps).index(True) == 3 + 3
+
+
+def test_all_fairness_literals_make_a_fair_step():
+    # f1 and f2 alternate: every second step is fair
+    steps = [{'f1'}, {'f2'}] * 8
+    assert _k_liveness_bad(_model(), 3, steps).index(True) == 2 * 3
+
+
+def test_no_fairness():
+    steps = [set()] * 6
+    assert _k_liveness_bad(_model(fairness=()), 2, steps).index(True) == 2
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_random_traces(seed):
+    rng = random.Random(seed)
+    model = _model()
+    for k in (1, 2, 3, 4, 7):
+        for _ in range(10):
+            steps = [set(name for name in INPUTS if rng.random() < 0.4) for _ in range(30)]
+            expected = _expected_bad(k, steps)
+            n = expected.index(True) + 1 if True in expected else len(steps)
+            assert _k_liveness_bad(model, k, steps)[:n] == expected[:n], (k, steps)
+
+
+def _run(tmp_path, *args):
+    model_file = str(tmp_path / 'model.aag')
+    write_aiger(_model(), model_file)
+    return subprocess.run([sys.executable, LIVENESS_2_SAFETY, model_file] + list(args),
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True,
+                          cwd=str(tmp_path))
+
+
+def _split_counter(model):
+    """ :return: the model without the counter (its latches and the ANDs built after them), number of counter bits """
+    circuit = read_circuit(model)
+    counter_vars = [lit >> 1 for (lit, _, _, name) in circuit.latches if name.startswith('k_liveness_counter')]
+    rest = (circuit.inputs,
+            [l for l in circuit.latches if l[0] >> 1 not in counter_vars],
+            sorted((v, rhs) for (v, rhs) in circuit.rhs_by_and_var.items() if v < min(counter_vars)))
+    return rest, len(counter_vars)
+
+
+def _sweep(tmp_path, ext, *args):
+    out_dir = tmp_path / 'out'
+    result = _run(tmp_path, '--new', '--sweep', '1..4,8', '--out-dir', str(out_dir), *args)
+
+    assert result.returncode == 0, result.stderr
+    file_names = [str(out_dir / ('k%i%s' % (k, ext))) for k in (1, 2, 3, 4, 8)]
+    assert result.stdout.split() == file_names
+    return [(k, read_aiger(name)) for (k, name) in zip((1, 2, 3, 4, 8), file_names)]
+
+
+def test_sweep(tmp_path):
+    models = _sweep(tmp_path, '.aag')
+
+    # the models differ only in the counter width and the comparator
+    rest, _ = _split_counter(models[0][1])
+    for k, model in models:
+        assert _split_counter(model) == (rest, k.bit_length())
+        assert _simulate_bad(model, [{'f1', 'f2'}] * 10).index(True) == k
+
+
+def test_sweep_binary(tmp_path):
+    # binary models are reencoded, so only the number of counter bits is compared
+    for k, model in _sweep(tmp_path, '.aig', '--binary'):
+        assert _split_counter(model)[1] == k.bit_length()
+        assert _simulate_bad(model, [{'f1', 'f2'}] * 10).index(True) == k
+
+
+@pytest.mark.parametrize('args', [['-k', '0'],
+                                  ['-k', '-1'],
+                                  ['--sweep', '0..2', '--out-dir', 'out'],
+                                  ['--sweep', '2..4']])  # no --out-dir
+def test_usage_errors(tmp_path, args):
+    result = _run(tmp_path, '--new', *args)
+
+    assert result.returncode == 2
+    assert result.stderr.startswith('usage:')
+    assert not os.path.exists(str(tmp_path / 'out'))
+
+
+def _names(model):
+    circuit = read_circuit(model)
+    return dict(latches=[name for (_, _, _, name) in circuit.latches],
+                outputs=[name for (_, name) in circuit.outputs],
+                bad=[name for (_, name) in circuit.bad],
+                justice=[name for (_, name) in circuit.justice],
+                fairness=[name for (_, name) in circuit.fairness])
+
+
+@pytest.mark.parametrize('optimize_result', [False, True])
+def test_transformer(optimize_result):
+    model = _model(safety=True)
+    text = aiger_to_string(model)
+
+    result = KLivenessTransformer(new_format=True, optimize_result=optimize_result).transform(model, 3)
+
+    assert aiger_to_string(model) == text
+    assert _names(result) == dict(latches=['l',
+                                           'k_liveness_justice.f0', 'k_liveness_justice.f1', 'k_liveness_justice.f2',
+                                           'k_liveness_fairness.f0', 'k_liveness_fairness.f1',
+                                           'k_liveness_counter0', 'k_liveness_counter1'],
+                                  outputs=['o'], bad=['p', 'k-liveness'], justice=[], fairness=[])
+    assert _simulate_bad(result, [{'f1', 'f2'}] * 6).index(True) == 3
+
+
+def test_transformer_k_values():
+    model = _model()
+    text = aiger_to_string(model)
+    transformer = KLivenessTransformer(new_format=True)
+
+    results = list(transformer.transform_k_values(model, [1, 4]))
+    strings = list(transformer.transform_to_strings(model, [1, 4]))
+
+    assert aiger_to_string(model) == text
+    assert [k for (k, _) in results] == [1, 4]
+    assert [(k, aiger_to_string(result)) for (k, result) in results] == strings
+    for k, result in results:
+        assert _simulate_bad(result, [{'f1', 'f2'}] * 6).index(True) == k
+
+
+def test_transformer_without_justice():
+    model = _model(justice=(), safety=True)
+
+    result = KLivenessTransformer(new_format=True).transform(model, 2)
+
+    assert _names(result) == dict(latches=['l'], outputs=['o'], bad=['p'], justice=[], fairness=[])
@@ -0,0 +1,78 @@
+import json
+import os
+import sys
+import time
+
+import mc
+
+FAKE_CHECKER = '%s %s' % (sys.executable,
+                          os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stubs', 'fake_checker.py'))
+
+
+def _model(tmp_path, nof_bad: int) -> str:
+    """ :return: file of a model with `nof_bad` bad properties (only the header matters) """
+    file_name = str(tmp_path / 'model.aag')
+    with open(file_name, 'w') as f:
+        f.write('aag 0 0 0 0 0 %i\n' % nof_bad + '0\n' * nof_bad)
+    return file_name
+
+
+def _checker(*results, log=None) -> mc.CommandChecker:
+    cmd = FAKE_CHECKER + ' --results ' + ','.join(results)
+    if log:
+        cmd += ' --log ' + log
+    return mc.CommandChecker(cmd)
+
+
+def test_all_properties_hold(tmp_path):
+    summary = mc.check_model(_model(tmp_path, 3), _checker('0', '0', '0'), jobs=2)
+    assert summary['correct']
+    assert [(r['property'], r['status']) for r in summary['properties']] == \
+        [(0, mc.CORRECT), (1, mc.CORRECT), (2, mc.CORRECT)]
+
+
+def test_early_abort(tmp_path):
+    log = str(tmp_path / 'log')
+    start = time.time()
+    summary = mc.check_model(_model(tmp_path, 6), _checker('hang', '1', 'hang', 'hang', 'hang', 'hang', log=log),
+                             jobs=2)
+    assert time.time() - start < 30  # the hanging check is killed
+    assert not summary['correct']
+    statuses = [r['status'] for r in summary['properties']]
+    assert statuses[:2] == [mc.CANCELLED, mc.INCORRECT]
+    assert set(statuses[2:]) == {mc.CANCELLED}
+    with open(log) as f:
+        started = [l for l in f.read().split() if l.isdigit()]
+    assert '1' in started and set(started) <= {'0', '1'}  # the remaining properties are not checked
+
+
+def test_timeout(tmp_path):
+    summary = mc.check_model(_model(tmp_path, 2), _checker('hang', '0'), jobs=2, timeout=0.5)
+    assert not summary['correct']
+    assert [r['status'] for r in summary['properties']] == [mc.TIMEOUT, mc.CORRECT]
+
+
+def test_checker_error(tmp_path):
+    summary = mc.check_model(_model(tmp_path, 1), _checker('crash'))
+    assert [r['status'] for r in summary['properties']] == [mc.ERROR]
+
+
+def test_json_summary(tmp_path):
+    model = _model(tmp_path, 2)
+    json_file = str(tmp_path / 'summary.json')
+    assert mc.main(model, FAKE_CHECKER + ' --results 0,1', 1, None, False, json_file) == 1
+    with open(json_file) as f:
+        summary = json.load(f)
+    assert summary['model'] == model
+    assert summary['correct'] is False
+    assert [(r['property'], r['status']) for r in summary['properties']] == [(0, mc.CORRECT), (1, mc.INCORRECT)]
+    assert all(r['time'] >= 0 for r in summary['properties'])
+    assert summary['time'] >= 0
+
+
+def test_binary_model(tmp_path):
+    model = str(tmp_path / 'model.aig')
+    with open(model, 'wb') as f:
+        f.write(b'aig 3 1 1 0 1 2\n6\n6\n7\n\x02\x02i0 r\n')  # bad: an AND and its negation
+    summary = mc.check_model(model, _checker('0', '0'))
+    assert [r['status'] for r in summary['properties']] == [mc.CORRECT, mc.CORRECT]
@@ -0,0 +1,105 @@
+import random
+
+import pytest
+
+import safety_product
+from labels import is_satisfied
+from safety_product import build_safety_product
+from structs import CompactAutomaton, PropertySpec, SpecType
+
+PROPS = ('a', 'b', 'c')
+
+
+def _random_safety_automaton(rng: random.Random) -> CompactAutomaton:
+    """ deterministic: every state branches on two propositions; some edges are missing (fall-out) """
+    states = [str(i) for i in range(rng.randint(2, 5))]
+    dead = states[-1]
+    edges = {(dead, dead): {('True',)}}
+    for s in states[:-1]:
+        p, q = rng.sample(PROPS, 2)
+        for label in ((p, q), (p, '~' + q), ('~' + p, q), ('~' + p, '~' + q)):
+            if rng.random() < 0.9:
+                edges.setdefault((s, rng.choice(states)), set()).add(label)
+    return CompactAutomaton.from_params('0', states, edges, states[:-1], [dead], is_safety=True)
+
+
+def _first_bad(automaton: CompactAutomaton, word) -> int or None:
+    """ :return: the length of the shortest prefix of `word` that leads to a dead state """
+    s, sink = automaton.init_state, len(automaton.state_names)
+    for t, letter in enumerate(word + [None]):
+        if s in automaton.dead_states:
+            return t
+        if letter is None or s == sink:
+            continue
+        v = sum(letter[p] << i for (i, p) in enumerate(automaton.propositions))
+        s = next((dst for (dst, labels) in automaton.succ[s] if any(is_satisfied(m, v) for m in labels)),
+                 sink)
+    return None
+
+
+def _assert_same_bad_prefixes(product, automata, rng: random.Random, nof_words=100):
+    for _ in range(nof_words):
+        word = [dict((p, rng.random() < 0.5) for p in PROPS) for _ in range(12)]
+        expected = min((t for t in (_first_bad(a, word) for a in automata) if t is not None), default=None)
+        assert _first_bad(product, word) == expected, word
+
+
+@pytest.mark.parametrize('seed', range(30))
+def test_product_is_bad_iff_some_automaton_is_bad(seed):
+    rng = random.Random(seed)
+    automata = [_random_safety_automaton(rng) for _ in range(3)]
+
+    product = build_safety_product(automata)
+
+    if product is None:  # no automaton can reach its dead state
+        word = [dict((p, rng.random() < 0.5) for p in PROPS) for _ in range(12)]
+        assert all(_first_bad(a, word) is None for a in automata)
+        return
+    assert product.is_safety and len(product.dead_states) == 1
+    _assert_same_bad_prefixes(product, automata, rng)
+
+
+def test_product_of_automata_and_their_copies_is_minimized():
+    rng = random.Random(0)
+    automata = [_random_safety_automaton(rng) for _ in range(2)]
+
+    product = build_safety_product(automata)
+    product2 = build_safety_product(automata + automata)
+
+    assert len(product2.state_names) == len(product.state_names)
+    _assert_same_bad_prefixes(product2, automata, rng)
+
+
+def test_properties_that_always_hold():
+    always = CompactAutomaton.from_params('0', ['0', '1'], {('0', '0'): {('a',), ('~a',)}, ('1', '1'): {('True',)}},
+                                          ['0'], ['1'], is_safety=True)
+    assert build_safety_product([always, always]) is None
+
+
+def test_too_many_propositions(monkeypatch):
+    monkeypatch.setattr(safety_product, 'MAX_PROPOSITIONS', 2)
+    rng = random.Random(0)
+    assert build_safety_product([_random_safety_automaton(rng) for _ in range(5)]) is None
+
+
+def test_merge_safety_properties():
+    spec_2_smv = pytest.importorskip('spec_2_smv')  # needs config.py (configure.py)
+
+    rng = random.Random(1)
+    automata = [_random_safety_automaton(rng) for _ in range(3)]
+    while build_safety_product(automata[:2]) is None:
+        automata = [_random_safety_automaton(rng) for _ in range(3)]
+    liveness = CompactAutomaton.from_params('0', ['0'], {('0', '0'): {('a',), ('~a',)}}, ['0'])
+    specs = [PropertySpec('g%i' % i, True, True, 'g%i' % i, SpecType.LTL_SPEC) for i in range(3)]
+    assumption = PropertySpec('a0', True, False, 'a0', SpecType.LTL_SPEC)
+
+    assumptions, guarantees, result_automata, instances = spec_2_smv.merge_safety_properties(
+        [assumption], specs,
+        automata[:2] + [liveness, automata[2]],
+        [(3, dict()), (0, dict()), (1, dict()), (2, dict())])
+
+    # one safety assumption is kept, the two safety guarantees are replaced by their product
+    assert [s.desc for s in assumptions] == ['a0']
+    assert [s.desc for s in guarantees] == ['g2', 'guarantees_safety_product']
+    assert instances == [(3, dict()), (2, dict()), (4, dict())]
+    _assert_same_bad_prefixes(result_automata[4], automata[:2], rng)